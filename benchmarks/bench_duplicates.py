@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark duplicate detection (find_duplicates.py).
+
+Generates a synthetic vault and plants duplicates in it: exact copies,
+copies with one line changed and Syncthing conflict copies. Times a cold
+run (every note read and signed) and warm runs (signatures from the
+snapshot), and checks that every planted duplicate was found. Exits with
+status 1 if a warm run takes longer than the budget or a planted duplicate
+is missed.
+
+Usage:
+    python benchmarks/bench_duplicates.py
+    python benchmarks/bench_duplicates.py --notes 100000 --jobs 0 --vault-dir /tmp/bench-vaults
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+from find_duplicates import find_duplicates
+from vault_generator import generate_vault
+
+def plant_duplicates(vault_path, count, seed=0):
+    """Copy `count` notes of each kind of duplicate; returns the expected pairs by kind."""
+    rng = random.Random(seed)
+    notes = sorted(path for path in vault_path.rglob("*.md") if path.stat().st_size > 2000)
+    expected = {'exact': [], 'near': [], 'conflict': []}
+    for i, source in enumerate(rng.sample(notes, 3 * count)):
+        kind = ('exact', 'near', 'conflict')[i % 3]
+        if kind == 'conflict':
+            copy = source.with_name(f"{source.stem}.sync-conflict-20250101-120000-ABCDEFG.md")
+            shutil.copyfile(source, copy)
+        else:
+            copy = source.with_name(f"{source.stem} copy.md")
+            lines = source.read_text(encoding='utf-8').split('\n')
+            if kind == 'near':
+                # Change one word, as a second clip of an edited article would
+                middle = len(lines) // 2
+                lines[middle] = lines[middle].replace(" ", " edited ", 1)
+            copy.write_text('\n'.join(lines), encoding='utf-8')
+        expected[kind].append((source.relative_to(vault_path).as_posix(),
+                               copy.relative_to(vault_path).as_posix()))
+    return expected
+
+def missed(results, expected):
+    """Return the planted pairs that no result reports."""
+    found = set()
+    for result in results:
+        if result['kind'] == 'conflict':
+            found.add(('conflict', result['original'], result['path']))
+        else:
+            found.update((result['kind'], path) for path in result['paths'])
+    return [(kind, *pair) for kind, pairs in expected.items() for pair in pairs
+            if (kind, *pair) not in found and not ((kind, pair[0]) in found and (kind, pair[1]) in found)]
+
+def time_call(func):
+    """Return (result, wall-clock time in seconds) of a call."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate detection")
+    parser.add_argument("--notes", type=int, default=100000,
+                       help="Number of notes to generate (default: 100000)")
+    parser.add_argument("--mean-lines", type=int, default=20,
+                       help="Median note length in lines (default: 20)")
+    parser.add_argument("--duplicates", type=int, default=100,
+                       help="Duplicates planted of each kind (default: 100)")
+    parser.add_argument("--jobs", "-j", type=int, default=0, metavar="N",
+                       help="Worker processes for the cold run (default: 0 = all CPUs)")
+    parser.add_argument("--runs", type=int, default=3,
+                       help="Warm runs (default: 3)")
+    parser.add_argument("--budget", type=float, default=5,
+                       help="Budget for a warm run in seconds (default: 5)")
+    parser.add_argument("--vault-dir", type=Path,
+                       help="Keep the generated vault here and reuse it (default: a temporary directory)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        vault_path = (args.vault_dir or Path(temp_dir)) / f"duplicates-{args.notes}-{args.mean_lines}"
+        if not (vault_path / ".planted").exists():
+            shutil.rmtree(vault_path, ignore_errors=True)
+            vault_path.mkdir(parents=True)
+            print(f"Generating {args.notes} notes...")
+            generate_vault(vault_path, args.notes, mean_lines=args.mean_lines)
+            (vault_path / ".planted").write_text(json.dumps(plant_duplicates(vault_path, args.duplicates)))
+        expected = json.loads((vault_path / ".planted").read_text())
+        snapshot_path = Path(temp_dir) / "duplicates.snapshot"
+
+        results, cold = time_call(lambda: find_duplicates(vault_path, jobs=args.jobs,
+                                                          snapshot_path=snapshot_path))
+        print(f"cold  {cold:>7.2f}s  {len(results)} results (jobs={args.jobs})")
+        warm = []
+        for _ in range(args.runs):
+            results, seconds = time_call(lambda: find_duplicates(vault_path, snapshot_path=snapshot_path))
+            warm.append(seconds)
+        print(f"warm  {min(warm):>7.2f}s  {len(results)} results")
+        failures = missed(results, expected)
+
+    status = 0
+    if failures:
+        print(f"\nMissed {len(failures)} planted duplicate(s), e.g. {failures[0]}")
+        status = 1
+    if min(warm) > args.budget:
+        print(f"\nWarm run over the {args.budget:g}s budget")
+        status = 1
+    if not status:
+        print(f"\nFound every planted duplicate; warm runs within {args.budget:g}s")
+    return status
+
+if __name__ == "__main__":
+    exit(main())
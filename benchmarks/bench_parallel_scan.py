@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark parallel vault scanning on a synthetic vault.
+
+Times the regex content scan and a full index build with 1, 2, 4 and 8 jobs
+and reports the speedup over a single job.
+
+Usage:
+    python benchmarks/bench_parallel_scan.py
+    python benchmarks/bench_parallel_scan.py --notes 20000 --jobs 1 2 4 8 16
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+from vault_generator import generate_vault
+from vault_index import VaultIndex
+from vault_search import search_content
+
+def time_call(func):
+    """Return the wall-clock time of a call in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel vault scanning")
+    parser.add_argument("--notes", type=int, default=5000,
+                       help="Number of synthetic notes (default: 5000)")
+    parser.add_argument("--jobs", type=int, nargs='+', default=[1, 2, 4, 8],
+                       help="Job counts to compare (default: 1 2 4 8)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vault_path = Path(tmp) / "vault"
+        vault_path.mkdir()
+        print(f"Generating {args.notes} notes...")
+        generate_vault(vault_path, args.notes)
+
+        print(f"\n{'jobs':>4}  {'search':>9}  {'speedup':>7}  {'index':>9}  {'speedup':>7}")
+        baseline = None
+        for jobs in args.jobs:
+            search_time = time_call(
+                lambda: list(search_content(vault_path, r"budget\s+client", jobs=jobs))
+            )
+
+            def build_index():
+                with VaultIndex(vault_path, Path(tmp) / f"index-{jobs}.sqlite") as index:
+                    index.refresh(jobs)
+            index_time = time_call(build_index)
+
+            if baseline is None:
+                baseline = (search_time, index_time)
+            print(f"{jobs:>4}  {search_time:>8.3f}s  {baseline[0] / search_time:>6.2f}x"
+                  f"  {index_time:>8.3f}s  {baseline[1] / index_time:>6.2f}x")
+
+if __name__ == "__main__":
+    main()
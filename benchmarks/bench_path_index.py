@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the path index behind `vault_search.py --filename`.
+
+Builds a path table of generated note paths, folders and aliases, then
+reports the build, snapshot load and incremental update times and the
+fastest and median time of each query. Exits with status 1 if a selective
+query takes longer than the budget. Broad queries cost time in proportion to
+the names they match (or, for fuzzy queries, the names holding all of their
+letters and digits) and are only reported.
+
+Usage:
+    python benchmarks/bench_path_index.py
+    python benchmarks/bench_path_index.py --notes 200000 --runs 20 --budget-ms 5
+"""
+
+import argparse
+import marshal
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+from path_index import PathTable
+
+WORDS = ["meeting", "notes", "project", "budget", "client", "draft", "review",
+         "weekly", "plan", "idea", "café", "résumé", "Straße", "Quarterly", "OKR",
+         "İstanbul"]
+
+# (query, mode, checked against the budget)
+QUERIES = [
+    ("budget 4242", "substring", True),
+    ("zzz-no-match", "substring", True),
+    ("Quarterly", "substring", False),
+    ("review", "substring", False),
+    ("istan", "substring", False),
+    ("bul", "substring", False),
+    ("alias 12", "prefix", True),
+    ("bud", "prefix", False),
+    ("a7s3bud42", "fuzzy", True),
+    ("rvw4242", "fuzzy", False),
+    ("re", "fuzzy", False),
+    ("prjbdg", "fuzzy", False),
+    ("istnbl4242", "fuzzy", False),
+]
+
+def generate_paths(count, seed=0):
+    """Return (note paths, folder paths, {note path: [alias]}) of a generated vault."""
+    random.seed(seed)
+    folders = [f"Area {area}" for area in range(20)]
+    folders += [f"Area {area}/Sub {sub}" for area in range(20) for sub in range(10)]
+    notes = [f"{random.choice(folders)}/{' '.join(random.sample(WORDS, 3))} {i}.md"
+             for i in range(count)]
+    aliases = {path: [f"alias {i}"] for i, path in enumerate(notes[::50])}
+    return notes, folders, aliases
+
+def time_call(func):
+    """Return (result, wall-clock time in seconds) of a call."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the path index")
+    parser.add_argument("--notes", type=int, default=100000,
+                       help="Number of notes to generate (default: 100000)")
+    parser.add_argument("--runs", type=int, default=10,
+                       help="Runs per query (default: 10)")
+    parser.add_argument("--limit", type=int, default=20,
+                       help="Results per query (default: 20)")
+    parser.add_argument("--budget-ms", type=float, default=5,
+                       help="Budget for selective queries in ms (default: 5)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.notes} notes...")
+    notes, folders, aliases = generate_paths(args.notes)
+    table, build_time = time_call(lambda: PathTable.build(notes, folders, aliases))
+    data = marshal.dumps(table.state)
+    _, load_time = time_call(lambda: PathTable(marshal.loads(data)))
+    added = [f"Area 1/added {i}.md" for i in range(100)]
+    _, update_time = time_call(lambda: table.update(added, notes[:100]))
+    print(f"{len(table)} entries: build {build_time * 1000:.0f}ms, snapshot {len(data) / 1e6:.1f}MB"
+          f" loaded in {load_time * 1000:.1f}ms, 100 added + 100 removed in {update_time * 1000:.1f}ms")
+
+    over_budget = []
+    print(f"\n{'query':<14}  {'mode':<9}  {'min':>7}  {'median':>7}  {'best match'}")
+    for query, mode, budgeted in QUERIES:
+        times = []
+        for _ in range(args.runs):
+            matches, seconds = time_call(lambda: table.search(query, mode, limit=args.limit))
+            times.append(seconds)
+        fastest = min(times) * 1000
+        best = matches[0].path if matches else "-"
+        print(f"{query:<14}  {mode:<9}  {fastest:>5.1f}ms  {statistics.median(times) * 1000:>5.1f}ms  {best}")
+        if budgeted and fastest > args.budget_ms:
+            over_budget.append(f"{query!r} ({fastest:.1f}ms)")
+
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:g}ms budget: {', '.join(over_budget)}")
+        return 1
+    print(f"\nAll selective queries answered within {args.budget_ms:g}ms")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
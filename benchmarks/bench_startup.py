@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark tool startup and check it against a time budget.
+
+Runs each entry point as a fresh process on the vault in config.yaml and
+reports the fastest and median wall-clock times, and the import time measured
+with `python -X importtime` along with the slowest top-level imports. Exits
+with status 1 if a `--filename` query takes longer than the budget, so it can
+guard against a heavy import creeping back into the startup path.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --budget-ms 60 --show-imports 10
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).parent.parent / "tools"
+
+# (name, arguments, checked against the budget)
+COMMANDS = [
+    ("search --filename", ["vault_search.py", "--filename", "zzz-no-match"], True),
+    ("cli search --filename", ["obsidian_cli.py", "search", "--filename", "zzz-no-match"], True),
+    ("search --tag", ["vault_search.py", "--tag", "zzz-no-match"], False),
+    ("find_tasks", ["find_tasks.py"], False),
+    ("fix_sync --check", ["fix_sync_filenames.py", "--check"], False),
+]
+
+def run_times(args, runs):
+    """Return the wall-clock times in seconds of `runs` runs of a tool."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(TOOLS_DIR / args[0])] + args[1:],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+def import_times(args):
+    """Return (total, [(cumulative, module)]) import times in seconds of the top-level imports."""
+    result = subprocess.run([sys.executable, "-X", "importtime", str(TOOLS_DIR / args[0])] + args[1:],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        # Nested imports are indented below the module that imported them
+        if cumulative.strip().isdigit() and not module[1:].startswith(" "):
+            imports.append((int(cumulative) / 1e6, module.strip()))
+    return sum(seconds for seconds, _ in imports), sorted(imports, reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tool startup")
+    parser.add_argument("--runs", type=int, default=10,
+                       help="Runs per command (default: 10)")
+    parser.add_argument("--budget-ms", type=float, default=60,
+                       help="Startup budget for --filename queries in ms (default: 60)")
+    parser.add_argument("--show-imports", type=int, default=5, metavar="N",
+                       help="Slowest top-level imports to list per command (default: 5)")
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'command':<24}  {'min':>7}  {'median':>7}  {'imports':>7}")
+    for name, command, budgeted in COMMANDS:
+        times = run_times(command, args.runs)
+        total, imports = import_times(command)
+        fastest = min(times) * 1000
+        print(f"{name:<24}  {fastest:>5.1f}ms  {statistics.median(times) * 1000:>5.1f}ms  {total * 1000:>5.1f}ms")
+        for seconds, module in imports[:args.show_imports]:
+            print(f"{'':<26}{seconds * 1000:>5.1f}ms  {module}")
+        if budgeted and fastest > args.budget_ms:
+            over_budget.append(f"{name} ({fastest:.1f}ms)")
+
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:g}ms budget: {', '.join(over_budget)}")
+        return 1
+    print(f"\nAll --filename queries start within {args.budget_ms:g}ms")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
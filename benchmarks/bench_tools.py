@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vault tools on reproducible synthetic vaults.
+
+Every entry point is timed on vaults of each requested size, once with a cold
+page cache and a fresh index, and then warm. Cold runs evict the vault's files
+from the OS page cache with posix_fadvise(DONTNEED), so they need no root
+privileges. Results are written as JSON (with the git commit they were
+measured on) so runs on different commits can be compared with --compare.
+
+Usage:
+    python benchmarks/bench_tools.py --notes 1000 10000 --output results.json
+    python benchmarks/bench_tools.py --notes 1000 --compare baseline.json
+    python benchmarks/bench_tools.py --notes 100000 --vault-dir /tmp/bench-vaults
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+from find_duplicates import find_duplicates
+from find_tasks import find_tasks, update_tasks_with_scheduled_date
+from fix_sync_filenames import find_problematic_files
+from task_index import query_tasks
+from task_query import named_query
+from vault_generator import add_generator_arguments, generate_vault, generator_options
+from vault_index import VaultIndex
+from vault_query import run_query
+from vault_search import search_batch, search_by_filename, search_by_tag, search_content, search_indexed
+from vault_write import journal_path_for, undo_run
+
+REPO_DIR = Path(__file__).parent.parent
+
+# The lookups of the single-query benchmarks, answered as one --batch
+BATCH_QUERIES = [
+    {'id': 1, 'op': 'search', 'query': r"budget\s+client"},
+    {'id': 2, 'op': 'search', 'query': "weekly budget client"},
+    {'id': 3, 'op': 'tag', 'tag': "project"},
+    {'id': 4, 'op': 'filename', 'pattern': "note1"},
+    {'id': 5, 'op': 'tasks'},
+]
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def drop_page_cache(root):
+    """Evict every file under root from the OS page cache."""
+    os.sync()
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            try:
+                fd = os.open(os.path.join(dirpath, name), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+def prepare_vault(vault_dir, notes, options):
+    """Generate a vault, or reuse one generated earlier with the same options."""
+    vault_path = vault_dir / f"vault-{notes}-{options['seed']}"
+    marker = vault_path / ".bench-options.json"
+    expected = json.dumps(dict(options, notes=notes), sort_keys=True)
+    if marker.exists() and marker.read_text() == expected:
+        return vault_path, int((vault_path / ".bench-bytes").read_text())
+
+    if vault_path.exists():
+        shutil.rmtree(vault_path)
+    vault_path.mkdir(parents=True)
+    total = generate_vault(vault_path, notes, **options)
+    (vault_path / ".bench-bytes").write_text(str(total))
+    marker.write_text(expected)
+    return vault_path, total
+
+def benchmarks(vault_path, db_path, jobs):
+    """Return (name, setup, run, teardown) tuples for every benchmarked entry point.
+
+    `setup` returns the arguments for `run` and is not timed; `run` returns the
+    number of results so runs can be sanity-checked against each other.
+    `teardown` undoes any changes `run` made to the vault.
+    """
+    run_ids = []
+
+    def tasks_to_update():
+        with VaultIndex(vault_path, db_path) as index:
+            index.refresh(jobs)
+            return find_tasks(vault_path, index=index, query=named_query('all'))
+
+    def update(tasks):
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_id, updated = update_tasks_with_scheduled_date(tasks, "2030-01-01", vault_path)
+        run_ids.append(run_id)
+        return updated
+
+    def undo_updates():
+        with contextlib.redirect_stdout(io.StringIO()):
+            while run_ids:
+                undo_run(vault_path, run_ids.pop())
+
+    def nothing():
+        return None
+
+    def indexed(query):
+        # Opening and refreshing the index is part of every indexed query
+        def run(_):
+            with VaultIndex(vault_path, db_path) as index:
+                index.refresh(jobs)
+                return len(query(index))
+        return run
+
+    return [
+        ('search_content', nothing,
+         lambda _: len(list(search_content(vault_path, r"budget\s+client", jobs=jobs))), nothing),
+        ('search_indexed', nothing,
+         indexed(lambda index: list(search_indexed(vault_path, r"weekly budget client", jobs=jobs,
+                                                   index=index))), nothing),
+        ('search_batch', nothing,
+         lambda _: sum(map(len, search_batch(vault_path, BATCH_QUERIES, jobs).values())), nothing),
+        ('search_by_tag', nothing,
+         indexed(lambda index: search_by_tag(vault_path, "project", index=index)), nothing),
+        ('search_by_filename', nothing,
+         lambda _: len(list(search_by_filename(vault_path, "note1"))), nothing),
+        ('search_by_filename_fuzzy', nothing,
+         lambda _: len(search_by_filename(vault_path, "nt12", 'fuzzy', limit=20)), nothing),
+        ('run_query', nothing,
+         indexed(lambda index: run_query(vault_path, "created < 2024-03-01 SORT created LIMIT 20",
+                                         index=index)), nothing),
+        ('find_tasks', nothing,
+         indexed(lambda index: find_tasks(vault_path, index=index,
+                                          query=named_query('to-process'))), nothing),
+        ('task_index_due', nothing,
+         indexed(lambda index: query_tasks(vault_path, 'due', '2025-03-01..2025-03-31', index=index)),
+         nothing),
+        ('task_index_overdue', nothing,
+         indexed(lambda index: query_tasks(vault_path, 'overdue', index=index)), nothing),
+        ('find_problematic_files', nothing,
+         lambda _: len(find_problematic_files(vault_path, jobs)), nothing),
+        # The snapshot sits next to the index so cold runs start without it
+        ('find_duplicates', nothing,
+         lambda _: len(find_duplicates(vault_path, jobs=jobs,
+                                       snapshot_path=f"{db_path}-duplicates.snapshot")), nothing),
+        ('update_tasks_with_scheduled_date', tasks_to_update, update, undo_updates),
+    ]
+
+def run_benchmarks(vault_path, db_path, jobs, repeat):
+    """Time each entry point cold and then warm; returns result records."""
+    records = []
+    for name, setup, run, teardown in benchmarks(vault_path, db_path, jobs):
+        for cache in ('cold', 'warm'):
+            timings = []
+            for _ in range(1 if cache == 'cold' else repeat):
+                if cache == 'cold':
+                    for path in db_path.parent.glob(db_path.name + "*"):
+                        path.unlink()
+                args = setup()
+                if cache == 'cold':
+                    drop_page_cache(vault_path)
+                start = time.perf_counter()
+                items = run(args)
+                timings.append(time.perf_counter() - start)
+                teardown()
+            records.append({'tool': name, 'cache': cache, 'seconds': min(timings), 'items': items})
+            print(f"  {name:<34} {cache:<5} {min(timings):>9.3f}s  ({items} results)")
+    return records
+
+def compare(results, baseline):
+    """Print timings next to a baseline results file."""
+    old = {(r['notes'], r['tool'], r['cache']): r['seconds'] for r in baseline['results']}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('created')}):")
+    print(f"{'notes':>7}  {'tool':<34} {'cache':<5} {'before':>9}  {'after':>9}  {'change':>7}")
+    for r in results:
+        before = old.get((r['notes'], r['tool'], r['cache']))
+        if before is None:
+            continue
+        change = (r['seconds'] - before) / before * 100 if before else 0.0
+        print(f"{r['notes']:>7}  {r['tool']:<34} {r['cache']:<5} {before:>8.3f}s"
+              f"  {r['seconds']:>8.3f}s  {change:>+6.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vault tools")
+    parser.add_argument("--notes", type=int, nargs='+', default=[1000, 10000, 100000],
+                       help="Vault sizes to benchmark (default: 1000 10000 100000)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Worker processes for the tools (0 = all CPUs)")
+    parser.add_argument("--repeat", type=int, default=3,
+                       help="Warm runs per tool; the best time is kept (default: 3)")
+    parser.add_argument("--vault-dir", metavar="DIR",
+                       help="Keep generated vaults here and reuse them (default: a temp dir)")
+    parser.add_argument("--output", metavar="FILE",
+                       help="Write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE",
+                       help="Compare with the JSON results of an earlier run")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    options = generator_options(args)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        vault_dir = Path(args.vault_dir) if args.vault_dir else Path(tmp)
+        for notes in args.notes:
+            print(f"Preparing {notes} notes...")
+            vault_path, total = prepare_vault(vault_dir, notes, options)
+            print(f"{notes} notes, {total / 1e6:.1f} MB:")
+            try:
+                records = run_benchmarks(vault_path, Path(tmp) / f"index-{notes}.sqlite",
+                                         args.jobs, args.repeat)
+            finally:
+                shutil.rmtree(journal_path_for(vault_path, "").parent, ignore_errors=True)
+            for record in records:
+                results.append(dict(record, notes=notes, bytes=total))
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'jobs': args.jobs,
+        'generator': options,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark metadata queries (vault_query.py).
+
+Builds a column store of generated frontmatter, then reports the build and
+snapshot load times and the fastest and median time of each query against
+the loaded table, as the daemon answers them. Exits with status 1 if a
+query that returns a page of results (LIMIT) takes longer than the budget;
+queries returning every match are only reported, as they cost time in
+proportion to their results.
+
+Usage:
+    python benchmarks/bench_vault_query.py
+    python benchmarks/bench_vault_query.py --notes 200000 --runs 20 --budget-ms 20
+"""
+
+import argparse
+import marshal
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools"))
+
+from vault_query import MetadataTable, Query, file_fields
+
+STATUSES = ["active", "done", "waiting", "someday", "cancelled"]
+TAGS = ["project", "work/client", "work/internal", "home", "reading", "idea", "meeting"]
+
+QUERIES = [
+    "status = active AND due < 2026-11-01 SORT priority LIMIT 20",
+    "FROM #work AND \"Area 3\" WHERE priority >= 4 SORT due DESC LIMIT 20",
+    "NOT status = done AND rating > 4.5 SORT rating DESC, due LIMIT 20",
+    "owner contains Ana LIMIT 20",
+    "FROM \"Area 3\" GROUP BY status",
+    "status = waiting AND due < 2026-01-01",
+    "status = active SORT due",
+]
+
+def generate_rows(count, seed=0):
+    """Yield (path, version, fields) rows of generated notes, most with frontmatter."""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    for i in range(count):
+        path = f"Area {rng.randrange(20)}/note {i}.md"
+        tags = rng.sample(TAGS, rng.randrange(4))
+        fields = []
+        if rng.random() < 0.8:
+            fields += [
+                ("status", rng.choice(STATUSES)),
+                ("priority", rng.randint(1, 5)),
+                ("due", (start + timedelta(days=rng.randrange(730))).isoformat()),
+                ("tags", tuple(tags)),
+            ]
+            if rng.random() < 0.3:
+                fields += [("rating", round(rng.uniform(1, 5), 1)), ("owner", f"Ana {rng.randrange(100)}")]
+        fields += file_fields(path, tags)
+        yield path, (1_700_000_000_000_000_000 + i * 10**9, str(i)), fields
+
+def time_call(func):
+    """Return (result, wall-clock time in seconds) of a call."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata queries")
+    parser.add_argument("--notes", type=int, default=100000,
+                       help="Number of notes to generate (default: 100000)")
+    parser.add_argument("--runs", type=int, default=10,
+                       help="Runs per query (default: 10)")
+    parser.add_argument("--budget-ms", type=float, default=20,
+                       help="Budget for LIMIT queries in ms (default: 20)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.notes} notes...")
+    # In path order, as a table built from the vault index is
+    rows = sorted(generate_rows(args.notes))
+    table = MetadataTable()
+
+    def build():
+        for row in rows:
+            table.set_row(*row)
+
+    _, build_time = time_call(build)
+    data = marshal.dumps(table.state)
+    _, load_time = time_call(lambda: MetadataTable(marshal.loads(data)))
+    print(f"{len(table)} notes, {len(table.columns)} fields: build {build_time * 1000:.0f}ms,"
+          f" snapshot {len(data) / 1e6:.1f}MB loaded in {load_time * 1000:.1f}ms")
+
+    over_budget = []
+    print(f"\n{'min':>7}  {'median':>7}  {'results':>7}  query")
+    for text in QUERIES:
+        query = Query(text, today=date(2026, 1, 1))
+        times = []
+        for _ in range(args.runs):
+            results, seconds = time_call(lambda: table.query(query))
+            times.append(seconds)
+        fastest = min(times) * 1000
+        print(f"{fastest:>5.1f}ms  {statistics.median(times) * 1000:>5.1f}ms  {len(results):>7}  {text}")
+        if query.limit and not query.group and fastest > args.budget_ms:
+            over_budget.append(f"{text!r} ({fastest:.1f}ms)")
+
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:g}ms budget: {', '.join(over_budget)}")
+        return 1
+    print(f"\nAll LIMIT queries answered within {args.budget_ms:g}ms")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Reproducible synthetic Obsidian vault generator for benchmarks.
+
+The same seed and options always produce the same vault. Note sizes follow a
+log-normal distribution (most notes are short, a few are very long), and the
+share of notes with frontmatter, the share of task lines, the number of
+distinct tags and the share of filenames with sync-problematic characters are
+all configurable.
+
+Usage:
+    python benchmarks/vault_generator.py /tmp/vault --notes 10000
+    python benchmarks/vault_generator.py /tmp/vault --notes 1000 --task-density 0.3 --tags 500
+"""
+
+import argparse
+import math
+import random
+from pathlib import Path
+
+WORDS = ("alpha beta gamma delta project meeting note idea review draft "
+         "research summary weekly plan budget client design release").split()
+
+# Characters fix_sync_filenames.py flags that are valid in Linux filenames
+PROBLEMATIC_NAME_CHARS = '\\:*?"<>|'
+
+CONTEXTS = ("@pc", "@work", "@home", "@out", "@someday")
+
+def random_date(rng):
+    """Return a random YYYY-MM-DD date string in 2024-2025."""
+    return f"{rng.choice((2024, 2025))}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+def note_name(rng, i, problematic_ratio):
+    """Return a note filename, sometimes with characters that break syncing."""
+    name = f"note{i}"
+    if rng.random() < problematic_ratio:
+        name = f"{name} {rng.choice(PROBLEMATIC_NAME_CHARS)} {rng.choice(WORDS)}"
+    return f"{name}.md"
+
+def task_line(rng):
+    """Return a random task line with some Obsidian Tasks metadata."""
+    parts = ["- [x]" if rng.random() < 0.2 else "- [ ]", rng.choice(WORDS), "task"]
+    if rng.random() < 0.2:
+        parts.append(rng.choice(CONTEXTS))
+    if rng.random() < 0.4:
+        parts.append(f"📅 {random_date(rng)}")
+    if rng.random() < 0.2:
+        parts.append(f"⏳ {random_date(rng)}")
+    return " ".join(parts)
+
+def note_text(rng, lines, tag_names, frontmatter_ratio, task_density):
+    """Return the markdown text of one synthetic note."""
+    out = []
+    if rng.random() < frontmatter_ratio:
+        tags = ", ".join(rng.sample(tag_names, min(3, len(tag_names))))
+        out += ["---", f"tags: [{tags}]", f"created: {random_date(rng)}", "---"]
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < task_density:
+            out.append(task_line(rng))
+        elif roll < task_density + 0.02:
+            out.append(f"Related to #{rng.choice(tag_names)}")
+        else:
+            out.append(" ".join(rng.choice(WORDS) for _ in range(12)))
+    return "\n".join(out) + "\n"
+
+def generate_vault(root, notes, seed=0, mean_lines=60, size_sigma=1.0, frontmatter_ratio=0.7,
+                   task_density=0.1, tags=50, problematic_ratio=0.01, folders=50):
+    """Write a synthetic vault of `notes` markdown notes under root.
+
+    Note length in lines is log-normal with median `mean_lines` and shape
+    `size_sigma`. Returns the total number of bytes written.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    tag_names = [f"{WORDS[i % len(WORDS)]}/{i}" if i >= len(WORDS) else WORDS[i]
+                 for i in range(tags)]
+    total = 0
+    for i in range(notes):
+        folder = root / f"folder{i % folders}"
+        folder.mkdir(parents=True, exist_ok=True)
+        lines = max(1, int(rng.lognormvariate(math.log(mean_lines), size_sigma)))
+        data = note_text(rng, lines, tag_names, frontmatter_ratio, task_density).encode('utf-8')
+        (folder / note_name(rng, i, problematic_ratio)).write_bytes(data)
+        total += len(data)
+
+    # Settings folder that every tool is expected to skip
+    (root / ".obsidian").mkdir(exist_ok=True)
+    (root / ".obsidian" / "app.json").write_text("{}", encoding='utf-8')
+    return total
+
+def add_generator_arguments(parser):
+    """Add the generator options to an argparse parser."""
+    parser.add_argument("--seed", type=int, default=0,
+                       help="Random seed (default: 0)")
+    parser.add_argument("--mean-lines", type=int, default=60,
+                       help="Median note length in lines (default: 60)")
+    parser.add_argument("--size-sigma", type=float, default=1.0,
+                       help="Spread of the log-normal note size distribution (default: 1.0)")
+    parser.add_argument("--frontmatter-ratio", type=float, default=0.7,
+                       help="Share of notes with frontmatter (default: 0.7)")
+    parser.add_argument("--task-density", type=float, default=0.1,
+                       help="Share of lines that are tasks (default: 0.1)")
+    parser.add_argument("--tags", type=int, default=50,
+                       help="Number of distinct tags (default: 50)")
+    parser.add_argument("--problematic-ratio", type=float, default=0.01,
+                       help="Share of filenames with sync-problematic characters (default: 0.01)")
+
+def generator_options(args):
+    """Return the generate_vault() keyword arguments from parsed arguments."""
+    return {
+        'seed': args.seed,
+        'mean_lines': args.mean_lines,
+        'size_sigma': args.size_sigma,
+        'frontmatter_ratio': args.frontmatter_ratio,
+        'task_density': args.task_density,
+        'tags': args.tags,
+        'problematic_ratio': args.problematic_ratio,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Obsidian vault")
+    parser.add_argument("path", help="Directory to create the vault in")
+    parser.add_argument("--notes", type=int, default=1000,
+                       help="Number of notes (default: 1000)")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    total = generate_vault(Path(args.path), args.notes, **generator_options(args))
+    print(f"Wrote {args.notes} notes ({total / 1e6:.1f} MB) to {args.path}")
+
+if __name__ == "__main__":
+    main()
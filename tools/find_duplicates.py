@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Find duplicate and near-duplicate notes.
+
+Every note is read once to compute two things: a blake2b hash of its bytes,
+which groups exact duplicates, and a MinHash signature of the 5-word
+shingles of its body (frontmatter is left out, words are lowercased), which
+estimates how much text two notes share (their Jaccard similarity). The
+signatures use one-permutation hashing: each shingle is hashed once and
+falls into one of 128 bins by the top bits of its hash, and a bin keeps its
+smallest hash. Empty bins borrow from the next filled bin, so short notes
+still have full signatures.
+
+Near duplicates are found without comparing every pair of notes: the
+signature is cut into 32 bands of 4 bins, and only notes that agree on a
+whole band are compared (locality-sensitive hashing). Pairs whose
+signatures agree on at least --threshold of their bins are joined into
+clusters. Pairs above 0.6 similarity are compared almost always, pairs
+below 0.2 rarely.
+
+Syncthing conflict copies (Note.sync-conflict-20250101-120000-ABCDEFG.md)
+are listed with the note they conflict with and how similar the two are,
+instead of in the clusters.
+
+Hashes and signatures are cached in .obsidian-cli/ and a note is only read
+again when its mtime or size changed. Notes without any words are skipped,
+and notes shorter than --min-words are left out of near-duplicate clusters.
+
+Usage:
+    python tools/find_duplicates.py
+    python tools/find_duplicates.py --threshold 0.6 --min-words 50
+    python tools/find_duplicates.py --exact --json
+"""
+
+import argparse
+import json
+import marshal
+import operator
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import compress, repeat
+from pathlib import Path
+from zlib import crc32
+
+import vault_profile
+import vault_scan
+from frontmatter import split_frontmatter
+from vault_config import STATE_DIR, load_config, vault_key
+from vault_index import new_hasher
+from vault_scan import iter_note_entries, map_files, read_ahead
+
+# Bump when the snapshot layout or the signature parameters change
+SNAPSHOT_VERSION = 1
+
+SHINGLE_WORDS = 5
+NUM_BINS = 128
+BANDS = 32
+SIGNATURE_BYTES = NUM_BINS * 4
+BAND_BYTES = SIGNATURE_BYTES // BANDS
+BAND_SLICES = [slice(start, start + BAND_BYTES) for start in range(0, SIGNATURE_BYTES, BAND_BYTES)]
+HASH_BYTES = 16
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MIN_WORDS = 20
+
+WORD_PATTERN = re.compile(r'\w+')
+CONFLICT_PATTERN = re.compile(r'\.sync-conflict-\d{8}-\d{6}(?:-[0-9A-Z]+)?(?=\.[^./]*$|$)')
+
+# Shingle hashes are crc32s; the top bits pick the bin
+HASH_MASK = 0xFFFFFFFF
+BIN_SHIFT = 32 - (NUM_BINS - 1).bit_length()
+BIN_STARTS = [index << BIN_SHIFT for index in range(NUM_BINS)]
+# Added per bin of distance when an empty bin borrows a value
+DENSIFY_STEP = 0x61C88647
+
+# Hash, word count, signature and band keys of every note, as columns
+Signatures = namedtuple('Signatures', ['paths', 'stamps', 'hashes', 'words', 'signatures', 'bands'])
+
+def conflict_original(rel_path):
+    """Return the path of the note a sync-conflict copy belongs to, or None."""
+    original, count = CONFLICT_PATTERN.subn('', rel_path, count=1)
+    return original if count else None
+
+def minhash(words):
+    """Return the signature of a list of words as array('I') bytes."""
+    if len(words) >= SHINGLE_WORDS:
+        shingles = map(' '.join, zip(*(words[i:] for i in range(SHINGLE_WORDS))))
+    else:
+        shingles = [' '.join(words)]
+    hashes = sorted(map(crc32, map(str.encode, shingles)))
+
+    # A bin's smallest hash is the first one at or after the bin's start
+    starts = list(map(bisect_left, repeat(hashes), BIN_STARTS))
+    starts.append(len(hashes))
+    values = [hashes[start] if start < end else None for start, end in zip(starts, starts[1:])]
+    if None in values:
+        # Empty bins take the value of the next filled bin (wrapping around),
+        # offset by the distance to it
+        filled = next(index for index, value in enumerate(values) if value is not None) + NUM_BINS
+        for index in range(NUM_BINS - 1, -1, -1):
+            if values[index] is None:
+                values[index] = (values[filled % NUM_BINS] + (filled - index) * DENSIFY_STEP) & HASH_MASK
+            else:
+                filled = index
+    return array('I', values).tobytes()
+
+def similarity(signature, other):
+    """Estimate the Jaccard similarity of two notes from their signatures."""
+    a, b = memoryview(signature).cast('I'), memoryview(other).cast('I')
+    return sum(map(operator.eq, a, b)) / NUM_BINS
+
+def band_keys(signature):
+    """Return a crc32 of each band of a signature as array('I') bytes."""
+    return array('I', map(crc32, map(signature.__getitem__, BAND_SLICES))).tobytes()
+
+def note_signature(path, data=None):
+    """Read a note and return (hash, word count, signature, error); runs in scan workers.
+
+    `data` is the note's content when it was already read (see read_ahead).
+    """
+    try:
+        with vault_profile.phase('hash'):
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                vault_profile.count('bytes read', len(data))
+            hasher = new_hasher()
+            hasher.update(data)
+            _frontmatter, body, _start = split_frontmatter(data.decode('utf-8', 'replace'))
+            words = WORD_PATTERN.findall(body.lower())
+            signature = minhash(words) if words else bytes(SIGNATURE_BYTES)
+        vault_profile.count('files parsed')
+        return hasher.digest(), len(words), signature, None
+    except Exception as e:
+        return None, 0, b'', str(e)
+
+def snapshot_path_for(vault_path):
+    """Return the signature snapshot location for a vault."""
+    return STATE_DIR / f"duplicates-{vault_key(vault_path)}.snapshot"
+
+def _split(data, size):
+    """Cut bytes into a list of `size`-byte pieces."""
+    return list(map(data.__getitem__, map(slice, range(0, len(data), size),
+                                          range(size, len(data) + size, size))))
+
+def load_signatures(snapshot_path):
+    """Return the Signatures saved by the last run, or empty ones."""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            version, paths, mtimes, sizes, hashes, words, signatures, bands = marshal.load(f)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError("old snapshot layout")
+        return Signatures(paths.split('\n') if paths else [],
+                          list(zip(array('q', mtimes), array('q', sizes))),
+                          _split(hashes, HASH_BYTES), array('I', words),
+                          _split(signatures, SIGNATURE_BYTES), _split(bands, BANDS * 4))
+    except (OSError, EOFError, ValueError, TypeError):
+        return Signatures([], [], [], array('I'), [], [])
+
+def save_signatures(snapshot_path, notes):
+    """Write the snapshot atomically; skipped if it can't be stored."""
+    # One string or bytes object per column, which loads much faster than
+    # a tuple per note
+    snapshot = (SNAPSHOT_VERSION, '\n'.join(notes.paths),
+                array('q', [mtime for mtime, _size in notes.stamps]).tobytes(),
+                array('q', [size for _mtime, size in notes.stamps]).tobytes(),
+                b''.join(notes.hashes), notes.words.tobytes(), b''.join(notes.signatures),
+                b''.join(notes.bands))
+    temp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            marshal.dump(snapshot, f)
+        os.replace(temp_path, snapshot_path)
+    except OSError:
+        pass
+
+def refresh_signatures(vault_path, jobs=1, snapshot_path=None):
+    """Return the Signatures of every note, reading only notes that changed.
+
+    Changed notes are read across `jobs` worker processes, or through the
+    async read pipeline for remote vaults (remote_reads).
+    """
+    snapshot_path = Path(snapshot_path) if snapshot_path else snapshot_path_for(vault_path)
+    cached = load_signatures(snapshot_path)
+    cached_rows = dict(zip(cached.paths, range(len(cached.paths))))
+    # (path, stamp, row in the snapshot or None) of every note
+    rows = []
+    changed = []
+    for rel_path, entry in iter_note_entries(vault_path):
+        try:
+            with vault_profile.phase('stat'):
+                st = entry.stat()
+        except OSError as e:
+            print(f"Error reading {entry.path}: {e}", file=sys.stderr)
+            continue
+        stamp = (st.st_mtime_ns, st.st_size)
+        row = cached_rows.get(rel_path)
+        if row is not None and cached.stamps[row] == stamp:
+            vault_profile.count('cache hits')
+        else:
+            row = None
+            changed.append(len(rows))
+        rows.append((rel_path, stamp, row))
+
+    if not changed and len(rows) == len(cached.paths):
+        return cached
+
+    paths = [Path(vault_path) / rows[index][0] for index in changed]
+    if vault_scan.remote_reads:
+        loaded = ((path, (None, 0, b'', str(error)) if error else note_signature(path, data))
+                  for path, data, error in read_ahead(paths))
+    else:
+        loaded = map_files(note_signature, paths, jobs)
+    signed = {}
+    for index, (path, (digest, words, signature, error)) in zip(changed, loaded):
+        if error:
+            print(f"Error reading {path}: {error}", file=sys.stderr)
+            continue
+        signed[index] = (digest, words, signature, band_keys(signature))
+
+    notes = Signatures([], [], [], array('I'), [], [])
+    for index, (rel_path, stamp, row) in enumerate(rows):
+        if row is not None:
+            note = (cached.hashes[row], cached.words[row], cached.signatures[row], cached.bands[row])
+        elif index in signed:
+            note = signed[index]
+        else:
+            continue
+        notes.paths.append(rel_path)
+        notes.stamps.append(stamp)
+        for column, value in zip(notes[2:], note):
+            column.append(value)
+
+    save_signatures(snapshot_path, notes)
+    return notes
+
+def _find(parents, item):
+    """Return the root of an item in a union-find forest, halving paths on the way."""
+    while parents[item] != item:
+        parents[item] = parents[parents[item]]
+        item = parents[item]
+    return item
+
+def near_duplicate_clusters(signatures, bands, threshold):
+    """Group signatures into clusters of near duplicates.
+
+    `bands` are the band keys of the signatures. Returns lists of indexes
+    into `signatures`. Only notes that agree on a whole band of bins are
+    compared: within a band, each note is compared with the last note
+    sharing its band, so a big bucket costs one comparison per note and its
+    clusters are joined through that note.
+    """
+    count = len(signatures)
+    keys = array('I', b''.join(bands))
+    parents = list(range(count))
+    compared = set()
+    for band in range(BANDS):
+        column = keys[band::BANDS]
+        last = dict(zip(column, range(count)))
+        if len(last) == count:
+            continue  # No two notes agree on this band
+        last = list(map(last.__getitem__, column))
+        for index in compress(range(count), map(operator.ne, last, range(count))):
+            pair = (index, last[index])
+            if pair in compared:
+                continue
+            compared.add(pair)
+            if similarity(signatures[index], signatures[pair[1]]) >= threshold:
+                parents[_find(parents, index)] = _find(parents, pair[1])
+
+    clusters = {}
+    for index in range(count):
+        clusters.setdefault(_find(parents, index), []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+def find_duplicates(vault_path, threshold=DEFAULT_THRESHOLD, min_words=DEFAULT_MIN_WORDS,
+                    exact_only=False, jobs=1, snapshot_path=None):
+    """Return the duplicate clusters and sync-conflict copies of a vault.
+
+    Results are dicts: {'kind': 'exact', 'paths', 'size'} for notes with the
+    same bytes, {'kind': 'near', 'paths', 'similarity'} for near duplicates
+    (each path's similarity to the first one), and {'kind': 'conflict',
+    'path', 'original', 'identical', 'similarity'} for sync-conflict copies,
+    with original None when the note they belong to is gone.
+    """
+    notes = refresh_signatures(vault_path, jobs, snapshot_path)
+    rows = dict(zip(notes.paths, range(len(notes.paths))))
+    results = []
+
+    with vault_profile.phase('cluster'):
+        conflicts = []
+        by_hash = {}
+        for rel_path in sorted(notes.paths):
+            row = rows[rel_path]
+            original = conflict_original(rel_path)
+            if original is not None:
+                conflicts.append((row, rows.get(original)))
+            elif notes.words[row]:
+                by_hash.setdefault(notes.hashes[row], []).append(row)
+
+        for group in by_hash.values():
+            if len(group) > 1:
+                results.append({'kind': 'exact', 'paths': [notes.paths[row] for row in group],
+                                'size': notes.stamps[group[0]][1]})
+
+        if not exact_only:
+            # One signature per distinct content; identical notes join its cluster
+            groups = [group for group in by_hash.values() if notes.words[group[0]] >= min_words]
+            signatures = [notes.signatures[group[0]] for group in groups]
+            bands = [notes.bands[group[0]] for group in groups]
+            for members in near_duplicate_clusters(signatures, bands, threshold):
+                members.sort(key=lambda index: notes.paths[groups[index][0]])
+                first = signatures[members[0]]
+                paths, similarities = [], []
+                for index in members:
+                    score = round(similarity(first, signatures[index]), 2)
+                    paths += [notes.paths[row] for row in groups[index]]
+                    similarities += [score] * len(groups[index])
+                results.append({'kind': 'near', 'paths': paths, 'similarity': similarities})
+
+        for row, original in conflicts:
+            identical, score = False, None
+            if original is not None:
+                identical = notes.hashes[row] == notes.hashes[original]
+                if notes.words[row] and notes.words[original]:
+                    score = round(similarity(notes.signatures[original], notes.signatures[row]), 2)
+            results.append({'kind': 'conflict', 'path': notes.paths[row],
+                            'original': None if original is None else notes.paths[original],
+                            'identical': identical, 'similarity': score})
+
+    kinds = {'exact': 0, 'near': 1, 'conflict': 2}
+    results.sort(key=lambda result: (kinds[result['kind']], -len(result.get('paths', ())),
+                                     result.get('paths', [result.get('path')])[0]))
+    return results
+
+def print_result(result):
+    """Print one cluster or conflict copy."""
+    if result['kind'] == 'exact':
+        print(f"\nIdentical ({len(result['paths'])} notes, {result['size']} bytes each)")
+        for path in result['paths']:
+            print(f"  {path}")
+    elif result['kind'] == 'near':
+        print(f"\nSimilar ({len(result['paths'])} notes)")
+        for path, score in zip(result['paths'], result['similarity']):
+            print(f"  {path}  ({score:.0%})")
+    else:
+        if result['original'] is None:
+            details = "original is gone"
+        elif result['identical']:
+            details = "identical to the original"
+        elif result['similarity'] is None:
+            details = "no text to compare"
+        else:
+            details = f"{result['similarity']:.0%} similar to the original"
+        print(f"\nSync conflict: {result['path']}  ({details})")
+        if result['original']:
+            print(f"  {result['original']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate notes")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help=f"Similarity for near duplicates, 0-1 (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--min-words", type=int, default=DEFAULT_MIN_WORDS, metavar="N",
+                       help=f"Leave notes shorter than N words out of near duplicates (default: {DEFAULT_MIN_WORDS})")
+    parser.add_argument("--exact", action="store_true",
+                       help="Only find identical notes and sync conflicts")
+    parser.add_argument("--json", action="store_true",
+                       help="Emit one JSON object per cluster or conflict copy (NDJSON)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Read changed notes with N worker processes (0 = all CPUs)")
+    vault_profile.add_arguments(parser)
+
+    args = parser.parse_args()
+    if not 0 < args.threshold <= 1:
+        print("Error: --threshold must be between 0 and 1")
+        return 1
+
+    vault_path = load_config()
+    if not vault_path.exists():
+        print(f"ERROR: Vault path not found: {vault_path}")
+        print("Please check your config.yaml")
+        return 1
+
+    with vault_profile.session("find_duplicates", args):
+        results = find_duplicates(vault_path, args.threshold, args.min_words, args.exact, args.jobs)
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        else:
+            print_result(result)
+
+    if not args.json:
+        clusters = sum(result['kind'] != 'conflict' for result in results)
+        print(f"\nFound {clusters} duplicate clusters and {len(results) - clusters} sync conflicts")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -5,226 +5,177 @@ Find tasks in Obsidian vault matching "To Process" criteria.
 Usage:
     python tools/find_tasks.py
     python tools/find_tasks.py --query "to-process"
+    python tools/find_tasks.py --filter "not done, due before today, path does not include Templates"
     python tools/find_tasks.py --set-scheduled 2025-12-22
+    python tools/find_tasks.py --undo 20251222-093000-1a2b
 """
 
 import argparse
 import re
 from pathlib import Path
 from datetime import datetime, date
-import yaml
-import shutil
-
-def load_config():
-    """Load configuration to find vault path."""
-    config_path = Path(__file__).parent.parent / "config.yaml"
-    with open(config_path) as f:
-        config = yaml.safe_load(f)
-
-    vault_path = Path(__file__).parent.parent / config['vault_path']
-    return vault_path.resolve()
-
-def parse_task_line(line, line_num):
-    """Parse a task line and extract metadata."""
-    # Basic task pattern: - [ ] or - [x]
-    task_match = re.match(r'^(\s*)- \[(.)\]\s+(.*)$', line)
-    if not task_match:
-        return None
 
-    indent, status, description = task_match.groups()
-    is_done = status.lower() != ' '
+import vault_daemon
+import vault_profile
+from task_query import QueryError, TaskQuery, named_query, parse_task_line, query_names
+from vault_config import load_config, read_config
+from vault_index import use_index
 
-    # Extract Obsidian Tasks metadata
-    due_date = None
-    scheduled_date = None
+SCHEDULED_PATTERN = re.compile(r'⏳\s*\d{4}-\d{2}-\d{2}')
+TASK_LINE_PATTERN = re.compile(r'^(\s*- \[.\]\s+)(.*)$')
 
-    # Due date: 📅 YYYY-MM-DD or 📆 YYYY-MM-DD
-    due_match = re.search(r'[📅📆]\s*(\d{4}-\d{2}-\d{2})', description)
-    if due_match:
-        try:
-            due_date = datetime.strptime(due_match.group(1), '%Y-%m-%d').date()
-        except:
-            pass
+def find_tasks(vault_path, query_type='to-process', jobs=1, index=None, query=None):
+    """Find tasks in vault.
 
-    # Scheduled date: ⏳ YYYY-MM-DD
-    sched_match = re.search(r'⏳\s*(\d{4}-\d{2}-\d{2})', description)
-    if sched_match:
-        try:
-            scheduled_date = datetime.strptime(sched_match.group(1), '%Y-%m-%d').date()
-        except:
-            pass
-
-    # Check for blocking (tasks with dependencies)
-    is_blocked = '⛔' in description or '🔁' in description
-
-    return {
-        'line_num': line_num,
-        'description': description.strip(),
-        'is_done': is_done,
-        'due_date': due_date,
-        'scheduled_date': scheduled_date,
-        'is_blocked': is_blocked,
-        'indent': len(indent)
-    }
-
-def matches_to_process_criteria(task, file_path):
-    """Check if task matches 'To Process' criteria."""
-    desc = task['description']
-    path_str = str(file_path)
-
-    # Exclusion: description includes context tags
-    excluded_tags = ['@pc', '@work', '@home', '@partner', '@out',
-                     '@garden', '@someday', '@ai', '@ponderables', '@stuck']
-    for tag in excluded_tags:
-        if tag in desc:
-            return False
-
-    # Exclusion: time range pattern (HH:MM - HH:MM)
-    if re.match(r'^\d{2}:\d{2}\s*-\s*\d{2}:\d{2}', desc):
-        return False
-
-    # Exclusion: empty description
-    if re.match(r'^$', desc):
-        return False
-
-    # Exclusion: path includes certain folders
-    excluded_paths = ['Checklist', 'Templates', 'Recurring', 'obsidian-tasks']
-    for excluded in excluded_paths:
-        if excluded in path_str:
-            return False
-
-    # Date filters: (no due date) OR (due before today)
-    today = date.today()
-    if task['due_date'] is not None and task['due_date'] >= today:
-        return False
-
-    # Date filters: (no scheduled date) OR (scheduled before today)
-    if task['scheduled_date'] is not None and task['scheduled_date'] >= today:
-        return False
-
-    # Status filters
-    if task['is_blocked']:
-        return False
-
-    if task['is_done']:
-        return False
-
-    return True
-
-def find_tasks(vault_path, query_type='to-process'):
-    """Find tasks in vault."""
-    tasks = []
+    `query` is a compiled TaskQuery; by default the named query `query_type`
+    is loaded from config.yaml (or the built-in definitions).
+    """
+    if query is None:
+        query = named_query(query_type, read_config())
 
-    for md_file in vault_path.rglob("*.md"):
-        # Skip .obsidian folder
-        if ".obsidian" in md_file.parts:
-            continue
+    tasks = []
 
-        try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            for line_num, line in enumerate(lines, 1):
-                task = parse_task_line(line, line_num)
-                if not task:
-                    continue
-
-                # Apply query filter
-                if query_type == 'to-process':
-                    if not matches_to_process_criteria(task, md_file):
-                        continue
-                elif query_type == 'all':
-                    if task['is_done']:
-                        continue
-
-                tasks.append({
-                    'file': md_file,
-                    'file_relative': md_file.relative_to(vault_path),
-                    'line_num': line_num,
-                    'description': task['description'],
-                    'due_date': task['due_date'],
-                    'scheduled_date': task['scheduled_date']
-                })
-
-        except Exception as e:
-            print(f"Error reading {md_file}: {e}")
+    with use_index(vault_path, index, jobs) as index:
+        task_lines = list(index.iter_task_lines())
+
+    vault_profile.count('task lines evaluated', len(task_lines))
+    with vault_profile.phase('query'):
+        current_file = None
+        path_matches = False
+        for file_relative, line_num, _offset, line in task_lines:
+            # Path filters only need to run once per note
+            if file_relative != current_file:
+                current_file = file_relative
+                path_matches = query.matches_path(file_relative.as_posix())
+            if not path_matches:
+                continue
+
+            task = parse_task_line(line, line_num)
+            if not task or not query.matches(task):
+                continue
+
+            tasks.append({
+                'file': vault_path / file_relative,
+                'file_relative': file_relative,
+                'line_num': line_num,
+                'line': line,
+                'description': task['description'],
+                'due_date': task['due_date'],
+                'scheduled_date': task['scheduled_date']
+            })
 
     # Sort by path reverse (as specified)
     tasks.sort(key=lambda x: str(x['file_relative']), reverse=True)
 
     return tasks
 
+def request_tasks(vault_path, query_type='to-process', query_text=None):
+    """Fetch tasks from the vault daemon, or return None if it is not running."""
+    tasks = vault_daemon.request(vault_path, {'op': 'tasks', 'query': query_type,
+                                              'filter': query_text})
+    if tasks is None:
+        return None
+
+    for task in tasks:
+        task['file_relative'] = Path(task['file_relative'])
+        task['file'] = vault_path / task['file_relative']
+        for key in ('due_date', 'scheduled_date'):
+            if task[key]:
+                task[key] = date.fromisoformat(task[key])
+    return tasks
+
 def add_scheduled_date_to_task(description, scheduled_date):
     """Add or update scheduled date in task description."""
     # Remove existing scheduled date if present
-    description = re.sub(r'⏳\s*\d{4}-\d{2}-\d{2}', '', description).strip()
+    description = SCHEDULED_PATTERN.sub('', description).strip()
 
     # Add new scheduled date at the end
     return f"{description} ⏳ {scheduled_date}"
 
-def update_tasks_with_scheduled_date(tasks, scheduled_date_str, vault_path, create_backup=True):
-    """Update tasks with a scheduled date."""
-    # Group tasks by file
-    tasks_by_file = {}
-    for task in tasks:
-        file_path = task['file']
-        if file_path not in tasks_by_file:
-            tasks_by_file[file_path] = []
-        tasks_by_file[file_path].append(task)
-
-    updated_count = 0
-
-    for file_path, file_tasks in tasks_by_file.items():
-        try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            # Create backup if requested
-            if create_backup:
-                backup_path = file_path.with_suffix('.md.bak')
-                shutil.copy2(file_path, backup_path)
-
-            # Update tasks (reverse order to preserve line numbers)
-            for task in sorted(file_tasks, key=lambda t: t['line_num'], reverse=True):
-                line_idx = task['line_num'] - 1
-                original_line = lines[line_idx]
-
-                # Parse the task line to get structure
-                task_match = re.match(r'^(\s*- \[.\]\s+)(.*)$', original_line)
-                if task_match:
-                    prefix, description = task_match.groups()
-                    new_description = add_scheduled_date_to_task(description.rstrip(), scheduled_date_str)
-                    lines[line_idx] = f"{prefix}{new_description}\n"
-                    updated_count += 1
-
-            # Write back
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
+def update_tasks_with_scheduled_date(tasks, scheduled_date_str, vault_path, journal=True):
+    """Update tasks with a scheduled date.
 
-            print(f"Updated {len(file_tasks)} task(s) in {file_path.relative_to(vault_path)}")
-
-        except Exception as e:
-            print(f"Error updating {file_path}: {e}")
-
-    return updated_count
+    Every note is rewritten atomically, once, and only if its task lines still
+    match the indexed text. Returns (run id for --undo or None, updated count).
+    """
+    edits = []
+    for task in tasks:
+        # Parse the task line to get structure
+        task_match = TASK_LINE_PATTERN.match(task['line'])
+        if task_match:
+            prefix, description = task_match.groups()
+            new_description = add_scheduled_date_to_task(description.rstrip(), scheduled_date_str)
+            edits.append({
+                'path': task['file_relative'],
+                'line_num': task['line_num'],
+                'old': task['line'],
+                'new': f"{prefix}{new_description}",
+            })
+
+    # Imported here: only runs that write notes need the journal
+    from vault_write import apply_line_edits
+    return apply_line_edits(vault_path, edits, journal)
 
 def main():
     parser = argparse.ArgumentParser(description="Find tasks in Obsidian vault")
     parser.add_argument("--query", default="to-process",
-                       choices=['to-process', 'all'],
-                       help="Query type (default: to-process)")
+                       help="Named query from config.yaml or built in (default: to-process)")
+    parser.add_argument("--filter", metavar="QUERY",
+                       help="Ad-hoc query, e.g. \"not done, due before today\" (overrides --query)")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="Show detailed task information")
     parser.add_argument("--set-scheduled", metavar="DATE",
                        help="Set scheduled date on found tasks (format: YYYY-MM-DD)")
     parser.add_argument("--no-backup", action="store_true",
-                       help="Don't create backup files when updating tasks")
+                       help="Don't record an undo journal when updating tasks")
+    parser.add_argument("--undo", metavar="RUN_ID",
+                       help="Revert the task updates made by an earlier --set-scheduled run")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Scan with N worker processes (0 = all CPUs)")
+    parser.add_argument("--no-daemon", action="store_true",
+                       help="Scan the vault directly even if the daemon is running")
+    vault_profile.add_arguments(parser)
 
     args = parser.parse_args()
 
+    with vault_profile.session("find_tasks", args):
+        run_find_tasks(args)
+
+def run_find_tasks(args):
+    """Find, show or update tasks as described by the parsed command line."""
     vault_path = load_config()
-    tasks = find_tasks(vault_path, args.query)
+    config = read_config()
+
+    if args.undo:
+        # Imported here: the journal is only needed to write or undo
+        from vault_write import list_runs, undo_run
+        try:
+            restored = undo_run(vault_path, args.undo)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            runs = list_runs(vault_path)
+            if runs:
+                print(f"Runs that can be undone: {', '.join(runs)}")
+            return
+        print()
+        print(f"Restored {restored} tasks from run {args.undo}")
+        return
+
+    # Checked here rather than with argparse choices, so --help works
+    # without a readable config.yaml
+    if not args.filter and args.query not in query_names(config):
+        print(f"Error: Unknown query '{args.query}' (choose from {', '.join(query_names(config))})")
+        return
+
+    try:
+        query = TaskQuery(args.filter) if args.filter else named_query(args.query, config)
+    except (QueryError, re.error) as e:
+        print(f"Error: Invalid task query: {e}")
+        return
+
+    tasks = None if args.no_daemon else request_tasks(vault_path, args.query, args.filter)
+    if tasks is None:
+        tasks = find_tasks(vault_path, args.query, args.jobs, query=query)
 
     print(f"Found {len(tasks)} tasks:")
     print()
@@ -241,37 +192,38 @@ def main():
         print(f"Setting scheduled date to {args.set_scheduled} for {len(tasks)} tasks...")
         print()
 
-        updated = update_tasks_with_scheduled_date(
+        run_id, updated = update_tasks_with_scheduled_date(
             tasks,
             args.set_scheduled,
             vault_path,
-            create_backup=not args.no_backup
+            journal=not args.no_backup
         )
 
         print()
         print(f"Successfully updated {updated} tasks!")
-        if not args.no_backup:
-            print("Backup files created with .bak extension")
+        if run_id:
+            print(f"Undo with: python tools/find_tasks.py --undo {run_id}")
         return
 
     # Otherwise, just display tasks
-    current_file = None
-    for task in tasks:
-        # Group by file
-        if task['file_relative'] != current_file:
-            current_file = task['file_relative']
-            print(f"\n{task['file_relative']}:")
-
-        # Show task
-        task_str = f"  Line {task['line_num']}: {task['description']}"
-
-        if args.verbose:
-            if task['due_date']:
-                task_str += f" [Due: {task['due_date']}]"
-            if task['scheduled_date']:
-                task_str += f" [Scheduled: {task['scheduled_date']}]"
-
-        print(task_str)
+    with vault_profile.phase('output'):
+        current_file = None
+        for task in tasks:
+            # Group by file
+            if task['file_relative'] != current_file:
+                current_file = task['file_relative']
+                print(f"\n{task['file_relative']}:")
+
+            # Show task
+            task_str = f"  Line {task['line_num']}: {task['description']}"
+
+            if args.verbose:
+                if task['due_date']:
+                    task_str += f" [Due: {task['due_date']}]"
+                if task['scheduled_date']:
+                    task_str += f" [Scheduled: {task['scheduled_date']}]"
+
+            print(task_str)
 
 if __name__ == "__main__":
     main()
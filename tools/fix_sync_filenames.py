@@ -4,137 +4,599 @@ Fix filenames with special characters that prevent syncing.
 
 This tool finds files with problematic characters (backslashes, quotes, angle brackets, etc.)
 and renames them to be safe for cross-platform syncing with tools like Syncthing.
+Names are checked against a platform profile (--platform, see
+filename_sanitizer.py): besides forbidden characters this catches Windows
+reserved device names, trailing dots and spaces, names that are not NFC
+normalized, overlong names and paths, and names in one folder that only differ
+in case or Unicode normalization (the first one in sorted order keeps its name).
+
+All target names are planned up front: names that collide with an existing
+file or with another planned rename get a numeric suffix. Links to renamed
+notes and attachments are rewritten across the vault in one pass over the link
+index, and the renames and link edits are applied as one journaled run that
+--undo can revert.
+
+With --watch the tool keeps running and checks files as they are created or
+renamed into the vault (through inotify, or by stat()ing every folder
+periodically where inotify is unavailable). A burst of new files is checked
+once it settles, and --policy decides what happens without prompting:
+`rename` fixes the names and links as one journaled run per burst, `report`
+only logs them. The folder listings are saved in .obsidian-cli/, so a
+restart only lists the folders whose mtime changed and checks the files that
+are new in them.
 
 Usage:
     python fix_sync_filenames.py --dry-run  # Preview changes without renaming
     python fix_sync_filenames.py            # Actually rename files
     python fix_sync_filenames.py --check    # Only list problematic files
+    python fix_sync_filenames.py --platform windows
+    python fix_sync_filenames.py --undo RUN_ID
+    python fix_sync_filenames.py --watch --policy rename
 """
 
 import argparse
+import marshal
 import os
-import re
+import posixpath
+import time
+from collections import Counter
 from pathlib import Path
-import yaml
-
-# Characters that commonly cause syncing issues across platforms
-PROBLEMATIC_CHARS = {
-    '\\': '-',  # Backslash (path separator on Windows)
-    '/': '-',   # Forward slash (path separator)
-    ':': '-',   # Colon (reserved on Windows)
-    '*': '',    # Asterisk (wildcard)
-    '?': '',    # Question mark (wildcard)
-    '"': "'",   # Double quote
-    '<': '(',   # Less than
-    '>': ')',   # Greater than
-    '|': '-',   # Pipe
-}
-
-def load_config():
-    """Load configuration to find vault path."""
-    config_path = Path(__file__).parent.parent / "config.yaml"
-    with open(config_path) as f:
-        config = yaml.safe_load(f)
-
-    vault_path = Path(__file__).parent.parent / config['vault_path']
-    return vault_path.resolve()
+
+import vault_profile
+from filename_sanitizer import MAX_NAME_BYTES, PROFILES, get_sanitizer
+from vault_config import STATE_DIR, load_config, vault_key
+from vault_scan import IGNORE_FILE, IGNORED_DIRS, load_ignore_spec, scan_dir, walk_all_files
+
+WATCH_POLICIES = ('rename', 'report')
+
+# Seconds without new files before a burst of them is checked (--watch)
+SETTLE_DELAY = 2.0
+
+# Seconds between folder scans when inotify is not available
+POLL_INTERVAL = 30.0
+
+# Folders modified this recently (in ns) are listed again on the next scan,
+# in case they changed again within the same mtime tick
+RACY_MTIME_NS = 2 * 10**9
+
+# Bump when the watch state layout changes
+STATE_VERSION = 1
 
-def has_problematic_chars(filename):
-    """Check if filename contains any problematic characters."""
-    return any(char in filename for char in PROBLEMATIC_CHARS.keys())
+def has_problematic_chars(filename, platform='all'):
+    """Check if filename breaks a naming rule of the platform profile."""
+    return get_sanitizer(platform).needs_sanitizing(filename)
 
-def sanitize_filename(filename):
+def sanitize_filename(filename, platform='all'):
     """Replace problematic characters with safe alternatives."""
-    sanitized = filename
-    for bad_char, replacement in PROBLEMATIC_CHARS.items():
-        sanitized = sanitized.replace(bad_char, replacement)
+    return get_sanitizer(platform).sanitize(filename)
+
+def describe_problems(rel_path, platform='all'):
+    """Return what is wrong with a file's name, for previews and --check."""
+    sanitizer = get_sanitizer(platform)
+    problems = sanitizer.problems(posixpath.basename(rel_path))
+    max_path = sanitizer.profile.max_path
+    if max_path and len(rel_path) > max_path:
+        problems.append("path too long")
+    return problems or ["same name as another file in the folder"]
 
-    # Remove multiple consecutive spaces/dashes
-    sanitized = re.sub(r'[ -]+', ' ', sanitized)
-    sanitized = re.sub(r'^[ -]+|[ -]+$', '', sanitized)
+def find_problematic_files(vault_path, jobs=1, files=None, platform='all'):
+    """Find all files whose names break a rule of the platform profile.
 
-    return sanitized
-
-def find_problematic_files(vault_path):
-    """Find all files with problematic characters in their names."""
+    `files` is the list of files in the vault if it was already walked.
+    """
     problematic_files = []
+    sanitizer = get_sanitizer(platform)
+    max_path = sanitizer.profile.max_path
+    root_length = len(os.fspath(vault_path)) + 1
+    seen = {}
 
-    for file_path in vault_path.rglob("*"):
-        # Skip directories and .obsidian folder
-        if file_path.is_dir() or ".obsidian" in file_path.parts:
-            continue
-
-        # Check if filename has problematic characters
-        if has_problematic_chars(file_path.name):
-            problematic_files.append(file_path)
+    # Directories and the .obsidian folder are skipped by the walker
+    if files is None:
+        files = walk_all_files(vault_path, jobs)
+    with vault_profile.phase('check'):
+        files = sorted(files)
+        names = [file_path.name for file_path in files]
+        dirty = set(sanitizer.dirty_indexes(names))
+        for i, (file_path, key) in enumerate(zip(files, sanitizer.name_keys(names))):
+            # Names that only differ in case or normalization are one file
+            # on case-insensitive file systems
+            keys = seen.setdefault(file_path.parent, set())
+            if (i in dirty or key in keys
+                    or max_path and len(os.fspath(file_path)) - root_length > max_path):
+                problematic_files.append(file_path)
+            keys.add(key)
 
     return problematic_files
+
+def find_new_problematic_files(vault_path, new_files, platform='all', ignore=None):
+    """Check files that were just created or renamed into the vault.
+
+    `new_files` are vault-relative posix paths; files that are gone or
+    skipped by the walker are left out. Unlike find_problematic_files, a
+    name that collides with a file already in the folder counts against the
+    new file, so the older file keeps its name. Returns (problematic files,
+    every file in their folders) as Paths, ready for plan_renames.
+    """
+    sanitizer = get_sanitizer(platform)
+    max_path = sanitizer.profile.max_path
+    by_folder = {}
+    for rel_path in new_files:
+        folder, _, name = rel_path.rpartition('/')
+        by_folder.setdefault(folder, set()).add(name)
+
+    problematic_files = []
+    folder_files = []
+    for folder, names in sorted(by_folder.items()):
+        prefix = folder + '/' if folder else ''
+        files, _subdirs = scan_dir(os.path.join(vault_path, folder), prefix, ignore)
+        folder_files += [Path(entry.path) for _rel_path, entry in files]
+        keys = {sanitizer.name_key(entry.name) for _rel_path, entry in files if entry.name not in names}
+        for rel_path, entry in files:
+            if entry.name not in names:
+                continue
+            key = sanitizer.name_key(entry.name)
+            if (sanitizer.needs_sanitizing(entry.name) or key in keys
+                    or max_path and len(rel_path) > max_path):
+                problematic_files.append(Path(entry.path))
+            keys.add(key)
+    return problematic_files, folder_files
 
-def preview_changes(files, vault_path):
+def unique_name(name, taken, key=str):
+    """Return name, or 'stem N.ext' with the lowest N whose key is not in the set `taken`."""
+    if key(name) not in taken:
+        return name
+    stem, ext = os.path.splitext(name)
+    suffix = 1
+    while key(f"{stem} {suffix}{ext}") in taken:
+        suffix += 1
+    return f"{stem} {suffix}{ext}"
+
+def plan_renames(files, vault_path, all_files, platform='all'):
+    """Compute the target of every problematic file before anything is renamed.
+
+    `all_files` are every file in the vault. Returns (old, new) posix paths
+    relative to the vault. A target taken by a file that stays or by an
+    earlier planned rename in the same folder gets a numeric suffix, so two
+    files that sanitize to the same name never collide. Names are compared
+    the way the profile's file systems compare them (ignoring case and
+    Unicode normalization where they do), and on profiles with a path limit
+    the name is shortened so the vault-relative path fits.
+    """
+    sanitizer = get_sanitizer(platform)
+    max_path = sanitizer.profile.max_path
+    moving = set(files)
+    taken = {}
+    for file_path in all_files:
+        names = taken.setdefault(file_path.parent, set())
+        if file_path not in moving:
+            names.add(sanitizer.name_key(file_path.name))
+
+    renames = []
+    for file_path in sorted(files):
+        max_bytes = MAX_NAME_BYTES
+        if max_path:
+            folder = file_path.parent.relative_to(vault_path).as_posix()
+            folder_length = len(folder) + 1 if folder != '.' else 0
+            max_bytes = min(max_bytes, max_path - folder_length)
+        new_name = sanitizer.sanitize(file_path.name, max_bytes)
+        names = taken.setdefault(file_path.parent, set())
+        new_name = unique_name(new_name, names, sanitizer.name_key)
+        names.add(sanitizer.name_key(new_name))
+        if new_name == file_path.name:
+            continue
+        renames.append((file_path.relative_to(vault_path).as_posix(),
+                        (file_path.parent / new_name).relative_to(vault_path).as_posix()))
+    return renames
+
+def _pick(candidates, source_path):
+    """Pick the link target Obsidian prefers: same folder as the source, else shortest path."""
+    source_dir = posixpath.dirname(source_path).lower()
+    for path in candidates:
+        if posixpath.dirname(path).lower() == source_dir:
+            return path
+    return min(candidates, key=lambda path: (len(path), path))
+
+def plan_link_edits(vault_path, renames, all_files, jobs=1):
+    """Return line edits that point links to renamed files at their new names.
+
+    Occurrences are found in one pass over the link index (only links whose
+    last path component names a renamed file are resolved), and only the notes
+    containing them are read. Edits refer to notes by their current path. A
+    link written as a bare name gets the full path when the new name would be
+    ambiguous; links reaching a note through an alias are left alone.
+    """
+    # Imported here: --check and --no-links runs never touch the link index
+    from link_graph import LinkGraph, note_key, rewrite_links
+    from vault_index import use_index
+
+    renamed = dict(renames)
+    renamed_lower = {old.lower(): old for old in renamed}
+    old_keys = {note_key(posixpath.basename(old)) for old in renamed}
+
+    # How many files each bare link name will match once renamed
+    name_counts = Counter(
+        note_key(posixpath.basename(renamed.get(path, path)))
+        for path in (file_path.relative_to(vault_path).as_posix() for file_path in all_files)
+    )
+    renamed_by_name = {}
+    for old in renamed:
+        renamed_by_name.setdefault(note_key(posixpath.basename(old)), []).append(old)
+
+    with use_index(vault_path, jobs=jobs) as index:
+        graph = LinkGraph(index)
+        graph.refresh()
+        occurrences = {}
+        with vault_profile.phase('links'):
+            for path, line_num, target in index.conn.execute(
+                "SELECT files.path, lg_links.line_num, lg_links.target "
+                "FROM lg_links JOIN files ON files.id = lg_links.file_id"
+            ):
+                if note_key(posixpath.basename(target)) in old_keys:
+                    occurrences.setdefault(path, set()).add(line_num)
+
+        def resolve_renamed(target, source_path, markdown):
+            """Return the old path of the renamed file a link points to, or None."""
+            node = graph.resolve(target, graph.by_path.get(note_key(source_path)), markdown)
+            if node is None:
+                return None
+            if node >= 0:
+                return graph.paths[node] if graph.paths[node] in renamed else None
+            # Attachments are not in the graph: resolve among the renamed files,
+            # which include every file with the same problematic name
+            lowered = target.strip().lstrip('/').lower()
+            if lowered.startswith('./'):
+                lowered = lowered[2:]
+            if markdown:
+                joined = posixpath.normpath(posixpath.join(posixpath.dirname(source_path).lower(), lowered))
+                if joined in renamed_lower:
+                    return renamed_lower[joined]
+            if lowered in renamed_lower:
+                return renamed_lower[lowered]
+            candidates = [old for old in renamed_by_name.get(posixpath.basename(lowered), [])
+                          if old.lower().endswith('/' + lowered) or '/' not in lowered]
+            return _pick(candidates, source_path) if candidates else None
+
+        def new_target(written, old, new):
+            folder, _, last = written.rpartition('/')
+            old_name, new_name = posixpath.basename(old), posixpath.basename(new)
+            if last.lower() == old_name.lower():
+                new_last, new_path = new_name, new
+            elif old_name.lower().endswith('.md') and last.lower() == old_name[:-3].lower():
+                new_last, new_path = new_name[:-3], new[:-3]
+            else:
+                return None  # Reached through an alias, which still works
+            if folder:
+                return f"{folder}/{new_last}"
+            return new_last if name_counts[note_key(new_name)] == 1 else new_path
+
+        edits = []
+        with vault_profile.phase('rewrite'):
+            for path in sorted(occurrences):
+                try:
+                    lines = (vault_path / path).read_bytes().split(b'\n')
+                except OSError as e:
+                    print(f"Error reading {vault_path / path}: {e}")
+                    continue
+
+                def replace(kind, target):
+                    old = resolve_renamed(target, path, kind.startswith('markdown'))
+                    return new_target(target, old, renamed[old]) if old else None
+
+                for line_num in sorted(occurrences[path]):
+                    if line_num > len(lines):
+                        continue
+                    old_line = lines[line_num - 1].decode('utf-8', 'replace').rstrip('\r')
+                    new_line = rewrite_links(old_line, replace)
+                    if new_line != old_line:
+                        edits.append({'path': path, 'line_num': line_num,
+                                      'old': old_line, 'new': new_line})
+    return edits
+
+def preview_changes(renames, vault_path, edits=(), platform='all'):
     """Show what changes would be made."""
-    if not files:
-        print("No files with problematic characters found!")
+    if not renames:
+        print("No files with problematic names found!")
         return
 
-    print(f"Found {len(files)} file(s) with problematic characters:\n")
+    print(f"Found {len(renames)} file(s) with problematic names:\n")
 
-    for file_path in files:
-        old_name = file_path.name
-        new_name = sanitize_filename(old_name)
-        relative_path = file_path.relative_to(vault_path)
+    for old, new in renames:
+        old_name = posixpath.basename(old)
+        new_name = posixpath.basename(new)
 
-        print(f"File: {relative_path}")
+        print(f"File: {old}")
         print(f"  Old: {old_name}")
         print(f"  New: {new_name}")
 
-        # Show which characters are problematic
-        bad_chars = [c for c in PROBLEMATIC_CHARS.keys() if c in old_name]
-        print(f"  Problematic chars: {', '.join(repr(c) for c in bad_chars)}")
+        # Show what is wrong with the name
+        print(f"  Problems: {', '.join(describe_problems(old, platform))}")
         print()
 
-def rename_files(files, vault_path, dry_run=False):
-    """Rename files to remove problematic characters."""
-    if not files:
-        print("No files with problematic characters found!")
-        return
+    if edits:
+        print(f"Links to update: {len(edits)} line(s) in {len({edit['path'] for edit in edits})} note(s)")
+        for edit in edits:
+            print(f"  {edit['path']}:{edit['line_num']}")
+            print(f"    - {edit['old']}")
+            print(f"    + {edit['new']}")
 
-    renamed_count = 0
-    error_count = 0
+def rename_files(renames, vault_path, edits=(), dry_run=False, journal=True):
+    """Apply planned renames and link edits as one run; returns its run id."""
+    if not renames:
+        print("No files with problematic names found!")
+        return None
 
-    for file_path in files:
-        old_name = file_path.name
-        new_name = sanitize_filename(old_name)
-        new_path = file_path.parent / new_name
+    if dry_run:
+        for old, new in renames:
+            print(f"Would rename: {old}")
+            print(f"         to: {new}")
+        print(f"\nWould rename {len(renames)} file(s) and update {len(edits)} link line(s)")
+        return None
 
-        # Skip if the new name is the same (shouldn't happen, but just in case)
-        if old_name == new_name:
-            continue
+    # Imported here: only runs that rename files need the journal
+    from vault_write import apply_renames
+    run_id, renamed_count, updated_count = apply_renames(vault_path, renames, edits, journal)
+    print(f"\nRenamed {renamed_count} file(s), updated {updated_count} link line(s)")
+    if renamed_count < len(renames):
+        print(f"Encountered {len(renames) - renamed_count} error(s)")
+    if run_id:
+        print(f"Undo with: python tools/fix_sync_filenames.py --undo {run_id}")
+    return run_id
+
+def watch_state_path_for(vault_path):
+    """Return the --watch state location for a vault."""
+    return STATE_DIR / f"fix-sync-{vault_key(vault_path)}.state"
 
-        # Check if target file already exists
-        if new_path.exists():
-            print(f"ERROR: Target already exists: {new_path.relative_to(vault_path)}")
-            error_count += 1
-            continue
+def _log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+class FilenameWatcher:
+    """Checks files as they are created or renamed into a vault and fixes their names.
+
+    The listing of every folder as of the last check is kept with the
+    folder's mtime and saved after every burst, so a restart picks up where
+    the last run stopped.
+    """
+
+    def __init__(self, vault_path, platform='all', policy='rename', links=True, journal=True,
+                 jobs=1, settle=SETTLE_DELAY, state_path=None):
+        self.vault_path = Path(vault_path)
+        self.root = os.fspath(self.vault_path)
+        self.platform = platform
+        self.policy = policy
+        self.links = links
+        self.journal = journal
+        self.jobs = jobs
+        self.settle = settle
+        self.state_path = Path(state_path) if state_path else watch_state_path_for(self.vault_path)
+        self.ignore = load_ignore_spec(self.vault_path)
+        self.ignore_stamp = self._ignore_stamp()
+        # Folder prefix ('' or ending in '/') -> (mtime, file names, subfolder names)
+        self.folders = {}
+        self.pending = set()
+        self.touched = set()
+        self.rescan = False
+        self.deadline = None
+        self.inotify = None
+
+    def _ignore_stamp(self):
+        try:
+            st = os.stat(os.path.join(self.root, IGNORE_FILE))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
+    def load_state(self):
+        """Read the folder listings saved by the last run; returns whether they were usable."""
         try:
-            if dry_run:
-                print(f"Would rename: {file_path.relative_to(vault_path)}")
-                print(f"         to: {new_path.relative_to(vault_path)}")
+            with open(self.state_path, 'rb') as f:
+                version, platform, ignore_stamp, folders = marshal.load(f)
+            if version != STATE_VERSION:
+                raise ValueError("old state layout")
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        # Files checked against other rules, or skipped before, are checked again
+        if platform != self.platform or ignore_stamp != self.ignore_stamp:
+            return False
+        self.folders = folders
+        return True
+
+    def save_state(self):
+        """Write the state atomically; skipped if it can't be stored."""
+        state = (STATE_VERSION, self.platform, self.ignore_stamp, self.folders)
+        temp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                marshal.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError:
+            pass
+
+    def _watch(self, path):
+        if self.inotify is None:
+            return
+        # Imported here: see watch()
+        from vault_daemon import IN_CREATE, IN_MOVED_TO, IN_ONLYDIR
+        try:
+            self.inotify.add_watch(path, IN_CREATE | IN_MOVED_TO | IN_ONLYDIR)
+        except OSError as e:
+            _log(f"Cannot watch {path}: {e}")
+
+    def _list(self, prefix, mtime=None):
+        """List a folder into self.folders; returns (file names, subfolder names) or None if it is gone."""
+        path = os.path.join(self.root, prefix)
+        if mtime is None:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self.folders.pop(prefix, None)
+                return None
+        files, subdirs = scan_dir(path, prefix, self.ignore)
+        names = [entry.name for _rel_path, entry in files]
+        subfolders = [sub_prefix[len(prefix):-1] for _path, sub_prefix in subdirs]
+        racy = time.time_ns() - mtime < RACY_MTIME_NS
+        self.folders[prefix] = (-1 if racy else mtime, '\n'.join(names), '\n'.join(subfolders))
+        return names, subfolders
+
+    def scan(self):
+        """Queue the files that appeared since the folders were last listed.
+
+        Every folder is watched and stat()ed, and only folders whose mtime
+        changed are listed; all files of a folder seen for the first time
+        are queued.
+        """
+        known = self.folders
+        self.folders = {}
+        stack = ['']
+        while stack:
+            prefix = stack.pop()
+            path = os.path.join(self.root, prefix)
+            # Watch before listing, so files created meanwhile raise events
+            self._watch(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = known.get(prefix)
+            if cached is not None and cached[0] == mtime:
+                self.folders[prefix] = cached
+                subfolders = cached[2].split('\n') if cached[2] else []
             else:
-                file_path.rename(new_path)
-                print(f"Renamed: {file_path.relative_to(vault_path)}")
-                print(f"     to: {new_path.relative_to(vault_path)}")
+                names, subfolders = self._list(prefix, mtime)
+                listed = set(cached[1].split('\n')) if cached is not None else set()
+                self.pending.update(prefix + name for name in names if name not in listed)
+            stack.extend(prefix + name + '/' for name in subfolders)
 
-            renamed_count += 1
+    def _add_folder(self, prefix):
+        """Watch a folder that was created or moved in and queue every file below it."""
+        stack = [prefix]
+        while stack:
+            prefix = stack.pop()
+            self._watch(os.path.join(self.root, prefix))
+            listing = self._list(prefix)
+            if listing is None:
+                continue
+            names, subfolders = listing
+            self.pending.update(prefix + name for name in names)
+            stack.extend(prefix + name + '/' for name in subfolders)
 
-        except Exception as e:
-            print(f"ERROR renaming {file_path.relative_to(vault_path)}: {e}")
-            error_count += 1
+    def handle_events(self):
+        """Queue the files named by pending inotify events."""
+        # Imported here: see watch()
+        from vault_daemon import IN_ISDIR, IN_Q_OVERFLOW
+
+        for directory, mask, _cookie, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW or directory is None:
+                self.rescan = True
+                continue
+            if not name:
+                continue
+            rel_path = (directory / name).relative_to(self.vault_path).as_posix()
+            folder = rel_path.rpartition('/')[0]
+            self.touched.add(folder + '/' if folder else '')
+            if rel_path == IGNORE_FILE:
+                self.rescan = True
+            elif mask & IN_ISDIR:
+                if name not in IGNORED_DIRS and (self.ignore is None or not self.ignore.match_file(rel_path + '/')):
+                    self._add_folder(rel_path + '/')
+            elif self.ignore is None or not self.ignore.match_file(rel_path):
+                self.pending.add(rel_path)
+        self.deadline = time.monotonic() + self.settle
+
+    def fix_pending(self):
+        """Check the queued files, apply the policy and save the state."""
+        if self.rescan:
+            ignore_stamp = self._ignore_stamp()
+            if ignore_stamp != self.ignore_stamp:
+                # Files skipped so far may be walked now: check everything
+                self.ignore = load_ignore_spec(self.vault_path)
+                self.ignore_stamp = ignore_stamp
+                self.folders = {}
+            self.scan()
+            self.rescan = False
+        pending, self.pending = self.pending, set()
+        touched, self.touched = self.touched, set()
+        self.deadline = None
+
+        problematic_files, folder_files = find_new_problematic_files(
+            self.vault_path, pending, self.platform, self.ignore)
+        renames = plan_renames(problematic_files, self.vault_path, folder_files, self.platform)
+        if renames and self.policy == 'report':
+            for old, new in renames:
+                _log(f"Needs renaming: {old} -> {posixpath.basename(new)}"
+                     f" ({', '.join(describe_problems(old, self.platform))})")
+        elif renames:
+            self._rename(renames)
+
+        for rel_path in pending:
+            folder = rel_path.rpartition('/')[0]
+            touched.add(folder + '/' if folder else '')
+        for prefix in touched:
+            self._list(prefix)
+        self.save_state()
+
+    def _rename(self, renames):
+        """Rename files and update links to them as one journaled run."""
+        edits = []
+        if self.links:
+            edits = plan_link_edits(self.vault_path, renames, walk_all_files(self.vault_path, self.jobs),
+                                    self.jobs)
+        # Imported here: only bursts with problematic names need the journal
+        from vault_write import apply_renames
+        run_id, renamed_count, updated_count = apply_renames(self.vault_path, renames, edits, self.journal)
+        for old, new in renames:
+            _log(f"Renamed: {old} -> {posixpath.basename(new)}")
+        summary = f"Renamed {renamed_count} file(s), updated {updated_count} link line(s)"
+        if renamed_count < len(renames):
+            summary += f", {len(renames) - renamed_count} error(s)"
+        if run_id:
+            summary += f"; undo with --undo {run_id}"
+        _log(summary)
+
+    def watch(self):
+        """Check new files until interrupted."""
+        # Imported here: only --watch needs inotify and an event loop
+        import selectors
+        from vault_daemon import Inotify
+
+        resumed = self.load_state()
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError) as e:
+            _log(f"inotify unavailable ({e}), scanning folders every {POLL_INTERVAL:.0f}s")
+        self.scan()
+        _log(f"Watching {self.vault_path} ({len(self.folders)} folders, "
+             f"{len(self.pending)} {'new ' if resumed else ''}file(s) to check, policy: {self.policy})")
+        self.fix_pending()
+
+        selector = selectors.DefaultSelector()
+        if self.inotify:
+            selector.register(self.inotify.fd, selectors.EVENT_READ)
+        last_scan = time.monotonic()
+        try:
+            while True:
+                if self.deadline is not None:
+                    timeout = max(0, self.deadline - time.monotonic())
+                elif self.inotify is None:
+                    timeout = max(0, last_scan + POLL_INTERVAL - time.monotonic())
+                else:
+                    timeout = None
+                if selector.select(timeout):
+                    self.handle_events()
+
+                now = time.monotonic()
+                if self.deadline is not None and now >= self.deadline:
+                    self.fix_pending()
+                elif self.inotify is None and now >= last_scan + POLL_INTERVAL:
+                    self.scan()
+                    if self.pending:
+                        self.fix_pending()
+                    last_scan = now
+        finally:
+            selector.close()
+            if self.inotify:
+                self.inotify.close()
 
-    print(f"\n{'Would rename' if dry_run else 'Renamed'} {renamed_count} file(s)")
-    if error_count > 0:
-        print(f"Encountered {error_count} error(s)")
-
 def main():
     parser = argparse.ArgumentParser(
         description="Fix filenames with special characters that prevent syncing"
@@ -149,9 +611,61 @@ def main():
         action="store_true",
         help="Only list problematic files without showing rename preview"
     )
+    parser.add_argument(
+        "--platform",
+        choices=sorted(PROFILES),
+        default="all",
+        help="Platform profile to check names against (default: all)"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Walk top-level folders with N threads (0 = all CPUs)"
+    )
+    parser.add_argument(
+        "--no-links",
+        action="store_true",
+        help="Rename files without updating links to them"
+    )
+    parser.add_argument(
+        "--no-backup",
+        action="store_true",
+        help="Don't record an undo journal"
+    )
+    parser.add_argument(
+        "--undo",
+        metavar="RUN_ID",
+        help="Revert the renames and link updates of an earlier run"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and check files as they are created or renamed"
+    )
+    parser.add_argument(
+        "--policy",
+        choices=WATCH_POLICIES,
+        default="rename",
+        help="What --watch does with problematic names: rename them or only report them (default: rename)"
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=SETTLE_DELAY,
+        metavar="SECONDS",
+        help=f"Seconds without new files before --watch checks a burst (default: {SETTLE_DELAY:g})"
+    )
+    vault_profile.add_arguments(parser)
 
     args = parser.parse_args()
 
+    with vault_profile.session("fix_sync_filenames", args):
+        return run_fix(args)
+
+def run_fix(args):
+    """Check, preview or rename files as described by the parsed command line."""
     vault_path = load_config()
 
     if not vault_path.exists():
@@ -159,32 +673,57 @@ def main():
         print("Please check your config.yaml")
         return 1
 
+    if args.undo:
+        # Imported here: the journal is only needed to rename or undo
+        from vault_write import undo_run
+        try:
+            restored = undo_run(vault_path, args.undo)
+        except FileNotFoundError as e:
+            print(f"ERROR: {e}")
+            return 1
+        print(f"Undid run {args.undo} ({restored} link line(s) restored)")
+        return 0
+
+    if args.watch:
+        policy = 'report' if args.dry_run or args.check else args.policy
+        watcher = FilenameWatcher(vault_path, args.platform, policy, links=not args.no_links,
+                                  journal=not args.no_backup, jobs=args.jobs, settle=args.settle)
+        try:
+            watcher.watch()
+        except KeyboardInterrupt:
+            watcher.save_state()
+            print("\nStopped.")
+        return 0
+
     print(f"Scanning vault: {vault_path}\n")
 
-    problematic_files = find_problematic_files(vault_path)
+    all_files = list(walk_all_files(vault_path, args.jobs))
+    problematic_files = find_problematic_files(vault_path, args.jobs, all_files, args.platform)
 
     if args.check:
         # Just list the problematic files
         if not problematic_files:
-            print("No files with problematic characters found!")
+            print("No files with problematic names found!")
         else:
-            print(f"Found {len(problematic_files)} file(s) with problematic characters:\n")
+            print(f"Found {len(problematic_files)} file(s) with problematic names:\n")
             for file_path in problematic_files:
-                relative_path = file_path.relative_to(vault_path)
-                bad_chars = [c for c in PROBLEMATIC_CHARS.keys() if c in file_path.name]
+                relative_path = file_path.relative_to(vault_path).as_posix()
                 print(f"  - {relative_path}")
-                print(f"    Problematic chars: {', '.join(repr(c) for c in bad_chars)}")
-    elif args.dry_run:
-        preview_changes(problematic_files, vault_path)
+                print(f"    Problems: {', '.join(describe_problems(relative_path, args.platform))}")
     else:
+        renames = plan_renames(problematic_files, vault_path, all_files, args.platform)
+        edits = []
+        if renames and not args.no_links:
+            edits = plan_link_edits(vault_path, renames, all_files, args.jobs)
+
         # Show preview first
-        preview_changes(problematic_files, vault_path)
+        preview_changes(renames, vault_path, edits, args.platform)
 
-        if problematic_files:
+        if renames and not args.dry_run:
             response = input("\nProceed with renaming? (yes/no): ").strip().lower()
             if response in ['yes', 'y']:
                 print("\nRenaming files...\n")
-                rename_files(problematic_files, vault_path, dry_run=False)
+                rename_files(renames, vault_path, edits, journal=not args.no_backup)
             else:
                 print("Cancelled.")
 
@@ -0,0 +1,114 @@
+"""
+Frontmatter and tag extraction for Obsidian notes.
+
+parse_frontmatter() parses the leading '---' block of a note with libyaml's
+CSafeLoader when PyYAML was built with it. Blocks larger than
+MAX_FRONTMATTER_BYTES are treated as body text (see vault_index.parse_note,
+which reads them line by line).
+
+InlineTagScanner tokenizes note bodies the way Obsidian does: a tag is a
+'#' at the start of a line or after whitespace, followed by letters, digits,
+'_', '-' or '/', with at least one non-digit. Fenced code blocks, inline code
+and the frontmatter block are skipped. Tags are compared case-insensitively,
+so both frontmatter and inline tags are returned lowercase.
+"""
+
+import re
+
+import vault_profile
+
+# Frontmatter larger than this is treated as missing
+MAX_FRONTMATTER_BYTES = 64 * 1024
+
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+INLINE_CODE_PATTERN = re.compile(r'(`+).+?\1')
+INLINE_TAG_PATTERN = re.compile(r'(?<!\S)#([\w/-]+)')
+TAG_SEPARATOR_PATTERN = re.compile(r'[,\s]+')
+
+def split_frontmatter(text):
+    """Split a note into (frontmatter text, body, body start line).
+
+    The frontmatter text is None when the note has no frontmatter block.
+    """
+    if not text.startswith('---'):
+        return None, text, 1
+    lines = text.split('\n')
+    if lines[0].rstrip() != '---':
+        return None, text, 1
+    for i in range(1, len(lines)):
+        if lines[i].rstrip() in ('---', '...'):
+            return '\n'.join(lines[1:i]), '\n'.join(lines[i + 1:]), i + 2
+    return None, text, 1
+
+def parse_frontmatter(text):
+    """Parse frontmatter text into a dict (empty if missing or invalid)."""
+    if not text:
+        return {}
+    # Imported here: PyYAML is slow to import and many runs parse no frontmatter
+    import yaml
+
+    vault_profile.count('yaml blocks parsed')
+    try:
+        with vault_profile.phase('yaml'):
+            frontmatter = yaml.load(text, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    except yaml.YAMLError:
+        return {}
+    return frontmatter if isinstance(frontmatter, dict) else {}
+
+def normalize_tag(tag):
+    """Return the canonical (lowercase, no leading '#') form of a tag."""
+    return str(tag).strip().lstrip('#').lower()
+
+def frontmatter_tags(frontmatter):
+    """Return the tags listed in a note's frontmatter ('tags' or 'tag')."""
+    tags = frontmatter.get('tags', frontmatter.get('tag')) or []
+    if isinstance(tags, str):
+        tags = TAG_SEPARATOR_PATTERN.split(tags)
+    if not isinstance(tags, list):
+        return []
+    tags = [normalize_tag(tag) for tag in tags if tag is not None]
+    return [tag for tag in tags if tag]
+
+def frontmatter_aliases(frontmatter):
+    """Return the aliases listed in a note's frontmatter ('aliases' or 'alias')."""
+    aliases = frontmatter.get('aliases', frontmatter.get('alias')) or []
+    if isinstance(aliases, str):
+        aliases = [aliases]
+    if not isinstance(aliases, list):
+        return []
+    return [str(alias).strip() for alias in aliases if alias is not None and str(alias).strip()]
+
+class CodeFilter:
+    """Tracks fenced code blocks across body lines fed one at a time."""
+
+    def __init__(self):
+        self.fence = None
+
+    def prose(self, line):
+        """Return the line with inline code blanked, or None for code block lines."""
+        match = FENCE_PATTERN.match(line)
+        if self.fence:
+            if match and match.group(1)[0] == self.fence[0] and len(match.group(1)) >= len(self.fence):
+                self.fence = None
+            return None
+        if match:
+            self.fence = match.group(1)
+            return None
+        if '`' in line:
+            line = INLINE_CODE_PATTERN.sub(' ', line)
+        return line
+
+class InlineTagScanner:
+    """Incremental inline tag extraction, fed one body line at a time."""
+
+    def __init__(self):
+        self.tags = set()
+        self.code = CodeFilter()
+
+    def feed(self, line):
+        line = self.code.prose(line)
+        if not line or '#' not in line:
+            return
+        for tag in INLINE_TAG_PATTERN.findall(line):
+            if not tag.isdigit():
+                self.tags.add(tag.lower())
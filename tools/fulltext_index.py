@@ -0,0 +1,361 @@
+"""
+Inverted full-text index with BM25 ranking.
+
+The index is stored next to the vault index (see vault_index.py) and keeps, for
+every term, its document frequency and a posting per note with the term
+frequency and the token positions of each occurrence. Each note also stores
+the token position at which every line starts, so matches can be mapped back
+to line numbers without re-reading the note.
+
+Term and prefix clauses are scored from the term frequencies alone; positions
+are only decoded for phrase clauses and, for the top-k notes, to find the
+matching lines. A prefix stands for its MAX_PREFIX_TERMS most frequent terms.
+
+Query syntax:
+    word            Notes containing the word
+    pre*            Notes containing a word starting with "pre"
+    "two words"     Notes containing the exact phrase
+All clauses of a query must match. Results are ranked with BM25.
+"""
+
+import math
+import operator
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from heapq import nlargest
+from itertools import repeat
+from pathlib import Path
+
+from vault_index import new_hasher
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ft_docs (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    hash TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    line_starts BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ft_terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL,
+    df INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ft_postings (
+    term_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES ft_docs(file_id) ON DELETE CASCADE,
+    tf INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term_id, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ft_postings_file ON ft_postings(file_id);
+-- Covering indexes, so scoring reads neither the positions nor the line starts
+CREATE INDEX IF NOT EXISTS ft_postings_tf ON ft_postings(term_id, tf);
+CREATE INDEX IF NOT EXISTS ft_docs_length ON ft_docs(length);
+CREATE INDEX IF NOT EXISTS ft_terms_unused ON ft_terms(id) WHERE df = 0;
+-- Document frequencies follow the postings, including the ones the cascade
+-- removes when a note leaves the vault index
+CREATE TRIGGER IF NOT EXISTS ft_postings_added AFTER INSERT ON ft_postings BEGIN
+    UPDATE ft_terms SET df = df + 1 WHERE id = NEW.term_id;
+END;
+CREATE TRIGGER IF NOT EXISTS ft_postings_removed AFTER DELETE ON ft_postings BEGIN
+    UPDATE ft_terms SET df = df - 1 WHERE id = OLD.term_id;
+END;
+"""
+
+TOKEN_PATTERN = re.compile(r'\w+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# A prefix clause stands for at most this many terms, the most frequent ones,
+# so "a*" costs about as much as a few common words
+MAX_PREFIX_TERMS = 32
+
+# Notes are read from the index in chunks of this many ids
+FETCH_CHUNK = 500
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def parse_query(query):
+    """Parse a query string into ('term' | 'prefix' | 'phrase', words) clauses."""
+    clauses = []
+    for phrase, word in QUERY_PATTERN.findall(query):
+        if phrase:
+            words = tokenize(phrase)
+            if len(words) > 1:
+                clauses.append(('phrase', words))
+            elif words:
+                clauses.append(('term', words))
+        elif word.endswith('*') and tokenize(word):
+            clauses.append(('prefix', tokenize(word)[:1]))
+        else:
+            clauses.extend(('term', [token]) for token in tokenize(word))
+    return clauses
+
+def index_lines(lines):
+    """Tokenize a note's lines, returning term positions, token count and line starts."""
+    term_positions = {}
+    line_starts = array('I')
+    position = 0
+    for line in lines:
+        line_starts.append(position)
+        for token in tokenize(line):
+            term_positions.setdefault(token, array('I')).append(position)
+            position += 1
+    return term_positions, position, line_starts
+
+class FullTextIndex:
+    """Positional inverted index built on top of a VaultIndex."""
+
+    def __init__(self, vault_index):
+        self.vault_index = vault_index
+        self.conn = vault_index.conn
+        self.conn.executescript(SCHEMA)
+
+    def refresh(self):
+        """Re-index notes whose content hash differs from the vault index.
+
+        Postings of deleted notes are removed by the foreign key cascade.
+        Returns the number of notes that were (re-)indexed.
+        """
+        stale = self.conn.execute(
+            "SELECT files.id, files.path FROM files "
+            "LEFT JOIN ft_docs ON ft_docs.file_id = files.id "
+            "WHERE ft_docs.hash IS NOT files.hash"
+        ).fetchall()
+        # Drop the terms left without postings by re-indexed notes or by notes
+        # whose postings went with the cascade
+        if self.conn.execute("SELECT 1 FROM ft_terms WHERE df = 0 LIMIT 1").fetchone():
+            with self.conn:
+                self.conn.execute("DELETE FROM ft_terms WHERE df = 0")
+        if not stale:
+            return 0
+
+        term_ids = dict(self.conn.execute("SELECT term, id FROM ft_terms"))
+        vault_path = self.vault_index.vault_path
+
+        with self.conn:
+            for file_id, rel_path in stale:
+                hasher = new_hasher()
+
+                def decoded_lines(f):
+                    for raw_line in f:
+                        hasher.update(raw_line)
+                        yield raw_line.decode('utf-8', 'replace').rstrip('\r\n')
+
+                try:
+                    with open(vault_path / rel_path, 'rb') as f:
+                        term_positions, length, line_starts = index_lines(decoded_lines(f))
+                except Exception as e:
+                    print(f"Error reading {vault_path / rel_path}: {e}", file=sys.stderr)
+                    continue
+
+                self.conn.execute("DELETE FROM ft_docs WHERE file_id = ?", (file_id,))
+                self.conn.execute(
+                    "INSERT INTO ft_docs (file_id, hash, length, line_starts) VALUES (?, ?, ?, ?)",
+                    (file_id, hasher.hexdigest(), length, line_starts.tobytes())
+                )
+
+                postings = []
+                for term, positions in term_positions.items():
+                    term_id = term_ids.get(term)
+                    if term_id is None:
+                        term_id = self.conn.execute(
+                            "INSERT INTO ft_terms (term) VALUES (?)", (term,)
+                        ).lastrowid
+                        term_ids[term] = term_id
+                    postings.append((term_id, file_id, len(positions), positions.tobytes()))
+                self.conn.executemany(
+                    "INSERT INTO ft_postings (term_id, file_id, tf, positions) VALUES (?, ?, ?, ?)",
+                    postings
+                )
+
+        return len(stale)
+
+    def _term_frequencies(self, kind, words):
+        """Return (term ids, {file_id: tf}) for a term or prefix clause.
+
+        A prefix clause counts the occurrences of all of its terms. Only the
+        stored term frequencies are read, no positions.
+        """
+        if kind == 'term':
+            rows = self.conn.execute("SELECT id FROM ft_terms WHERE term = ?", (words[0],))
+        else:
+            # Every term with the prefix sorts in [prefix, prefix + U+10FFFF)
+            prefix = words[0]
+            rows = self.conn.execute(
+                "SELECT id FROM ft_terms WHERE term >= ? AND term < ? ORDER BY df DESC LIMIT ?",
+                (prefix, prefix + '\U0010ffff', MAX_PREFIX_TERMS)
+            )
+        term_ids = [term_id for (term_id,) in rows]
+        if not term_ids:
+            return term_ids, {}
+        if len(term_ids) == 1:
+            return term_ids, dict(self.conn.execute(
+                "SELECT file_id, tf FROM ft_postings WHERE term_id = ?", term_ids
+            ))
+        placeholders = ', '.join('?' for _ in term_ids)
+        return term_ids, dict(self.conn.execute(
+            f"SELECT file_id, SUM(tf) FROM ft_postings WHERE term_id IN ({placeholders}) GROUP BY file_id",
+            term_ids
+        ))
+
+    def _phrase_starts(self, words):
+        """Return {file_id: set of start positions} of the notes holding a phrase.
+
+        Words are looked up rarest first, and only the positions of notes that
+        hold every word looked up so far are decoded.
+        """
+        unique = sorted(set(words))
+        placeholders = ', '.join('?' for _ in unique)
+        terms = self.conn.execute(
+            f"SELECT term, id FROM ft_terms WHERE term IN ({placeholders}) ORDER BY df", unique
+        ).fetchall()
+        if len(terms) < len(unique):
+            return {}
+
+        starts = None
+        for term, term_id in terms:
+            offsets = [offset for offset, word in enumerate(words) if word == term]
+            found = {}
+            for file_id, blob in self.conn.execute(
+                "SELECT file_id, positions FROM ft_postings WHERE term_id = ?", (term_id,)
+            ):
+                if starts is not None and file_id not in starts:
+                    continue
+                positions = array('I')
+                positions.frombytes(blob)
+                # A phrase starting at s has its word at offset i on position s + i
+                file_starts = starts[file_id] if starts is not None else None
+                for offset in offsets:
+                    shifted = set(map(operator.sub, positions, repeat(offset)))
+                    file_starts = shifted if file_starts is None else file_starts & shifted
+                if file_starts:
+                    found[file_id] = file_starts
+            starts = found
+            if not starts:
+                break
+        return starts
+
+    def _positions(self, term_ids, file_ids):
+        """Return {file_id: positions} of some terms in some notes."""
+        placeholders = ', '.join('?' for _ in term_ids)
+        result = {}
+        for start in range(0, len(file_ids), FETCH_CHUNK):
+            chunk = file_ids[start:start + FETCH_CHUNK]
+            for file_id, blob in self.conn.execute(
+                f"SELECT file_id, positions FROM ft_postings WHERE term_id IN ({placeholders}) "
+                f"AND file_id IN ({', '.join('?' for _ in chunk)})",
+                term_ids + chunk
+            ):
+                result.setdefault(file_id, array('I')).frombytes(blob)
+        return result
+
+    def _lengths(self, file_ids, doc_count):
+        """Return {file_id: length in tokens} of some notes (or of all of them)."""
+        if len(file_ids) > doc_count // 4:
+            return dict(self.conn.execute("SELECT file_id, length FROM ft_docs"))
+        lengths = {}
+        for start in range(0, len(file_ids), FETCH_CHUNK):
+            chunk = file_ids[start:start + FETCH_CHUNK]
+            lengths.update(self.conn.execute(
+                f"SELECT file_id, length FROM ft_docs WHERE file_id IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ))
+        return lengths
+
+    def _docs(self, file_ids):
+        """Return {file_id: (path, line_starts blob)} of some notes."""
+        docs = {}
+        for start in range(0, len(file_ids), FETCH_CHUNK):
+            chunk = file_ids[start:start + FETCH_CHUNK]
+            for file_id, path, line_starts in self.conn.execute(
+                "SELECT ft_docs.file_id, files.path, ft_docs.line_starts "
+                "FROM ft_docs JOIN files ON files.id = ft_docs.file_id "
+                f"WHERE ft_docs.file_id IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ):
+                docs[file_id] = (path, line_starts)
+        return docs
+
+    def search(self, query, top_k=10):
+        """Return the top-k notes for a query, best first.
+
+        Each result is a dict with the relative 'file', its BM25 'score' and
+        the sorted 'line_nums' on which a clause matched.
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+
+        # Per clause, {file_id: tf} and what its matched positions come from:
+        # the term ids, or the phrase starts
+        frequencies = []
+        sources = []
+        for kind, words in clauses:
+            if kind == 'phrase':
+                starts = self._phrase_starts(words)
+                frequencies.append({file_id: len(positions) for file_id, positions in starts.items()})
+                sources.append(starts)
+            else:
+                term_ids, tfs = self._term_frequencies(kind, words)
+                frequencies.append(tfs)
+                sources.append(term_ids)
+            if not frequencies[-1]:
+                return []
+        candidates = set(frequencies[0]).intersection(*frequencies[1:])
+        if not candidates:
+            return []
+
+        doc_count, avg_length = self.conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM ft_docs"
+        ).fetchone()
+        avg_length = avg_length or 1
+        lengths = self._lengths(list(candidates), doc_count)
+
+        # The length normalization of every candidate, the same in all clauses
+        norms = {file_id: K1 * (1 - B + B * lengths[file_id] / avg_length) for file_id in candidates}
+        scores = dict.fromkeys(candidates, 0.0)
+        for tfs in frequencies:
+            # Each clause is scored as a single pseudo-term
+            df = len(tfs)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for file_id, norm in norms.items():
+                tf = tfs[file_id]
+                scores[file_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        ranked = list(scores)
+        if len(ranked) > top_k:
+            # Keep the notes tied with the k-th best, whose paths break the tie
+            cutoff = nlargest(top_k, scores.values())[-1]
+            ranked = [file_id for file_id, score in scores.items() if score >= cutoff]
+        docs = self._docs(ranked)
+        ranked.sort(key=lambda file_id: (-scores[file_id], docs[file_id][0]))
+        top = ranked[:top_k]
+
+        matched = {file_id: set() for file_id in top}
+        for source in sources:
+            if isinstance(source, dict):
+                for file_id in top:
+                    matched[file_id].update(source[file_id])
+            else:
+                for file_id, positions in self._positions(source, top).items():
+                    matched[file_id].update(positions)
+
+        results = []
+        for file_id in top:
+            path, blob = docs[file_id]
+            line_starts = array('I')
+            line_starts.frombytes(blob)
+            results.append({
+                'file': Path(path),
+                'score': scores[file_id],
+                'line_nums': sorted({bisect_right(line_starts, position) for position in matched[file_id]}),
+            })
+        return results
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Link graph of an Obsidian vault: backlinks, outgoing links, orphans, broken
+links and k-hop neighborhoods.
+
+Links are extracted from every note ([[wikilinks]], ![[embeds]] and
+[markdown](links), outside the frontmatter, code blocks and inline code) and
+stored next to the vault index (see vault_index.py). Like the full-text index,
+only notes whose content hash changed are read again. The stored links are
+then resolved and kept in memory as compact adjacency arrays (CSR offsets and
+node ids in array('I')), so a query is a slice of an array.
+
+Link targets are resolved case-insensitively, as Obsidian does:
+    1. the exact vault path ('Folder/Note' or 'Folder/Note.md')
+    2. for markdown links, the path relative to the linking note
+    3. notes whose path ends with the target: the one in the linking note's
+       folder if there is one, else the one with the shortest path
+    4. a note listing the target under `aliases` in its frontmatter
+Targets with another extension (images, PDFs, ...) are attachments and are
+not part of the graph. Links that resolve to nothing are broken links.
+
+Usage:
+    python tools/link_graph.py --backlinks "Note name"
+    python tools/link_graph.py --links "Folder/Note name"
+    python tools/link_graph.py --neighbors "Note name" --depth 2
+    python tools/link_graph.py --orphans
+    python tools/link_graph.py --broken --json
+"""
+
+import argparse
+import json
+import posixpath
+import re
+import sys
+from array import array
+from collections import deque
+from urllib.parse import quote, unquote
+
+import vault_daemon
+from frontmatter import INLINE_CODE_PATTERN, CodeFilter, frontmatter_aliases
+from vault_config import load_config
+from vault_index import new_hasher, use_index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lg_docs (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lg_links (
+    file_id INTEGER NOT NULL REFERENCES lg_docs(file_id) ON DELETE CASCADE,
+    line_num INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lg_links_file ON lg_links(file_id);
+"""
+
+WIKILINK_PATTERN = re.compile(r'(!?)\[\[([^\[\]|#^]*)(?:[#^][^\[\]|]*)?(?:\|[^\[\]]*)?\]\]')
+MARKDOWN_LINK_PATTERN = re.compile(r'(!?)\[[^\[\]]*\]\(\s*<?([^()<>\s]+)>?(?:\s+"[^"]*")?\s*\)')
+URL_SCHEME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]*:')
+ATTACHMENT_PATTERN = re.compile(r'\.[A-Za-z0-9]{1,5}$')
+# Characters a rewritten markdown link target has to percent-encode
+NEEDS_QUOTING_PATTERN = re.compile(r'[\s()<>%]')
+
+QUERIES = ('backlinks', 'links', 'neighbors', 'orphans', 'broken')
+
+def extract_links(lines):
+    """Return (line number, kind, target) for every link in a note's lines.
+
+    kind is 'link' or 'embed' for wikilinks and 'markdown' or 'markdown-embed'
+    for markdown links. Targets keep their text as written, without any
+    '#heading', '^block' or '|alias' part.
+    """
+    links = []
+    code = CodeFilter()
+    in_frontmatter = False
+    for line_num, line in enumerate(lines, 1):
+        if line_num == 1 and line.rstrip() == '---':
+            in_frontmatter = True
+            continue
+        if in_frontmatter:
+            if line.rstrip() in ('---', '...'):
+                in_frontmatter = False
+            continue
+
+        line = code.prose(line)
+        if not line or ('[[' not in line and '](' not in line):
+            continue
+        for embed, target in WIKILINK_PATTERN.findall(line):
+            if target.strip():
+                links.append((line_num, 'embed' if embed else 'link', target.strip()))
+        for embed, target in MARKDOWN_LINK_PATTERN.findall(line):
+            target = target.split('#', 1)[0]
+            if target and not URL_SCHEME_PATTERN.match(target):
+                links.append((line_num, 'markdown-embed' if embed else 'markdown', unquote(target)))
+    return links
+
+def rewrite_links(line, replace):
+    """Return a line with link targets replaced, outside inline code.
+
+    `replace(kind, target)` gets each link's kind and target as extract_links()
+    reports them and returns the new target, or None to leave the link as is.
+    Headings, block references, aliases and link titles are kept; markdown
+    targets are percent-encoded again when needed.
+    """
+    code_spans = [match.span() for match in INLINE_CODE_PATTERN.finditer(line)] if '`' in line else []
+    replacements = []
+    for pattern, markdown in ((WIKILINK_PATTERN, False), (MARKDOWN_LINK_PATTERN, True)):
+        for match in pattern.finditer(line):
+            if any(start < match.end() and match.start() < end for start, end in code_spans):
+                continue
+            embed, written = match.group(1), match.group(2)
+            if markdown:
+                target, hash_mark, anchor = written.partition('#')
+                if not target or URL_SCHEME_PATTERN.match(target):
+                    continue
+                new = replace('markdown-embed' if embed else 'markdown', unquote(target))
+                if new is None:
+                    continue
+                if '%' in target or NEEDS_QUOTING_PATTERN.search(new):
+                    new = quote(new, safe="/!$&'*+,;=:@~")
+                new += hash_mark + anchor
+            else:
+                if not written.strip():
+                    continue
+                new = replace('embed' if embed else 'link', written.strip())
+                if new is None:
+                    continue
+                # Keep any spaces written around the target
+                new = written[:len(written) - len(written.lstrip())] + new + written[len(written.rstrip()):]
+            replacements.append((match.start(2), match.end(2), new))
+
+    for start, end, new in sorted(replacements, reverse=True):
+        line = line[:start] + new + line[end:]
+    return line
+
+def note_key(path):
+    """Return the lookup key of a note path: lowercase, without '.md'."""
+    path = path.lower()
+    return path[:-3] if path.endswith('.md') else path
+
+def _csr(edges, node_count):
+    """Pack (node, other node, line) edges into CSR offset, node and line arrays."""
+    edges.sort()
+    offsets = array('I', [0]) * (node_count + 1)
+    for node, _other, _line in edges:
+        offsets[node + 1] += 1
+    for node in range(node_count):
+        offsets[node + 1] += offsets[node]
+    nodes = array('I', (other for _node, other, _line in edges))
+    lines = array('I', (line for _node, _other, line in edges))
+    return offsets, nodes, lines
+
+class LinkGraph:
+    """Resolved link graph built on top of a VaultIndex."""
+
+    def __init__(self, vault_index):
+        self.vault_index = vault_index
+        self.conn = vault_index.conn
+        self.conn.executescript(SCHEMA)
+        self.paths = []
+        self.built = False
+
+    def refresh(self):
+        """Re-extract links of changed notes and rebuild the graph if needed.
+
+        Links of deleted notes are removed by the foreign key cascade.
+        Returns the number of notes whose links were (re-)extracted.
+        """
+        stale = self.conn.execute(
+            "SELECT files.id, files.path FROM files "
+            "LEFT JOIN lg_docs ON lg_docs.file_id = files.id "
+            "WHERE lg_docs.hash IS NOT files.hash"
+        ).fetchall()
+        vault_path = self.vault_index.vault_path
+
+        with self.conn:
+            for file_id, rel_path in stale:
+                hasher = new_hasher()
+
+                def decoded_lines(f):
+                    for raw_line in f:
+                        hasher.update(raw_line)
+                        yield raw_line.decode('utf-8', 'replace').rstrip('\r\n')
+
+                try:
+                    with open(vault_path / rel_path, 'rb') as f:
+                        links = extract_links(decoded_lines(f))
+                except Exception as e:
+                    print(f"Error reading {vault_path / rel_path}: {e}", file=sys.stderr)
+                    continue
+
+                self.conn.execute("DELETE FROM lg_docs WHERE file_id = ?", (file_id,))
+                self.conn.execute(
+                    "INSERT INTO lg_docs (file_id, hash) VALUES (?, ?)", (file_id, hasher.hexdigest())
+                )
+                self.conn.executemany(
+                    "INSERT INTO lg_links (file_id, line_num, kind, target) VALUES (?, ?, ?, ?)",
+                    [(file_id, *link) for link in links]
+                )
+
+        # Any added, removed or renamed note can change how other notes' links resolve
+        node_count = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        if stale or not self.built or node_count != len(self.paths):
+            self._build()
+        return len(stale)
+
+    def _build(self):
+        """Resolve all stored links into in-memory adjacency arrays."""
+        rows = self.conn.execute("SELECT id, path, frontmatter FROM files ORDER BY path").fetchall()
+        self.paths = [path for _file_id, path, _frontmatter in rows]
+        node_of_file = {file_id: node for node, (file_id, _path, _frontmatter) in enumerate(rows)}
+
+        self.by_path = {}
+        self.by_name = {}
+        self.by_alias = {}
+        for node, (_file_id, path, frontmatter) in enumerate(rows):
+            key = note_key(path)
+            self.by_path[key] = node
+            self.by_name.setdefault(posixpath.basename(key), []).append(node)
+            for alias in frontmatter_aliases(json.loads(frontmatter or '{}')):
+                self.by_alias.setdefault(alias.lower(), node)
+
+        edges = []
+        self.broken = []
+        for file_id, line_num, kind, target in self.conn.execute(
+            "SELECT file_id, line_num, kind, target FROM lg_links ORDER BY file_id, line_num"
+        ):
+            source = node_of_file.get(file_id)
+            if source is None:
+                continue
+            node = self.resolve(target, source, markdown=kind.startswith('markdown'))
+            if node is None:
+                self.broken.append((source, line_num, target))
+            elif node >= 0:
+                edges.append((source, node, line_num))
+
+        node_count = len(self.paths)
+        self.out_offsets, self.out_nodes, self.out_lines = _csr(edges, node_count)
+        self.in_offsets, self.in_nodes, self.in_lines = _csr(
+            [(target, source, line) for source, target, line in edges], node_count
+        )
+        self.broken.sort()
+        self.built = True
+
+    def resolve(self, target, source=None, markdown=False):
+        """Resolve a link target to a node.
+
+        Returns None for broken links and -1 for attachments, which are not
+        part of the graph. Targets that look like file names ("Release 1.2")
+        are only taken for attachments when no note matches them.
+        """
+        target = target.strip().lstrip('/')
+        if target.startswith('./'):
+            target = target[2:]
+        lowered = target.lower()
+        node = self._resolve_note(lowered, source, markdown)
+        if node is None and not lowered.endswith('.md') and ATTACHMENT_PATTERN.search(lowered):
+            return -1
+        return node
+
+    def _resolve_note(self, lowered, source, markdown):
+        """Return the node of a lowercased link target by path, name or alias, or None."""
+        key = note_key(lowered)
+
+        source_dir = posixpath.dirname(self.paths[source]).lower() if source is not None else ''
+        if markdown and source_dir:
+            node = self.by_path.get(posixpath.normpath(posixpath.join(source_dir, key)))
+            if node is not None:
+                return node
+        node = self.by_path.get(key)
+        if node is not None:
+            return node
+
+        candidates = self.by_name.get(posixpath.basename(key), [])
+        if '/' in key:
+            candidates = [node for node in candidates if note_key(self.paths[node]).endswith('/' + key)]
+        if candidates:
+            for node in candidates:
+                if posixpath.dirname(self.paths[node]).lower() == source_dir:
+                    return node
+            return min(candidates, key=lambda node: (len(self.paths[node]), self.paths[node]))
+
+        return self.by_alias.get(lowered)
+
+    def find_note(self, name):
+        """Return the node of a note given by path or name, or None."""
+        node = self.resolve(name)
+        return node if node is not None and node >= 0 else None
+
+    def backlinks(self, node):
+        """Return (source node, line number) for every link pointing at a note."""
+        start, end = self.in_offsets[node], self.in_offsets[node + 1]
+        return list(zip(self.in_nodes[start:end], self.in_lines[start:end]))
+
+    def links(self, node):
+        """Return (target node, line number) for every resolved link in a note."""
+        start, end = self.out_offsets[node], self.out_offsets[node + 1]
+        return list(zip(self.out_nodes[start:end], self.out_lines[start:end]))
+
+    def orphans(self):
+        """Return the notes without any incoming or outgoing link."""
+        return [
+            node for node in range(len(self.paths))
+            if self.in_offsets[node] == self.in_offsets[node + 1]
+            and self.out_offsets[node] == self.out_offsets[node + 1]
+        ]
+
+    def neighbors(self, node, depth=1):
+        """Return (node, distance) for notes within `depth` links in either direction."""
+        distances = {node: 0}
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            if distances[current] == depth:
+                continue
+            for offsets, nodes in ((self.out_offsets, self.out_nodes), (self.in_offsets, self.in_nodes)):
+                for other in nodes[offsets[current]:offsets[current + 1]]:
+                    if other not in distances:
+                        distances[other] = distances[current] + 1
+                        queue.append(other)
+        del distances[node]
+        return sorted(distances.items(), key=lambda item: (item[1], self.paths[item[0]]))
+
+    def query(self, query, note=None, depth=1):
+        """Answer a named query with JSON-friendly result dicts."""
+        if query == 'orphans':
+            return [{'file': self.paths[node]} for node in self.orphans()]
+        if query == 'broken':
+            return [{'file': self.paths[source], 'line_num': line_num, 'target': target}
+                    for source, line_num, target in self.broken]
+        if query not in QUERIES:
+            raise ValueError(f"Unknown link query: {query!r}")
+
+        node = self.find_note(note or '')
+        if node is None:
+            raise ValueError(f"Note not found: {note!r}")
+        if query == 'backlinks':
+            return [{'file': self.paths[source], 'line_num': line_num}
+                    for source, line_num in self.backlinks(node)]
+        if query == 'links':
+            return [{'file': self.paths[target], 'line_num': line_num}
+                    for target, line_num in self.links(node)]
+        return [{'file': self.paths[other], 'distance': distance}
+                for other, distance in self.neighbors(node, depth)]
+
+def query_links(vault_path, query, note=None, depth=1, jobs=1, index=None):
+    """Refresh the link graph and answer one query."""
+    with use_index(vault_path, index, jobs) as index:
+        graph = LinkGraph(index)
+        graph.refresh()
+        return graph.query(query, note, depth)
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the link graph of an Obsidian vault")
+    parser.add_argument("--backlinks", metavar="NOTE",
+                       help="Notes linking to NOTE")
+    parser.add_argument("--links", metavar="NOTE",
+                       help="Notes NOTE links to")
+    parser.add_argument("--neighbors", metavar="NOTE",
+                       help="Notes within --depth links of NOTE, in either direction")
+    parser.add_argument("--depth", type=int, default=1, metavar="K",
+                       help="Number of hops for --neighbors (default: 1)")
+    parser.add_argument("--orphans", action="store_true",
+                       help="Notes without any incoming or outgoing link")
+    parser.add_argument("--broken", action="store_true",
+                       help="Links that do not resolve to a note")
+    parser.add_argument("--json", action="store_true",
+                       help="Emit one JSON object per result (NDJSON)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Scan with N worker processes (0 = all CPUs)")
+    parser.add_argument("--no-daemon", action="store_true",
+                       help="Read the index directly even if the daemon is running")
+
+    args = parser.parse_args()
+
+    for query in ('backlinks', 'links', 'neighbors'):
+        note = getattr(args, query)
+        if note:
+            break
+    else:
+        query = 'orphans' if args.orphans else 'broken' if args.broken else None
+    if query is None:
+        parser.print_help()
+        return 1
+
+    vault_path = load_config()
+
+    results = None
+    if not args.no_daemon:
+        results = vault_daemon.request(vault_path, {'op': 'links', 'query': query, 'note': note,
+                                                    'depth': args.depth})
+    try:
+        if results is None:
+            results = query_links(vault_path, query, note, args.depth, args.jobs)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        elif 'target' in result:
+            print(f"  - {result['file']}:{result['line_num']}: [[{result['target']}]]")
+        elif 'line_num' in result:
+            print(f"  - {result['file']}:{result['line_num']}")
+        elif 'distance' in result:
+            print(f"  - {result['file']} ({result['distance']} hop{'s' if result['distance'] > 1 else ''})")
+        else:
+            print(f"  - {result['file']}")
+
+    if not args.json:
+        print(f"\nFound {len(results)} results")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Obsidian CLI entry point for the tools and long-running services.
+
+Usage:
+    python tools/obsidian_cli.py serve     # Run the vault daemon in the foreground
+    python tools/obsidian_cli.py status    # Check whether the daemon is running
+    python tools/obsidian_cli.py stop      # Ask the daemon to shut down
+
+    python tools/obsidian_cli.py search --filename "meeting"
+    python tools/obsidian_cli.py tasks --query all
+
+Tool commands run the tool's own main() with the remaining arguments. Only the
+named tool is imported, and each tool imports its heavy dependencies (PyYAML,
+the SQLite index, process pools) when it first needs them, so quick queries
+start in a few tens of milliseconds.
+"""
+
+import importlib
+import sys
+
+# Tool commands and the modules that implement them
+TOOLS = {
+    'search': 'vault_search',
+    'tasks': 'find_tasks',
+    'agenda': 'task_index',
+    'links': 'link_graph',
+    'query': 'vault_query',
+    'index': 'vault_index',
+    'fix-sync': 'fix_sync_filenames',
+    'duplicates': 'find_duplicates',
+}
+
+def run_tool(command, argv):
+    """Run a tool's main() as if it was started with `argv`."""
+    module = importlib.import_module(TOOLS[command])
+    sys.argv = [f"{sys.argv[0]} {command}"] + argv
+    return module.main()
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in TOOLS:
+        return run_tool(sys.argv[1], sys.argv[2:])
+
+    # Imported here: tool commands never need them
+    import argparse
+    import vault_daemon
+    from vault_config import load_config
+
+    parser = argparse.ArgumentParser(description="Obsidian CLI tools and services")
+    subparsers = parser.add_subparsers(dest="command")
+    for command, module in TOOLS.items():
+        subparsers.add_parser(command, help=f"Run tools/{module}.py", add_help=False)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the vault daemon")
+    serve_parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                              help="Worker processes for full refreshes (0 = all CPUs)")
+    subparsers.add_parser("status", help="Show whether the daemon is running")
+    subparsers.add_parser("stop", help="Stop the running daemon")
+
+    args = parser.parse_args()
+
+    vault_path = load_config()
+
+    if args.command == "serve":
+        daemon = vault_daemon.VaultDaemon(vault_path, jobs=args.jobs)
+        try:
+            daemon.serve_forever()
+        except RuntimeError as e:
+            print(f"ERROR: {e}")
+            return 1
+        except KeyboardInterrupt:
+            print("\nStopped.")
+
+    elif args.command == "status":
+        status = vault_daemon.request(vault_path, {'op': 'ping'}, timeout=2)
+        if status is None:
+            print("Daemon is not running")
+            return 1
+        watching = "inotify" if status['watching'] else "polling"
+        print(f"Daemon is serving {vault_path} ({status['notes']} notes, {watching})")
+
+    elif args.command == "stop":
+        if vault_daemon.request(vault_path, {'op': 'shutdown'}, timeout=2) is None:
+            print("Daemon is not running")
+            return 1
+        print("Daemon stopped")
+
+    else:
+        parser.print_help()
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,679 @@
+"""
+Path index for note name, alias and folder lookups.
+
+The index is a table of every note name, frontmatter alias and folder in the
+vault, held in a few flat arrays: the names joined by newlines into one
+string (plus a lowercased copy), the note and folder paths joined the same
+way, and the offsets of the entries in array('I')s. Three match modes are
+supported:
+
+    substring   "plan"     matches "Project plan", "Planning"
+    prefix      "proj"     matches "Projects", "project plan"
+    fuzzy       "prjpln"   matches "Projects/Project plan" (fzf-style, on paths)
+
+Queries are smart-case: all-lowercase queries ignore case. Results are
+ranked with fzf's scoring: points for every matched character, bonuses for
+matches at word boundaries, after a '/' and on camelCase humps, and
+penalties for gaps. Ties go to the shorter name. Substring and prefix
+queries are str.find() scans of the joined names ('\n' + prefix finds the
+names starting with a prefix). Fuzzy queries first intersect per-character
+bitsets (Python ints with one bit per entry), so only entries holding every
+letter and digit of the query are scored.
+
+The table is cached in .obsidian-cli/ along with the listing and mtime of
+every folder. A refresh stats each folder and lists only those whose mtime
+changed; adding, removing or renaming a file changes the mtime of its
+folder. New entries are appended and removed ones marked deleted, so a
+refresh costs little more than the stats until deleted entries pile up
+and the table is rebuilt. Aliases come from the vault index (see
+vault_index.py) as of its last refresh, and are re-read whenever its
+database changes.
+
+Usage:
+    from path_index import PathIndex
+    table = PathIndex(vault_path).refresh()
+    for match in table.search("prjpln", mode='fuzzy', limit=10):
+        print(match.path, match.score)
+"""
+
+import marshal
+import operator
+import os
+import re
+import string
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from heapq import heapify, heappop
+from itertools import accumulate, compress, repeat
+from pathlib import Path
+
+from vault_config import STATE_DIR, index_path_for, vault_key
+from vault_scan import IGNORE_FILE, load_ignore_spec, scan_dir
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 2
+
+MATCH_MODES = ('substring', 'prefix', 'fuzzy')
+
+# Entry kinds; removed entries stay in the table as DELETED until it is rebuilt
+DELETED, NOTE, ALIAS, FOLDER = range(4)
+KIND_NAMES = (None, 'note', 'alias', 'folder')
+
+# The table is rebuilt once removed entries make up this share of it (and
+# number at least MIN_DELETED)
+MAX_DELETED_SHARE = 0.2
+MIN_DELETED = 1024
+
+# Characters with a bitset of the entries holding them; the others don't
+# narrow down fuzzy queries
+BITSET_CHARS = string.ascii_lowercase + string.digits
+BIT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+DIGIT_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+# Fuzzy queries with more candidates than this first try the matches right
+# after whitespace, which outscore all others (see _boundary_matches)
+BROAD_FUZZY_QUERY = 10000
+
+# Folders modified this recently (in ns) are listed again on the next
+# refresh, in case they changed again within the same mtime tick
+RACY_MTIME_NS = 2 * 10**9
+
+# fzf's scoring constants (see algo.go in junegunn/fzf)
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = SCORE_MATCH // 2
+BONUS_NON_WORD = SCORE_MATCH // 2
+BONUS_CAMEL123 = BONUS_BOUNDARY + SCORE_GAP_EXTENSION
+BONUS_CONSECUTIVE = -(SCORE_GAP_START + SCORE_GAP_EXTENSION)
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+BONUS_BOUNDARY_WHITE = BONUS_BOUNDARY + 2
+BONUS_BOUNDARY_DELIMITER = BONUS_BOUNDARY + 1
+
+# Character classes, in fzf's order (classes above NON_WORD start words)
+WHITE, NON_WORD, DELIMITER, LOWER, UPPER, LETTER, NUMBER = range(7)
+DELIMITERS = '/,:;|'
+
+PathMatch = namedtuple('PathMatch', ['path', 'kind', 'name', 'score'])
+
+def fold(text):
+    """Return `text` lowercased character for character, so offsets in both agree.
+
+    'İ' is the one character whose lowercase is longer ('i' and a combining
+    dot); it folds to a plain 'i', which is what "istanbul" should match.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = text.replace('\u0130', 'i').lower()
+    return lowered
+
+def char_class(char):
+    """Return fzf's class of a character."""
+    if char.islower():
+        return LOWER
+    if char.isupper():
+        return UPPER
+    if char.isdigit():
+        return NUMBER
+    if char.isalpha():
+        return LETTER
+    if char.isspace():
+        return WHITE
+    return DELIMITER if char in DELIMITERS else NON_WORD
+
+def _bonus(prev_class, char_class):
+    """Return fzf's bonus for matching a character of `char_class` after one of `prev_class`."""
+    if char_class > NON_WORD:
+        if prev_class == WHITE:
+            return BONUS_BOUNDARY_WHITE
+        if prev_class == DELIMITER:
+            return BONUS_BOUNDARY_DELIMITER
+        if prev_class == NON_WORD:
+            return BONUS_BOUNDARY
+    if prev_class == LOWER and char_class == UPPER or prev_class != NUMBER and char_class == NUMBER:
+        return BONUS_CAMEL123
+    if char_class in (NON_WORD, DELIMITER):
+        return BONUS_NON_WORD
+    if char_class == WHITE:
+        return BONUS_BOUNDARY_WHITE
+    return 0
+
+BONUS_MATRIX = [[_bonus(prev, current) for current in range(7)] for prev in range(7)]
+ASCII_CLASSES = [char_class(chr(code)) for code in range(128)]
+
+def score_window(text, folded, needle, start, end):
+    """Score the match of `needle` in text[start:end] the way fzf does.
+
+    `folded` is the text as compared (lowercased for case-insensitive
+    queries). The needle's characters are matched greedily from `start`;
+    every unmatched character in between costs a gap penalty.
+    """
+    score = 0
+    in_gap = False
+    consecutive = 0
+    first_bonus = 0
+    needle_index = 0
+    prev = text[start - 1] if start else ' '
+    prev_class = ASCII_CLASSES[ord(prev)] if prev < '\x80' else char_class(prev)
+    for index in range(start, end):
+        char = text[index]
+        current_class = ASCII_CLASSES[ord(char)] if char < '\x80' else char_class(char)
+        if folded[index] == needle[needle_index]:
+            score += SCORE_MATCH
+            bonus = BONUS_MATRIX[prev_class][current_class]
+            if consecutive == 0:
+                first_bonus = bonus
+            else:
+                if bonus >= BONUS_BOUNDARY and bonus > first_bonus:
+                    first_bonus = bonus
+                bonus = max(bonus, first_bonus, BONUS_CONSECUTIVE)
+            score += bonus * BONUS_FIRST_CHAR_MULTIPLIER if needle_index == 0 else bonus
+            in_gap = False
+            consecutive += 1
+            needle_index += 1
+            if needle_index == len(needle):
+                break
+        else:
+            score += SCORE_GAP_EXTENSION if in_gap else SCORE_GAP_START
+            in_gap = True
+            consecutive = 0
+            first_bonus = 0
+        prev_class = current_class
+    return score
+
+def fuzzy_window(folded, needle):
+    """Return the (start, end) of the shortest match of `needle`'s characters
+    in order that ends where the leftmost match ends, or None (fzf's v1).
+    """
+    end = -1
+    for char in needle:
+        end = folded.find(char, end + 1)
+        if end < 0:
+            return None
+    start = end + 1
+    for char in reversed(needle):
+        start = folded.rfind(char, 0, start)
+    return start, end + 1
+
+def _extend_offsets(offsets, strings):
+    """Append the offsets of strings added to a blob, each followed by a newline."""
+    offsets.extend(accumulate([len(string) + 1 for string in strings], initial=offsets.pop()))
+
+def bit_indexes(bits):
+    """Return the indexes of the set bits of an int, in increasing order."""
+    digits = bin(bits)[:1:-1]
+    # A few set bits are quicker to find one by one than to filter all positions
+    if digits.count('1') * 32 < len(digits):
+        indexes = []
+        index = digits.find('1')
+        while index >= 0:
+            indexes.append(index)
+            index = digits.find('1', index + 1)
+        return indexes
+    flags = digits.encode().translate(DIGIT_BITS)
+    return list(compress(range(len(flags)), flags))
+
+class PathTable:
+    """Name table of the notes, aliases and folders of a vault.
+
+    Entries are numbered in the order they were added. Each has a name,
+    which substring and prefix queries match, a fuzzy text, which fuzzy
+    queries match (the path of notes and folders, an alias itself), and a
+    target: the entry whose path it stands for (an alias' note, or itself).
+    The texts are stored in blobs that start with a newline and end every
+    entry with one, so '\\n' + prefix finds names starting with a prefix.
+    """
+
+    def __init__(self, state=None):
+        if state is None:
+            empty = array('I', [1]).tobytes()
+            state = ('\n', empty, '\n', empty, '\n', empty, '\n', empty, '', b'', b'', {})
+        (self.names, name_offsets, self.lowered, lowered_offsets,
+         self.fuzzy, fuzzy_offsets, self.fuzzy_lowered, fuzzy_lowered_offsets, self.spaces,
+         kinds, targets, self.char_bits) = state
+        self.name_offsets = array('I', name_offsets)
+        self.lowered_offsets = array('I', lowered_offsets)
+        self.fuzzy_offsets = array('I', fuzzy_offsets)
+        self.fuzzy_lowered_offsets = array('I', fuzzy_lowered_offsets)
+        self.kinds = bytearray(kinds)
+        self.targets = array('I', targets)
+        self.deleted = self.kinds.count(DELETED)
+
+    @classmethod
+    def build(cls, notes, folders=(), aliases=None):
+        """Build a table from vault-relative note and folder paths and {note path: [alias]}."""
+        table = cls()
+        table.add(notes, folders, aliases)
+        return table
+
+    @property
+    def state(self):
+        """The table as a tuple of strings, bytes and a dict, for marshal."""
+        return (self.names, self.name_offsets.tobytes(), self.lowered, self.lowered_offsets.tobytes(),
+                self.fuzzy, self.fuzzy_offsets.tobytes(), self.fuzzy_lowered,
+                self.fuzzy_lowered_offsets.tobytes(), self.spaces, bytes(self.kinds),
+                self.targets.tobytes(), self.char_bits)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def name(self, index):
+        return self.names[self.name_offsets[index]:self.name_offsets[index + 1] - 1]
+
+    def fuzzy_text(self, index):
+        return self.fuzzy[self.fuzzy_offsets[index]:self.fuzzy_offsets[index + 1] - 1]
+
+    def path(self, index):
+        """Return the vault-relative path an entry stands for ('Folder/' for folders)."""
+        target = self.targets[index]
+        return self.fuzzy_text(target) + ('.md' if self.kinds[target] == NOTE else '/')
+
+    def add(self, notes=(), folders=(), aliases=None):
+        """Append entries for notes, folders and the aliases in {note path: [alias]}.
+
+        Aliases of notes that are neither added here nor already in the
+        table are skipped.
+        """
+        first = len(self.kinds)
+        entries = [(NOTE, path.rpartition('/')[2][:-3], path[:-3], None) for path in notes]
+        entries += [(FOLDER, path.rpartition('/')[2], path, None) for path in folders]
+        added = {path: first + i for i, path in enumerate(notes)}
+        for path, names in (aliases or {}).items():
+            note = added.get(path)
+            if note is None:
+                note = self._find(NOTE, path[:-3])
+            if note is not None:
+                entries += [(ALIAS, alias, alias, note) for alias in names if '\n' not in alias]
+        if not entries:
+            return
+
+        names = [name for _kind, name, _text, _target in entries]
+        lowered = list(map(fold, names))
+        texts = [text for _kind, _name, text, _target in entries]
+        folded = list(map(fold, texts))
+        self.names += '\n'.join(names) + '\n'
+        self.lowered += '\n'.join(lowered) + '\n'
+        self.fuzzy += '\n'.join(texts) + '\n'
+        self.fuzzy_lowered += '\n'.join(folded) + '\n'
+        _extend_offsets(self.name_offsets, names)
+        _extend_offsets(self.lowered_offsets, lowered)
+        _extend_offsets(self.fuzzy_offsets, texts)
+        _extend_offsets(self.fuzzy_lowered_offsets, folded)
+        # Whitespace other than the newlines between entries, for the fuzzy fast path
+        self.spaces = ''.join(sorted(set(self.spaces).union(
+            char for char in set(''.join(texts)) if char.isspace())))
+        self.kinds.extend(kind for kind, _name, _text, _target in entries)
+        self.targets.extend(first + i if target is None else target
+                            for i, (_kind, _name, _text, target) in enumerate(entries))
+
+        # One C-level pass over the new texts per character; bit i stands for entry i
+        for char in BITSET_CHARS:
+            flags = bytes(map(operator.contains, folded, repeat(char)))
+            if 1 in flags:
+                bits = int(flags.translate(BIT_DIGITS)[::-1], 2) << first
+                self.char_bits[char] = self.char_bits.get(char, 0) | bits
+
+    def update(self, added_notes=(), removed_notes=(), added_folders=(), removed_folders=(),
+               aliases=None, alias_paths=()):
+        """Apply vault changes in place.
+
+        Removed entries are marked DELETED and skipped by queries until the
+        table is rebuilt (see needs_rebuild). `aliases` maps note paths to
+        their aliases; the aliases of added notes and of the notes in
+        `alias_paths` (whose aliases changed) are (re-)added from it.
+        """
+        aliases = aliases or {}
+        for path in removed_notes:
+            index = self._find(NOTE, path[:-3])
+            if index is not None:
+                self._delete(index)
+                for alias_index in self._alias_entries(index):
+                    self._delete(alias_index)
+        for path in removed_folders:
+            index = self._find(FOLDER, path)
+            if index is not None:
+                self._delete(index)
+        alias_paths = set(alias_paths).difference(removed_notes)
+        for path in alias_paths:
+            index = self._find(NOTE, path[:-3])
+            if index is not None:
+                for alias_index in self._alias_entries(index):
+                    self._delete(alias_index)
+        changed = alias_paths.union(added_notes)
+        self.add(added_notes, added_folders,
+                 {path: names for path, names in aliases.items() if path in changed})
+
+    def needs_rebuild(self):
+        """Return whether enough entries were removed to make a rebuild worthwhile."""
+        return self.deleted > max(MIN_DELETED, len(self) * MAX_DELETED_SHARE)
+
+    def _delete(self, index):
+        self.kinds[index] = DELETED
+        self.deleted += 1
+
+    def _find(self, kind, text):
+        """Return the index of the live entry of `kind` with fuzzy text `text`, or None."""
+        needle = '\n' + text + '\n'
+        position = self.fuzzy.find(needle)
+        while position >= 0:
+            index = bisect_left(self.fuzzy_offsets, position + 1)
+            if self.kinds[index] == kind:
+                return index
+            position = self.fuzzy.find(needle, position + 1)
+        return None
+
+    def _alias_entries(self, note):
+        """Return the indexes of the live alias entries of a note entry."""
+        data = self.targets.tobytes()
+        pattern = array('I', [note]).tobytes()
+        found = []
+        position = data.find(pattern)
+        while position >= 0:
+            index, misaligned = divmod(position, self.targets.itemsize)
+            if not misaligned and self.kinds[index] == ALIAS:
+                found.append(index)
+            position = data.find(pattern, position + 1)
+        return found
+
+    def search(self, query, mode='substring', case_sensitive=False, folders=False, limit=None):
+        """Return the best PathMatches of a query, best first.
+
+        A note matched by its name and by aliases is listed once, at its
+        best score. Folders are only returned with `folders`. A query with an
+        uppercase letter is case-sensitive even without `case_sensitive`.
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode: {mode!r}")
+        if not query or '\n' in query:
+            return []
+        case_sensitive = case_sensitive or query != query.lower()
+        needle = query if case_sensitive else fold(query)
+        wanted = (NOTE, ALIAS, FOLDER) if folders else (NOTE, ALIAS)
+        if mode == 'fuzzy':
+            ranked = self._fuzzy_matches(needle, case_sensitive, wanted, limit)
+        else:
+            ranked = list(self._substring_matches(needle, case_sensitive, wanted, mode == 'prefix'))
+
+        # Pop the best matches off a heap, so only those are ever sorted
+        heapify(ranked)
+        results = []
+        seen = set()
+        while ranked and not (limit and len(results) >= limit):
+            score, _length, index = heappop(ranked)
+            target = self.targets[index]
+            if target not in seen:
+                seen.add(target)
+                results.append(PathMatch(self.path(index), KIND_NAMES[self.kinds[index]],
+                                         self.name(index), -score))
+        return results
+
+    def _substring_matches(self, needle, case_sensitive, wanted, prefix=False):
+        """Yield (-score, name length, index) of the names containing (or starting with) needle."""
+        if case_sensitive:
+            blob, offsets = self.names, self.name_offsets
+        else:
+            blob, offsets = self.lowered, self.lowered_offsets
+        # fold() keeps every name's length, so positions in both blobs agree
+        kinds = self.kinds
+        names = self.names
+        size = len(needle)
+        pattern = '\n' + needle if prefix else needle
+        shift = 1 if prefix else 0
+        # A substring match's score only depends on the matched characters
+        # and the one before them
+        scores = {}
+        position = blob.find(pattern)
+        while position >= 0:
+            start = position + shift
+            index = bisect_right(offsets, start) - 1
+            end = offsets[index + 1]
+            if kinds[index] in wanted:
+                key = names[start - 1:start + size]
+                score = scores.get(key)
+                if score is None:
+                    score = scores[key] = score_window(
+                        key, key if case_sensitive else fold(key), needle, 1, len(key))
+                yield -score, end - offsets[index] - 1, index
+            # Only the first occurrence in each name counts
+            position = blob.find(pattern, end - shift)
+
+    def _boundary_matches(self, needle, case_sensitive, wanted, limit):
+        """Return (-score, text length, index) of the fuzzy texts with needle
+        right after whitespace, or None if they hold fewer than `limit` targets.
+
+        Such a match gets the top score, which no match with a gap reaches, so
+        when there are enough of them the other entries can't make the cut.
+        Broad queries ("re") are answered without scoring most of the table.
+        """
+        blob, offsets = (self.fuzzy, self.fuzzy_offsets) if case_sensitive else \
+            (self.fuzzy_lowered, self.fuzzy_lowered_offsets)
+        kinds = self.kinds
+        lengths = self.fuzzy_offsets
+        size = len(needle)
+        score = -(SCORE_MATCH * size + BONUS_BOUNDARY_WHITE * (size + 1))
+        found = {}
+        for space in '\n' + self.spaces:
+            pattern = space + needle
+            position = blob.find(pattern)
+            while position >= 0:
+                index = bisect_right(offsets, position + 1) - 1
+                if kinds[index] in wanted:
+                    found[index] = (score, lengths[index + 1] - lengths[index] - 1, index)
+                position = blob.find(pattern, position + size + 1)
+        if len({self.targets[index] for index in found}) < limit:
+            return None
+        return list(found.values())
+
+    def _fuzzy_matches(self, needle, case_sensitive, wanted, limit=None):
+        """Return (-score, text length, index) of the fuzzy texts holding needle's characters in order."""
+        bits = -1
+        for char in set(fold(needle)):
+            if char in BITSET_CHARS:
+                bits &= self.char_bits.get(char, 0)
+        candidates = bit_indexes(bits) if bits >= 0 else range(len(self.kinds))
+        if limit and len(candidates) > BROAD_FUZZY_QUERY:
+            matches = self._boundary_matches(needle, case_sensitive, wanted, limit)
+            if matches:
+                return matches
+        if case_sensitive:
+            blob, offsets = self.fuzzy, self.fuzzy_offsets
+        else:
+            blob, offsets = self.fuzzy_lowered, self.fuzzy_lowered_offsets
+        # Most candidates fail the in-order check, so it runs as one C-level
+        # pass: a regex of "[^a]*a[^b]*b..." over slices of the blob
+        in_order = re.compile(''.join(f"[^{re.escape(char)}]*{re.escape(char)}" for char in needle))
+        starts = map(offsets.__getitem__, candidates)
+        ends = map(offsets.__getitem__, map(operator.add, candidates, repeat(1)))
+        texts = map(blob.__getitem__, map(slice, starts, ends))
+
+        kinds = self.kinds
+        fuzzy = self.fuzzy
+        text_offsets = self.fuzzy_offsets
+        size = len(needle)
+        matches = []
+        for index in compress(candidates, map(in_order.match, texts)):
+            if kinds[index] not in wanted:
+                continue
+            text = fuzzy[text_offsets[index]:text_offsets[index + 1] - 1]
+            folded = text if case_sensitive else fold(text)
+            window = fuzzy_window(folded, needle)
+            score = score_window(text, folded, needle, *window)
+            # fzf's v1 window can miss a better contiguous match further on
+            found = folded.find(needle, window[0] + 1)
+            while found >= 0:
+                score = max(score, score_window(text, folded, needle, found, found + size))
+                found = folded.find(needle, found + 1)
+            matches.append((-score, len(text), index))
+        return matches
+
+def index_aliases(conn):
+    """Return {note path: [alias]} from the frontmatter stored in a vault index database."""
+    # Imported here: aliases are only re-read after the vault index changed
+    import json
+    from frontmatter import frontmatter_aliases
+
+    aliases = {}
+    for path, frontmatter in conn.execute(
+        "SELECT path, frontmatter FROM files WHERE frontmatter LIKE '%alias%'"
+    ):
+        names = frontmatter_aliases(json.loads(frontmatter or '{}'))
+        if names:
+            aliases[path] = names
+    return aliases
+
+def _split(names):
+    """Split a newline-joined folder listing."""
+    return names.split('\n') if names else []
+
+def _listing_changes(old, new):
+    """Return the (added, removed) notes and (added, removed) folders between two folder listings."""
+    added_notes = []
+    removed_notes = []
+    for prefix in old.keys() | new.keys():
+        before = old[prefix][1] if prefix in old else ''
+        after = new[prefix][1] if prefix in new else ''
+        if before != after:
+            before, after = set(_split(before)), set(_split(after))
+            added_notes += [prefix + name for name in after - before]
+            removed_notes += [prefix + name for name in before - after]
+    added_folders = [prefix[:-1] for prefix in new.keys() - old.keys() if prefix]
+    removed_folders = [prefix[:-1] for prefix in old.keys() - new.keys() if prefix]
+    return added_notes, removed_notes, added_folders, removed_folders
+
+def file_stamp(path):
+    """Return (mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def snapshot_path_for(vault_path):
+    """Return the path index snapshot location for a vault."""
+    return STATE_DIR / f"paths-{vault_key(vault_path)}.snapshot"
+
+class PathIndex:
+    """A vault's PathTable, cached on disk and refreshed from folder mtimes."""
+
+    def __init__(self, vault_path, snapshot_path=None):
+        self.vault_path = Path(vault_path)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else snapshot_path_for(self.vault_path)
+        self.ignore_stamp = None
+        self.index_stamp = None
+        self.folders = {}
+        self.aliases = {}
+        self.table = None
+
+    def load(self):
+        """Read the snapshot left by the last refresh, if it is usable."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = marshal.load(f)
+            version, self.ignore_stamp, self.index_stamp, self.folders, self.aliases, state = snapshot
+            if version != SNAPSHOT_VERSION:
+                raise ValueError("old snapshot layout")
+            self.table = PathTable(state)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.ignore_stamp = self.index_stamp = self.table = None
+            self.folders = {}
+            self.aliases = {}
+
+    def refresh(self):
+        """Bring the table up to date with the vault and return it.
+
+        Every folder is stat()ed, and only folders whose mtime changed since
+        the last refresh are listed again. Notes and folders that appeared or
+        disappeared are added to or removed from the table in place.
+        """
+        if self.table is None:
+            self.load()
+        # Set when the snapshot needs saving even though the table is unchanged
+        stale = False
+
+        ignore_stamp = file_stamp(self.vault_path / IGNORE_FILE)
+        # Listings depend on the ignore patterns
+        reusable = self.folders if ignore_stamp == self.ignore_stamp else {}
+        self.ignore_stamp = ignore_stamp
+        ignore = False  # Loaded when the first folder has to be listed
+
+        folders = {}
+        root = os.fspath(self.vault_path)
+        now = time.time_ns()
+        stack = ['']
+        while stack:
+            prefix = stack.pop()
+            path = os.path.join(root, prefix)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = reusable.get(prefix)
+            if cached is not None and cached[0] == mtime:
+                _mtime, notes, subdirs = cached
+            else:
+                if ignore is False:
+                    ignore = load_ignore_spec(self.vault_path)
+                files, subdir_items = scan_dir(path, prefix, ignore)
+                notes = '\n'.join(entry.name for rel_path, entry in files if rel_path.endswith('.md'))
+                subdirs = '\n'.join(sub_prefix[len(prefix):-1] for _path, sub_prefix in subdir_items)
+                stale = True
+            folders[prefix] = (mtime if now - mtime > RACY_MTIME_NS else -1, notes, subdirs)
+            if subdirs:
+                stack.extend(prefix + name + '/' for name in subdirs.split('\n'))
+
+        aliases = self.aliases
+        db_path = index_path_for(self.vault_path)
+        index_stamp = (file_stamp(db_path), file_stamp(f"{db_path}-wal"))
+        if index_stamp != self.index_stamp:
+            self.index_stamp = index_stamp
+            aliases = self._read_aliases(db_path) if index_stamp[0] else {}
+            stale = True
+
+        if self.table is None:
+            changed = True
+        else:
+            added_notes, removed_notes, added_folders, removed_folders = _listing_changes(self.folders, folders)
+            alias_paths = [path for path in aliases.keys() | self.aliases.keys()
+                           if aliases.get(path) != self.aliases.get(path)]
+            changed = bool(added_notes or removed_notes or added_folders or removed_folders or alias_paths)
+            if changed:
+                self.table.update(added_notes, removed_notes, added_folders, removed_folders,
+                                  aliases, alias_paths)
+        self.folders = folders
+        self.aliases = aliases
+
+        if self.table is None or self.table.needs_rebuild():
+            notes = [prefix + name for prefix, (_mtime, names, _subdirs) in folders.items()
+                     for name in _split(names)]
+            self.table = PathTable.build(notes, [prefix[:-1] for prefix in folders if prefix], aliases)
+        if changed or stale:
+            self.save()
+        return self.table
+
+    def _read_aliases(self, db_path):
+        """Return the aliases stored in the vault index database, or {} if it can't be read."""
+        # Imported here: only needed when the database changed since the last refresh
+        import sqlite3
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                return index_aliases(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return {}
+
+    def save(self):
+        """Write the snapshot atomically; skipped if it can't be stored."""
+        snapshot = (SNAPSHOT_VERSION, self.ignore_stamp, self.index_stamp, self.folders,
+                    self.aliases, self.table.state)
+        temp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                marshal.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            pass
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Persistent task index: tasks in date order, recurrence, and edits by id.
+
+Every task line held by the vault index is parsed once (see
+task_query.parse_task_line) into a row of a table stored next to it, with the
+task's status, due, scheduled, start, done and created dates, priority, tags
+and 🔁 recurrence rule. The date columns have B-tree indexes, so "due this
+week" or "overdue" is a range scan in date order instead of a pass over every
+task line. Only the tasks of notes whose content hash changed are parsed
+again, from the lines the vault index already holds; no note is read.
+
+Each task has a stable id. When a note changes, its task lines take over the
+ids of the old ones with the same text (ignoring status and dates) on the
+same line, then with the same text anywhere in the note, then on the same
+line; the others get new ids, which are not reused until the index is
+rebuilt. Edits by id look up the task's current line, so they still find a
+task after lines above it were added or removed.
+
+Recurrence rules use the Obsidian Tasks syntax:
+
+    every day, every 3 days, every weekday
+    every week, every 2 weeks, every week on Monday, Thursday, every Friday
+    every month, every month on the 15th, every month on the last day
+    every year, every 2 years
+
+Instances are counted from the task's due date (or its scheduled or start
+date). A rule ending in "when done" repeats from the day the task is
+completed, so only its current instance is known. Completing a recurring
+task adds its next instance above it with its dates moved, as Obsidian Tasks
+does; the new instance keeps the task's id.
+
+Usage:
+    python tools/task_index.py --due this-week
+    python tools/task_index.py --due 2026-11-01..2026-11-15 --json
+    python tools/task_index.py --overdue
+    python tools/task_index.py --upcoming 30
+    python tools/task_index.py --ids 42 57 --complete
+    python tools/task_index.py --ids 42 --set-due 2026-11-01
+    python tools/task_index.py --undo 20261017-093000-1a2b
+"""
+
+import argparse
+import json
+import re
+from calendar import monthrange
+from datetime import date, timedelta
+from itertools import count
+
+import vault_daemon
+from task_query import (DATE_FIELD_PATTERN, FIELD_NAMES, PRIORITY_ORDER, parse_date,
+                        parse_task_line)
+from vault_config import load_config
+from vault_index import use_index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ti_files (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ti_tasks (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES ti_files(file_id) ON DELETE CASCADE,
+    line_num INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    description TEXT NOT NULL,
+    is_done INTEGER NOT NULL,
+    due TEXT,
+    scheduled TEXT,
+    start TEXT,
+    done TEXT,
+    created TEXT,
+    priority INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    recurrence TEXT
+);
+CREATE INDEX IF NOT EXISTS ti_tasks_file ON ti_tasks(file_id, line_num);
+CREATE INDEX IF NOT EXISTS ti_tasks_due ON ti_tasks(is_done, due);
+CREATE INDEX IF NOT EXISTS ti_tasks_scheduled ON ti_tasks(is_done, scheduled);
+CREATE INDEX IF NOT EXISTS ti_tasks_start ON ti_tasks(is_done, start);
+CREATE INDEX IF NOT EXISTS ti_tasks_recurring ON ti_tasks(is_done) WHERE recurrence IS NOT NULL;
+"""
+
+SELECT_TASKS = (
+    "SELECT ti_tasks.id, files.path, ti_tasks.line_num, ti_tasks.description, ti_tasks.is_done, "
+    "ti_tasks.due, ti_tasks.scheduled, ti_tasks.start, ti_tasks.done, ti_tasks.created, "
+    "ti_tasks.priority, ti_tasks.tags, ti_tasks.recurrence "
+    "FROM ti_tasks JOIN files ON files.id = ti_tasks.file_id"
+)
+
+# Tasks of stale notes are read from the vault index this many notes at a time
+FETCH_CHUNK = 500
+
+VIEWS = ('due', 'overdue', 'upcoming')
+PERIODS = ('today', 'tomorrow', 'this-week', 'next-week', 'this-month', 'next-month')
+
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+RULE_PATTERN = re.compile(r'every (?:(\d+) )?(day|weekday|week|month|year)s?(?: on (.+))?')
+MONTH_DAY_PATTERN = re.compile(r'(?:the )?(?:(\d{1,2})(?:st|nd|rd|th)?|last(?: day)?)')
+STATUS_PATTERN = re.compile(r'^(\s*- \[).(\])')
+DATE_SIGNS = {
+    'due': '📅',
+    'scheduled': '⏳',
+    'start': '🛫',
+}
+
+class Recurrence:
+    """A parsed 🔁 rule.
+
+    `unit` is 'day', 'week' or 'month' (a year is 12 months); `weekdays`
+    holds the days of the week (0 = Monday) a weekly rule repeats on, and
+    `month_day` the day of the month (or 'last') of a monthly one.
+    """
+
+    def __init__(self, unit, interval=1, weekdays=(), month_day=None, when_done=False):
+        self.unit = unit
+        self.interval = interval
+        self.weekdays = weekdays
+        self.month_day = month_day
+        self.when_done = when_done
+
+    def occurrences(self, anchor):
+        """Yield the dates the rule repeats on, in order, from `anchor` on."""
+        if self.unit == 'day':
+            for days in count(0, self.interval):
+                yield anchor + timedelta(days=days)
+        elif self.unit == 'week':
+            monday = anchor - timedelta(days=anchor.weekday())
+            weekdays = self.weekdays or (anchor.weekday(),)
+            for weeks in count(0, self.interval):
+                for weekday in weekdays:
+                    day = monday + timedelta(weeks=weeks, days=weekday)
+                    if day >= anchor:
+                        yield day
+        else:
+            for months in count(0, self.interval):
+                year, month = divmod(anchor.month - 1 + months, 12)
+                year, month = anchor.year + year, month + 1
+                last = monthrange(year, month)[1]
+                day = date(year, month, last if self.month_day == 'last'
+                           else min(self.month_day or anchor.day, last))
+                if day >= anchor:
+                    yield day
+
+    def next_date(self, reference, completed):
+        """Return the date of the instance after the one due on `reference`, completed on `completed`."""
+        anchor = completed if self.when_done else reference
+        for day in self.occurrences(anchor):
+            if day > anchor:
+                return day
+
+def parse_recurrence(text):
+    """Parse a 🔁 rule, returning a Recurrence or None for rules it does not know."""
+    text = ' '.join(text.lower().split())
+    when_done = text.endswith('when done')
+    if when_done:
+        text = text[:-len('when done')].rstrip(' ,')
+
+    match = RULE_PATTERN.fullmatch(text)
+    if match:
+        interval, unit, on = int(match.group(1) or 1), match.group(2), match.group(3)
+    elif text.startswith('every '):
+        # "every Monday, Thursday"
+        interval, unit, on = 1, 'week', text[len('every '):]
+    else:
+        return None
+    if interval < 1:
+        return None
+
+    weekdays = ()
+    month_day = None
+    if unit == 'weekday':
+        unit, weekdays = 'week', (0, 1, 2, 3, 4)
+        if on or interval != 1:
+            return None
+    elif unit == 'year':
+        unit, interval = 'month', interval * 12
+        if on:
+            return None
+    elif on and unit == 'week':
+        weekdays = set()
+        for name in re.findall(r'[a-z]+', on):
+            if name == 'and':
+                continue
+            days = [day for day, weekday in enumerate(WEEKDAY_NAMES)
+                    if len(name) >= 3 and weekday.startswith(name)]
+            if not days:
+                return None
+            weekdays.update(days)
+        weekdays = tuple(sorted(weekdays))
+    elif on and unit == 'month':
+        match = MONTH_DAY_PATTERN.fullmatch(on)
+        if not match or (match.group(1) and not 1 <= int(match.group(1)) <= 31):
+            return None
+        month_day = int(match.group(1)) if match.group(1) else 'last'
+    elif on:
+        return None
+    return Recurrence(unit, interval, weekdays, month_day, when_done)
+
+def instances(rule, reference, first, last):
+    """Yield the dates of a recurring task's instances between `first` and `last`.
+
+    The instance due on `reference` comes first; it is the only one known for
+    a rule that is not understood or that repeats from the completion date.
+    """
+    if first <= reference <= last:
+        yield reference
+    if rule is None or rule.when_done:
+        return
+    for day in rule.occurrences(reference):
+        if day > last:
+            return
+        if day > reference and day >= first:
+            yield day
+
+def task_key(description):
+    """Return a task's text without the dates that completing or rescheduling it changes."""
+    return ' '.join(DATE_FIELD_PATTERN.sub(' ', description).split())
+
+def assign_ids(old, new, next_id):
+    """Return the ids of a note's tasks, and the next unused id.
+
+    `old` holds (id, line number, key) for the note's tasks as indexed so far
+    and `new` (line number, key) for its tasks now, keys as of task_key().
+    """
+    ids = [None] * len(new)
+    unused = {task_id: (line_num, key) for task_id, line_num, key in old}
+    for match_on in (lambda line_num, key: (line_num, key),
+                     lambda line_num, key: key,
+                     lambda line_num, key: line_num):
+        available = {}
+        for task_id, (line_num, key) in sorted(unused.items(), key=lambda item: item[1][0]):
+            available.setdefault(match_on(line_num, key), []).append(task_id)
+        for position, (line_num, key) in enumerate(new):
+            candidates = available.get(match_on(line_num, key))
+            if ids[position] is None and candidates:
+                ids[position] = candidates.pop(0)
+                del unused[ids[position]]
+    for position, task_id in enumerate(ids):
+        if task_id is None:
+            ids[position] = next_id
+            next_id += 1
+    return ids, next_id
+
+def task_record(row):
+    """Return the JSON-friendly dict of a ti_tasks row selected with SELECT_TASKS."""
+    (task_id, path, line_num, description, is_done, due, scheduled, start, done, created,
+     priority, tags, recurrence) = row
+    return {
+        'id': task_id,
+        'file': path,
+        'line_num': line_num,
+        'description': description,
+        'is_done': bool(is_done),
+        'due': due,
+        'scheduled': scheduled,
+        'start': start,
+        'done': done,
+        'created': created,
+        'priority': PRIORITY_ORDER[priority],
+        'tags': json.loads(tags),
+        'recurrence': recurrence,
+    }
+
+def set_task_date(line, field, value):
+    """Return a task line with a date field ('due', 'scheduled' or 'start') set to `value`."""
+    signs = '📅📆' if field == 'due' else DATE_SIGNS[field]
+    pattern = re.compile(f"[{signs}]\\s*\\d{{4}}-\\d{{2}}-\\d{{2}}")
+    if pattern.search(line):
+        return pattern.sub(lambda match: f"{match.group()[0]} {value}", line, count=1)
+    return f"{line.rstrip()} {DATE_SIGNS[field]} {value}"
+
+def next_instance(line, completed):
+    """Return the line of a recurring task's next instance, or None if it can't be placed."""
+    task = parse_task_line(line, 0)
+    rule = parse_recurrence(task['recurrence'] or '')
+    reference = task['due_date'] or task['scheduled_date'] or task['start_date']
+    if rule is None or reference is None:
+        return None
+    shift = rule.next_date(reference, completed) - reference
+    for field in DATE_SIGNS:
+        value = task[FIELD_NAMES[field]]
+        if value:
+            line = set_task_date(line, field, (value + shift).isoformat())
+    return STATUS_PATTERN.sub(r'\g<1> \g<2>', line, count=1)
+
+def period_range(period, today=None):
+    """Return the first and last date of a period name or a 'YYYY-MM-DD..YYYY-MM-DD' range."""
+    today = today or date.today()
+    if period in ('today', 'tomorrow'):
+        day = today + timedelta(days=period == 'tomorrow')
+        return day, day
+    if period in ('this-week', 'next-week'):
+        monday = today - timedelta(days=today.weekday()) + timedelta(weeks=period == 'next-week')
+        return monday, monday + timedelta(days=6)
+    if period in ('this-month', 'next-month'):
+        year, month = today.year, today.month
+        if period == 'next-month':
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+    first, _, last = period.partition('..')
+    first, last = parse_date(first.strip()), parse_date((last or first).strip())
+    if first is None or last is None:
+        raise ValueError(f"Invalid period: {period!r} (use {', '.join(PERIODS)} or DATE..DATE)")
+    return first, last
+
+class TaskIndex:
+    """Parsed tasks of a vault, stored next to its VaultIndex."""
+
+    def __init__(self, vault_index):
+        self.vault_index = vault_index
+        self.conn = vault_index.conn
+        self.conn.executescript(SCHEMA)
+
+    def refresh(self):
+        """Re-parse the tasks of notes whose content hash differs from the vault index.
+
+        Tasks of deleted notes are removed by the foreign key cascade.
+        Returns the number of notes whose tasks were (re-)parsed.
+        """
+        stale = self.conn.execute(
+            "SELECT files.id, files.hash FROM files "
+            "LEFT JOIN ti_files ON ti_files.file_id = files.id "
+            "WHERE ti_files.hash IS NOT files.hash"
+        ).fetchall()
+        if not stale:
+            return 0
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_task_id'").fetchone()
+        next_id = int(row[0]) if row else 1
+        with self.conn:
+            for start in range(0, len(stale), FETCH_CHUNK):
+                chunk = stale[start:start + FETCH_CHUNK]
+                file_ids = [file_id for file_id, _digest in chunk]
+                placeholders = ','.join('?' * len(file_ids))
+                old = {}
+                for file_id, task_id, line_num, description in self.conn.execute(
+                    "SELECT file_id, id, line_num, description FROM ti_tasks "
+                    f"WHERE file_id IN ({placeholders})", file_ids
+                ):
+                    old.setdefault(file_id, []).append((task_id, line_num, task_key(description)))
+                lines = {}
+                for file_id, line_num, line in self.conn.execute(
+                    f"SELECT file_id, line_num, line FROM tasks WHERE file_id IN ({placeholders}) "
+                    "ORDER BY file_id, line_num", file_ids
+                ):
+                    lines.setdefault(file_id, []).append((line, parse_task_line(line, line_num)))
+
+                for file_id, digest in chunk:
+                    tasks = [(line, task) for line, task in lines.get(file_id, ()) if task]
+                    ids, next_id = assign_ids(
+                        old.get(file_id, ()),
+                        [(task['line_num'], task_key(task['description'])) for _line, task in tasks],
+                        next_id
+                    )
+                    self.conn.execute("DELETE FROM ti_tasks WHERE file_id = ?", (file_id,))
+                    self.conn.execute(
+                        "INSERT INTO ti_files (file_id, hash) VALUES (?, ?) "
+                        "ON CONFLICT(file_id) DO UPDATE SET hash = excluded.hash",
+                        (file_id, digest)
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO ti_tasks (id, file_id, line_num, line, description, is_done, "
+                        "due, scheduled, start, done, created, priority, tags, recurrence) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(task_id, file_id, task['line_num'], line, task['description'],
+                          task['is_done'],
+                          *(task[field] and task[field].isoformat()
+                            for field in ('due_date', 'scheduled_date', 'start_date',
+                                          'done_date', 'created_date')),
+                          PRIORITY_ORDER.index(task['priority']), json.dumps(task['tags']),
+                          task['recurrence'])
+                         for task_id, (line, task) in zip(ids, tasks)]
+                    )
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('next_task_id', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (str(next_id),)
+            )
+        return len(stale)
+
+    def _select(self, where, params, order):
+        return [task_record(row) for row in self.conn.execute(
+            f"{SELECT_TASKS} WHERE {where} ORDER BY {order}", params
+        )]
+
+    def due(self, first, last):
+        """Return the open tasks due from `first` to `last`, by due date, then priority."""
+        return self._select("ti_tasks.is_done = 0 AND ti_tasks.due BETWEEN ? AND ?",
+                            (first.isoformat(), last.isoformat()),
+                            "ti_tasks.due, ti_tasks.priority, files.path, ti_tasks.line_num")
+
+    def overdue(self, today):
+        """Return the open tasks due before `today`, by priority, then due date."""
+        return self._select("ti_tasks.is_done = 0 AND ti_tasks.due < ?", (today.isoformat(),),
+                            "ti_tasks.priority, ti_tasks.due, files.path, ti_tasks.line_num")
+
+    def upcoming(self, first, last):
+        """Return the instances of open recurring tasks from `first` to `last`, by date.
+
+        Each result is a task with the 'date' of one of its instances.
+        """
+        results = []
+        for task in self._select(
+            "ti_tasks.is_done = 0 AND ti_tasks.recurrence IS NOT NULL "
+            "AND COALESCE(ti_tasks.due, ti_tasks.scheduled, ti_tasks.start) <= ?",
+            (last.isoformat(),), "files.path, ti_tasks.line_num"
+        ):
+            reference = date.fromisoformat(task['due'] or task['scheduled'] or task['start'])
+            rule = parse_recurrence(task['recurrence'])
+            results.extend({**task, 'date': day.isoformat()}
+                           for day in instances(rule, reference, first, last))
+        results.sort(key=lambda task: (task['date'], PRIORITY_ORDER.index(task['priority'])))
+        return results
+
+    def edits(self, task_ids, complete=False, dates=None, today=None):
+        """Return the line edits completing tasks or setting their dates, and the unknown ids.
+
+        `dates` maps 'due', 'scheduled' or 'start' to the new ISO date.
+        Completing a task that is already done leaves it as it is.
+        """
+        today = today or date.today()
+        task_ids = list(dict.fromkeys(task_ids))
+        placeholders = ','.join('?' * len(task_ids))
+        rows = {task_id: (path, line_num, line) for task_id, path, line_num, line in self.conn.execute(
+            "SELECT ti_tasks.id, files.path, ti_tasks.line_num, ti_tasks.line "
+            "FROM ti_tasks JOIN files ON files.id = ti_tasks.file_id "
+            f"WHERE ti_tasks.id IN ({placeholders})", task_ids
+        )}
+
+        edits = []
+        for task_id in task_ids:
+            if task_id not in rows:
+                continue
+            path, line_num, line = rows[task_id]
+            new = line
+            for field, value in (dates or {}).items():
+                new = set_task_date(new, field, value)
+            task = parse_task_line(new, line_num)
+            if complete and not task['is_done']:
+                done = STATUS_PATTERN.sub(r'\g<1>x\g<2>', new, count=1).rstrip()
+                done = f"{done} ✅ {today.isoformat()}"
+                following = next_instance(new, today) if task['recurrence'] is not None else None
+                new = f"{following}\n{done}" if following else done
+            if new != line:
+                edits.append({'path': path, 'line_num': line_num, 'old': line, 'new': new})
+        return edits, [task_id for task_id in task_ids if task_id not in rows]
+
+def query_tasks(vault_path, view, period=None, days=None, jobs=1, index=None, today=None):
+    """Refresh the task index and answer a view.
+
+    'due' lists the tasks due in `period` (this week by default), 'overdue'
+    those due before today and 'upcoming' the recurring instances in the
+    next `days` days (7 by default).
+    """
+    today = today or date.today()
+    period = period or 'this-week'
+    days = 7 if days is None else days
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view: {view!r}")
+    # Checked first, so that a bad period fails before the index is refreshed
+    first, last = period_range(period, today) if view == 'due' else (today, today + timedelta(days=days))
+    with use_index(vault_path, index, jobs) as index:
+        tasks = TaskIndex(index)
+        tasks.refresh()
+        if view == 'due':
+            return tasks.due(first, last)
+        if view == 'overdue':
+            return tasks.overdue(today)
+        return tasks.upcoming(first, last)
+
+def update_tasks(vault_path, task_ids, complete=False, dates=None, journal=True, jobs=1, today=None):
+    """Complete tasks or set their dates by id.
+
+    Every note is rewritten once, atomically, and only if the task lines still
+    match the index. Returns (run id for --undo or None, lines updated, unknown ids).
+    """
+    # Imported here: only runs that write notes need the journal
+    from vault_write import apply_line_edits
+
+    with use_index(vault_path, None, jobs) as index:
+        tasks = TaskIndex(index)
+        tasks.refresh()
+        edits, unknown = tasks.edits(task_ids, complete, dates, today)
+        run_id, updated = apply_line_edits(vault_path, edits, journal)
+        # Re-index the edited notes now, so the next query sees the changes
+        index.refresh_paths(sorted({edit['path'] for edit in edits}))
+        tasks.refresh()
+    return run_id, updated, unknown
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and update the tasks of an Obsidian vault by date and id")
+    parser.add_argument("--due", metavar="PERIOD",
+                       help=f"Open tasks due in PERIOD ({', '.join(PERIODS)} or DATE..DATE)")
+    parser.add_argument("--overdue", action="store_true",
+                       help="Open tasks due before today, highest priority first")
+    parser.add_argument("--upcoming", type=int, metavar="DAYS",
+                       help="Instances of recurring tasks in the next DAYS days")
+    parser.add_argument("--ids", type=int, nargs='+', metavar="ID",
+                       help="Tasks to update (ids as listed by the queries)")
+    parser.add_argument("--complete", action="store_true",
+                       help="Mark the --ids tasks done; recurring ones get their next instance")
+    parser.add_argument("--set-due", metavar="DATE",
+                       help="Set the due date of the --ids tasks (format: YYYY-MM-DD)")
+    parser.add_argument("--set-scheduled", metavar="DATE",
+                       help="Set the scheduled date of the --ids tasks")
+    parser.add_argument("--set-start", metavar="DATE",
+                       help="Set the start date of the --ids tasks")
+    parser.add_argument("--no-backup", action="store_true",
+                       help="Don't record an undo journal when updating tasks")
+    parser.add_argument("--undo", metavar="RUN_ID",
+                       help="Revert the task updates made by an earlier run")
+    parser.add_argument("--json", action="store_true",
+                       help="Emit one JSON object per task (NDJSON)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Scan with N worker processes (0 = all CPUs)")
+    parser.add_argument("--no-daemon", action="store_true",
+                       help="Read the index directly even if the daemon is running")
+
+    args = parser.parse_args()
+
+    vault_path = load_config()
+
+    if args.undo:
+        # Imported here: the journal is only needed to write or undo
+        from vault_write import undo_run
+        try:
+            restored = undo_run(vault_path, args.undo)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"\nRestored {restored} task lines from run {args.undo}")
+        return 0
+
+    if args.ids:
+        dates = {field: getattr(args, f"set_{field}") for field in DATE_SIGNS
+                 if getattr(args, f"set_{field}")}
+        for value in dates.values():
+            if parse_date(value) is None:
+                print(f"Error: Invalid date format '{value}'. Use YYYY-MM-DD")
+                return 1
+        if not args.complete and not dates:
+            print("Error: --ids needs --complete or a --set-due/--set-scheduled/--set-start date")
+            return 1
+        run_id, updated, unknown = update_tasks(vault_path, args.ids, args.complete, dates,
+                                                not args.no_backup, args.jobs)
+        for task_id in unknown:
+            print(f"No task with id {task_id}")
+        print(f"\nUpdated {updated} tasks")
+        if run_id:
+            print(f"Undo with: python tools/task_index.py --undo {run_id}")
+        return 0
+
+    if args.due:
+        view = 'due'
+    elif args.overdue:
+        view = 'overdue'
+    elif args.upcoming is not None:
+        view = 'upcoming'
+    else:
+        parser.print_help()
+        return 1
+
+    results = None
+    if not args.no_daemon:
+        results = vault_daemon.request(vault_path, {'op': 'agenda', 'view': view, 'period': args.due,
+                                                    'days': args.upcoming})
+    try:
+        if results is None:
+            results = query_tasks(vault_path, view, args.due, args.upcoming, args.jobs)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    for task in results:
+        if args.json:
+            print(json.dumps(task, ensure_ascii=False))
+        else:
+            when = task.get('date') or task['due'] or ''
+            print(f"  [{task['id']}] {when:<10}  {task['file']}:{task['line_num']}: {task['description']}")
+
+    if not args.json:
+        print(f"\nFound {len(results)} {'instances' if view == 'upcoming' else 'tasks'}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,327 @@
+"""
+Task parsing and a small Obsidian Tasks style query language.
+
+A query is a list of filters, one per line or separated by commas. A task must
+match every filter. Supported filters (keywords are case-insensitive):
+
+    done / not done
+    is blocked / is not blocked
+    is recurring / is not recurring
+    has <field> date / no <field> date
+    <field> before|after|on|on or before|on or after <date>
+    path|description includes <text>
+    path|description does not include <text>
+    path|description regex matches /<regex>/[i]
+    path|description regex does not match /<regex>/[i]
+    (<filter>) OR (<filter>) ...
+    (<filter>) AND (<filter>) ...
+
+<field> is one of due, scheduled, start, done or created, and <date> is today,
+tomorrow, yesterday or YYYY-MM-DD. Dates are resolved once, when the query is
+compiled. All 'does not include' filters on the same field are merged into a
+single regex alternation.
+
+Named queries can be added (or the built-in ones overridden) under
+`task_queries` in config.yaml.
+"""
+
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+
+from frontmatter import INLINE_TAG_PATTERN
+
+TASK_PATTERN = re.compile(r'^(\s*)- \[(.)\]\s+(.*)$')
+
+# All Obsidian Tasks date fields in one pass over the description
+DATE_FIELD_PATTERN = re.compile(r'([📅📆⏳🛫✅➕])\s*(\d{4}-\d{2}-\d{2})')
+DATE_FIELDS = {
+    '📅': 'due_date',
+    '📆': 'due_date',
+    '⏳': 'scheduled_date',
+    '🛫': 'start_date',
+    '✅': 'done_date',
+    '➕': 'created_date',
+}
+PRIORITY_PATTERN = re.compile(r'[🔺⏫🔼🔽⏬]')
+PRIORITIES = {
+    '🔺': 'highest',
+    '⏫': 'high',
+    '🔼': 'medium',
+    '🔽': 'low',
+    '⏬': 'lowest',
+}
+# Highest first, as Obsidian Tasks sorts them; tasks without a sign are 'normal'
+PRIORITY_ORDER = ['highest', 'high', 'medium', 'normal', 'low', 'lowest']
+# A 🔁 rule runs up to the next task field or tag
+RECURRENCE_PATTERN = re.compile(r'🔁\s*([^#📅📆⏳🛫✅➕🔺⏫🔼🔽⏬⛔🆔]*)')
+FIELD_NAMES = {
+    'due': 'due_date',
+    'scheduled': 'scheduled_date',
+    'start': 'start_date',
+    'done': 'done_date',
+    'created': 'created_date',
+}
+
+BUILTIN_QUERIES = {
+    'to-process': """
+        description does not include @pc, description does not include @work
+        description does not include @home, description does not include @partner
+        description does not include @out, description does not include @garden
+        description does not include @someday, description does not include @ai
+        description does not include @ponderables, description does not include @stuck
+        description regex does not match /^\\d{2}:\\d{2}\\s*-\\s*\\d{2}:\\d{2}/
+        description regex does not match /^$/
+        path does not include Checklist, path does not include Templates
+        path does not include Recurring, path does not include obsidian-tasks
+        (no due date) OR (due before today)
+        (no scheduled date) OR (scheduled before today)
+        is not blocked
+        is not recurring
+        not done
+    """,
+    'all': "not done",
+}
+
+class QueryError(ValueError):
+    """Raised for filters the query language does not understand."""
+
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    """Parse a YYYY-MM-DD date, returning None if it is not a valid date."""
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+def parse_task_line(line, line_num):
+    """Parse a task line and extract metadata."""
+    # Cheap rejection before any regex runs
+    if not line.lstrip().startswith('- ['):
+        return None
+
+    task_match = TASK_PATTERN.match(line)
+    if not task_match:
+        return None
+
+    indent, status, description = task_match.groups()
+    task = {
+        'line_num': line_num,
+        'description': description.strip(),
+        'is_done': status.lower() != ' ',
+        'due_date': None,
+        'scheduled_date': None,
+        'start_date': None,
+        'done_date': None,
+        'created_date': None,
+        # Tasks that depend on others
+        'is_blocked': '⛔' in description,
+        'priority': 'normal',
+        'tags': [],
+        # The 🔁 rule text ('' if it has none), None for one-off tasks
+        'recurrence': None,
+        'indent': len(indent),
+    }
+
+    for emoji, value in DATE_FIELD_PATTERN.findall(description):
+        field = DATE_FIELDS[emoji]
+        if task[field] is None:
+            task[field] = parse_date(value)
+
+    match = PRIORITY_PATTERN.search(description)
+    if match:
+        task['priority'] = PRIORITIES[match.group()]
+    if '#' in description:
+        task['tags'] = [tag.lower() for tag in INLINE_TAG_PATTERN.findall(description)
+                        if not tag.isdigit()]
+    if '🔁' in description:
+        task['recurrence'] = RECURRENCE_PATTERN.search(description).group(1).strip()
+
+    return task
+
+def split_filters(text):
+    """Split query text on newlines and on commas outside /regex/ and parentheses."""
+    filters = []
+    for line in text.splitlines():
+        current = ''
+        depth = 0
+        in_regex = False
+        for char in line:
+            if char == '/' and (in_regex or current.rstrip().lower().endswith(('matches', 'match'))):
+                in_regex = not in_regex
+            elif not in_regex and char == '(':
+                depth += 1
+            elif not in_regex and char == ')':
+                depth -= 1
+            if char == ',' and depth == 0 and not in_regex:
+                filters.append(current.strip())
+                current = ''
+            else:
+                current += char
+        filters.append(current.strip())
+    return [f for f in filters if f]
+
+def resolve_date(text, today):
+    """Resolve a date keyword or YYYY-MM-DD string relative to today."""
+    text = text.strip().lower()
+    relative = {'today': 0, 'tomorrow': 1, 'yesterday': -1}
+    if text in relative:
+        return today + timedelta(days=relative[text])
+    value = parse_date(text)
+    if value is None:
+        raise QueryError(f"Invalid date: {text!r}")
+    return value
+
+def parse_regex(text):
+    """Parse a /regex/flags literal into a compiled pattern."""
+    match = REGEX_LITERAL.fullmatch(text.strip())
+    if not match:
+        raise QueryError(f"Expected /regex/: {text!r}")
+    return re.compile(match.group(1), re.IGNORECASE if match.group(2) else 0)
+
+DATE_FILTER = re.compile(
+    r'(due|scheduled|start|done|created)\s+(on or before|on or after|before|after|on)\s+(.+)', re.I
+)
+HAS_DATE_FILTER = re.compile(r'(has|no)\s+(due|scheduled|start|done|created)\s+date', re.I)
+TEXT_FILTER = re.compile(r'(path|description)\s+(includes|does not include)\s+(.+)', re.I)
+REGEX_FILTER = re.compile(r'(path|description)\s+regex\s+(matches|does not match)\s+(.+)', re.I)
+BOOLEAN_FILTER = re.compile(r'\((.*)\)\s+(OR|AND)\s+\((.*)\)', re.I)
+REGEX_LITERAL = re.compile(r'/(.*)/([i]*)')
+
+COMPARISONS = {
+    'before': lambda value, target: value < target,
+    'after': lambda value, target: value > target,
+    'on': lambda value, target: value == target,
+    'on or before': lambda value, target: value <= target,
+    'on or after': lambda value, target: value >= target,
+}
+
+def compile_filter(text, today):
+    """Compile one filter into a (field, predicate) pair.
+
+    field is 'path' for predicates over the note path and 'task' for
+    predicates over a parsed task.
+    """
+    lowered = text.lower()
+
+    match = BOOLEAN_FILTER.fullmatch(text)
+    if match:
+        # Split "(a) OR (b) OR (c)" into its parenthesized parts
+        operator = match.group(2).upper()
+        parts = re.split(rf'\)\s+{operator}\s+\(', text.strip()[1:-1], flags=re.I)
+        compiled = [compile_filter(part, today) for part in parts]
+        if any(field == 'path' for field, _ in compiled):
+            raise QueryError(f"Path filters cannot be combined with {operator}: {text!r}")
+        predicates = [predicate for _, predicate in compiled]
+        if operator == 'OR':
+            return 'task', lambda task: any(p(task) for p in predicates)
+        return 'task', lambda task: all(p(task) for p in predicates)
+
+    if lowered == 'not done':
+        return 'task', lambda task: not task['is_done']
+    if lowered == 'done':
+        return 'task', lambda task: task['is_done']
+    if lowered == 'is blocked':
+        return 'task', lambda task: task['is_blocked']
+    if lowered == 'is not blocked':
+        return 'task', lambda task: not task['is_blocked']
+    if lowered == 'is recurring':
+        return 'task', lambda task: task['recurrence'] is not None
+    if lowered == 'is not recurring':
+        return 'task', lambda task: task['recurrence'] is None
+
+    match = HAS_DATE_FILTER.fullmatch(text)
+    if match:
+        field = FIELD_NAMES[match.group(2).lower()]
+        if match.group(1).lower() == 'has':
+            return 'task', lambda task: task[field] is not None
+        return 'task', lambda task: task[field] is None
+
+    match = DATE_FILTER.fullmatch(text)
+    if match:
+        field = FIELD_NAMES[match.group(1).lower()]
+        compare = COMPARISONS[' '.join(match.group(2).lower().split())]
+        target = resolve_date(match.group(3), today)
+        return 'task', lambda task: task[field] is not None and compare(task[field], target)
+
+    match = REGEX_FILTER.fullmatch(text)
+    if match:
+        field = match.group(1).lower()
+        pattern = parse_regex(match.group(3))
+        negate = match.group(2).lower() == 'does not match'
+        return field, make_text_predicate(field, pattern, negate)
+
+    match = TEXT_FILTER.fullmatch(text)
+    if match:
+        field = match.group(1).lower()
+        pattern = re.compile(re.escape(match.group(3).strip()))
+        negate = match.group(2).lower() == 'does not include'
+        return field, make_text_predicate(field, pattern, negate)
+
+    raise QueryError(f"Unknown task filter: {text!r}")
+
+def make_text_predicate(field, pattern, negate):
+    """Build a predicate searching a path string or a task description."""
+    search = pattern.search
+    if field == 'path':
+        if negate:
+            return lambda path: search(path) is None
+        return lambda path: search(path) is not None
+    if negate:
+        return lambda task: search(task['description']) is None
+    return lambda task: search(task['description']) is not None
+
+class TaskQuery:
+    """A compiled task query."""
+
+    def __init__(self, text, today=None):
+        self.text = text
+        today = today or date.today()
+        filters = split_filters(text)
+
+        # Merge 'does not include' filters per field into one alternation regex
+        excluded = {}
+        remaining = []
+        for text_filter in filters:
+            match = TEXT_FILTER.fullmatch(text_filter)
+            if match and match.group(2).lower() == 'does not include':
+                excluded.setdefault(match.group(1).lower(), []).append(
+                    re.escape(match.group(3).strip())
+                )
+            else:
+                remaining.append(text_filter)
+
+        self.path_predicates = []
+        self.task_predicates = []
+        for field, alternatives in excluded.items():
+            pattern = re.compile('|'.join(alternatives))
+            self._add(field, make_text_predicate(field, pattern, negate=True))
+        for text_filter in remaining:
+            self._add(*compile_filter(text_filter, today))
+
+    def _add(self, field, predicate):
+        if field == 'path':
+            self.path_predicates.append(predicate)
+        else:
+            self.task_predicates.append(predicate)
+
+    def matches_path(self, path):
+        """Return whether tasks in the note at `path` (vault-relative) can match."""
+        return all(predicate(path) for predicate in self.path_predicates)
+
+    def matches(self, task):
+        """Return whether a parsed task matches the task filters."""
+        return all(predicate(task) for predicate in self.task_predicates)
+
+def query_names(config=None):
+    """Return the names of all built-in and configured queries."""
+    configured = (config or {}).get('task_queries') or {}
+    return sorted(set(BUILTIN_QUERIES) | set(configured))
+
+def named_query(name, config=None, today=None):
+    """Compile a named query from config.yaml, falling back to the built-in ones."""
+    configured = (config or {}).get('task_queries') or {}
+    text = configured.get(name, BUILTIN_QUERIES.get(name))
+    if text is None:
+        raise QueryError(f"Unknown task query: {name!r}")
+    return TaskQuery(text, today)
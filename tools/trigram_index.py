@@ -0,0 +1,335 @@
+"""
+Trigram index for regex content search.
+
+For every note the index stores the set of byte trigrams of its case-folded
+text, next to the vault index (see vault_index.py), and posting lists map each
+trigram to the notes containing it. A regex query is parsed
+into its syntax tree, from which a boolean query over the trigrams any match
+must contain is derived (as in Google Code Search and zoekt):
+
+    budget\\s+client       bud AND udg AND dge AND get AND cli AND ...
+    (alpha|beta)\\d        (alp AND lph AND pha) OR (bet AND eta)
+    colou?r               (col AND olo AND lor) OR (col AND olo AND lou AND our)
+
+Intersecting and merging the posting lists gives the candidate notes, and
+only those are searched with the real regex. Both the notes and the regex
+literals are case-folded the way re.IGNORECASE compares characters, so one
+index serves case-sensitive and case-insensitive searches alike. Parts of a
+regex that say nothing about trigrams (., \\w, x*, backreferences, ...) match
+every note, so a query like '.*' still scans everything.
+"""
+
+import sys
+from array import array
+
+from vault_index import new_hasher
+from vault_scan import map_files
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tg_docs (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    hash TEXT NOT NULL,
+    trigrams BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tg_postings (
+    trigram INTEGER PRIMARY KEY,
+    file_ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tg_delta (
+    trigram INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+"""
+
+# The base segment is rebuilt when the delta would cover more notes than this
+# share of the vault (and at least MIN_DELTA_NOTES)
+MAX_DELTA_SHARE = 0.1
+MIN_DELTA_NOTES = 256
+
+# Largest set of alternative strings tracked for one part of a regex
+MAX_EXACT = 16
+
+# Largest repeat count (as in x{2,3}) expanded into its repetitions
+MAX_EXPANDED_REPEAT = 4
+
+# Largest character class expanded into its characters
+MAX_CLASS_CHARS = 8
+
+# Query nodes: ANY matches every note, ('tri', n), ('and', [...]), ('or', [...])
+ANY = None
+
+_ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+            getattr(sre_constants, 'POSSESSIVE_REPEAT', sre_constants.MAX_REPEAT)}
+_ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+
+def fold(text):
+    """Case-fold text so that characters re.IGNORECASE equates become equal."""
+    # İ and ı match i under re.IGNORECASE, but str.casefold() keeps them apart
+    return text.replace('İ', 'i').replace('ı', 'i').casefold()
+
+def text_trigrams(data):
+    """Return the set of trigrams (24-bit ints) of a note's case-folded bytes."""
+    if data.isascii():
+        folded = data.lower()
+    else:
+        folded = fold(data.decode('utf-8', 'replace')).encode('utf-8')
+    return {a << 16 | b << 8 | c for a, b, c in set(zip(folded, folded[1:], folded[2:]))}
+
+def _and(queries):
+    queries = [query for query in queries if query is not ANY]
+    if not queries:
+        return ANY
+    return queries[0] if len(queries) == 1 else ('and', queries)
+
+def _or(queries):
+    if not queries or any(query is ANY for query in queries):
+        return ANY
+    return queries[0] if len(queries) == 1 else ('or', queries)
+
+def string_query(text):
+    """Return the query for notes containing a case-folded string."""
+    data = text.encode('utf-8')
+    return _and([('tri', a << 16 | b << 8 | c)
+                 for a, b, c in sorted(set(zip(data, data[1:], data[2:])))])
+
+def _exact_query(strings):
+    return _or([string_query(text) for text in sorted(strings)])
+
+def _class_chars(items):
+    """Return the folded characters of a [...] class, or None if it is too broad."""
+    chars = set()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.add(fold(chr(av)))
+        elif op is sre_constants.RANGE and av[1] - av[0] < MAX_CLASS_CHARS:
+            chars.update(fold(chr(code)) for code in range(av[0], av[1] + 1))
+        else:  # NEGATE, CATEGORY (\d, \w, ...) or a wide range
+            return None
+        if len(chars) > MAX_CLASS_CHARS:
+            return None
+    return chars
+
+def _analyze_node(op, av):
+    """Return (exact, query) for one regex node.
+
+    `exact` is the set of every string the node can match (folded), or None
+    when that set is unknown or too large; `query` must hold for any note
+    the node matches in.
+    """
+    if op is sre_constants.LITERAL:
+        return {fold(chr(av))}, ANY
+    if op is sre_constants.IN:
+        chars = _class_chars(av)
+        return (chars, ANY) if chars else (None, ANY)
+    if op in _ZERO_WIDTH:
+        return {''}, ANY
+    if op is sre_constants.SUBPATTERN:
+        return _analyze(av[3])
+    if op is _ATOMIC_GROUP:
+        return _analyze(av)
+    if op is sre_constants.BRANCH:
+        branches = [_analyze(branch) for branch in av[1]]
+        if all(exact is not None for exact, _query in branches):
+            strings = set().union(*(exact for exact, _query in branches))
+            if len(strings) <= MAX_EXACT:
+                return strings, ANY
+        return None, _or([_exact_query(exact) if exact is not None else query
+                          for exact, query in branches])
+    if op in _REPEATS:
+        low, high, item = av
+        exact, query = _analyze(item)
+        if exact is not None and high <= MAX_EXPANDED_REPEAT:
+            # x? or x{2,3}: every repetition count spelled out
+            strings = set()
+            repeated = {''}
+            for times in range(high + 1):
+                if times >= low:
+                    strings |= repeated
+                if len(strings) > MAX_EXACT:
+                    break
+                repeated = {left + right for left in repeated for right in exact}
+            else:
+                return strings, ANY
+        if low == 0:
+            return None, ANY
+        return None, _exact_query(exact) if exact is not None else query
+    # ANY (.), NOT_LITERAL, GROUPREF, GROUPREF_EXISTS, ...
+    return None, ANY
+
+def _analyze(items):
+    """Return (exact, query) for a sequence of regex nodes."""
+    queries = []
+    current = {''}
+    for op, av in items:
+        exact, query = _analyze_node(op, av)
+        if exact is not None and len(current) * len(exact) <= MAX_EXACT:
+            current = {left + right for left in current for right in exact}
+            continue
+        # The run of known strings ends here: require one of them
+        queries.append(_exact_query(current))
+        if exact is not None:
+            current = exact
+        else:
+            queries.append(query)
+            current = {''}
+    if not queries:
+        return current, ANY
+    queries.append(_exact_query(current))
+    return None, _and(queries)
+
+def regex_query(pattern):
+    """Return the trigram query for a compiled regex (ANY if it needs a full scan)."""
+    exact, query = _analyze(sre_parse.parse(pattern.pattern, pattern.flags))
+    return _exact_query(exact) if exact is not None else query
+
+def load_trigrams(md_file):
+    """Read and hash one note and extract its trigrams; runs in scan workers.
+
+    Returns (hash, sorted trigrams as array('I') bytes, error).
+    """
+    try:
+        with open(md_file, 'rb') as f:
+            data = f.read()
+    except Exception as e:
+        return None, None, str(e)
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest(), array('I', sorted(text_trigrams(data))).tobytes(), None
+
+def _unpack(blob):
+    values = array('I')
+    values.frombytes(blob)
+    return values
+
+class TrigramIndex:
+    """Trigram posting lists built on top of a VaultIndex.
+
+    Posting lists live in two parts: a base segment with one sorted array of
+    file ids per trigram, rebuilt in bulk, and a delta table with one row per
+    (trigram, note) for notes indexed since the last rebuild. A query reads
+    both. Entries the base still holds for changed or deleted notes can only
+    add candidates, never hide one, and the real regex weeds them out.
+    """
+
+    def __init__(self, vault_index):
+        self.vault_index = vault_index
+        self.conn = vault_index.conn
+        self.conn.executescript(SCHEMA)
+
+    def refresh(self, jobs=1):
+        """Re-index notes whose content hash differs from the vault index.
+
+        Changed notes are read across `jobs` worker processes. The base
+        segment is rebuilt once the delta covers too many notes. Returns the
+        number of notes that were (re-)indexed.
+        """
+        stale = self.conn.execute(
+            "SELECT files.id, files.path FROM files "
+            "LEFT JOIN tg_docs ON tg_docs.file_id = files.id "
+            "WHERE tg_docs.hash IS NOT files.hash"
+        ).fetchall()
+        if not stale:
+            return 0
+
+        vault_path = self.vault_index.vault_path
+        paths = [vault_path / rel_path for _file_id, rel_path in stale]
+        in_delta = self.conn.execute("SELECT COUNT(DISTINCT file_id) FROM tg_delta").fetchone()[0]
+        total = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        rebuild = in_delta + len(stale) > max(MIN_DELTA_NOTES, total * MAX_DELTA_SHARE)
+
+        with self.conn:
+            loaded = map_files(load_trigrams, paths, jobs)
+            for (file_id, _rel_path), (md_file, (digest, trigrams, error)) in zip(stale, loaded):
+                if error:
+                    print(f"Error reading {md_file}: {error}", file=sys.stderr)
+                    continue
+                self.conn.execute("DELETE FROM tg_delta WHERE file_id = ?", (file_id,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO tg_docs (file_id, hash, trigrams) VALUES (?, ?, ?)",
+                    (file_id, digest, trigrams)
+                )
+                if not rebuild:
+                    self.conn.executemany(
+                        "INSERT INTO tg_delta (trigram, file_id) VALUES (?, ?)",
+                        [(trigram, file_id) for trigram in _unpack(trigrams)]
+                    )
+            if rebuild:
+                self._rebuild()
+
+        return len(stale)
+
+    def _rebuild(self):
+        """Rebuild the base segment from every note's trigrams and empty the delta."""
+        postings = {}
+        for file_id, blob in self.conn.execute("SELECT file_id, trigrams FROM tg_docs ORDER BY file_id"):
+            for trigram in _unpack(blob):
+                file_ids = postings.get(trigram)
+                if file_ids is None:
+                    postings[trigram] = file_ids = array('I')
+                file_ids.append(file_id)
+
+        self.conn.execute("DELETE FROM tg_postings")
+        self.conn.execute("DELETE FROM tg_delta")
+        self.conn.executemany(
+            "INSERT INTO tg_postings (trigram, file_ids) VALUES (?, ?)",
+            ((trigram, file_ids.tobytes()) for trigram, file_ids in sorted(postings.items()))
+        )
+
+    def _file_ids(self, trigram):
+        """Return the ids of the notes containing a trigram."""
+        row = self.conn.execute(
+            "SELECT file_ids FROM tg_postings WHERE trigram = ?", (trigram,)
+        ).fetchone()
+        file_ids = set(_unpack(row[0])) if row else set()
+        file_ids.update(file_id for (file_id,) in self.conn.execute(
+            "SELECT file_id FROM tg_delta WHERE trigram = ?", (trigram,)
+        ))
+        return file_ids
+
+    def _evaluate(self, query, postings):
+        """Return the set of file ids satisfying a query, or None for all notes."""
+        if query is ANY:
+            return None
+        kind, value = query
+        if kind == 'tri':
+            if value not in postings:
+                postings[value] = self._file_ids(value)
+            return postings[value]
+        if kind == 'and':
+            result = None
+            for child in value:
+                ids = self._evaluate(child, postings)
+                if ids is not None:
+                    result = ids if result is None else result & ids
+                    if not result:
+                        break
+            return result
+        result = set()
+        for child in value:
+            ids = self._evaluate(child, postings)
+            if ids is None:
+                return None
+            result |= ids
+        return result
+
+    def candidates(self, pattern):
+        """Return the relative paths of notes that may match a compiled regex.
+
+        Notes not yet in the trigram index are always included.
+        """
+        file_ids = self._evaluate(regex_query(pattern), {})
+        rows = self.conn.execute(
+            "SELECT files.id, files.path, tg_docs.hash IS files.hash FROM files "
+            "LEFT JOIN tg_docs ON tg_docs.file_id = files.id"
+        )
+        return [path for file_id, path, indexed in rows
+                if file_ids is None or file_id in file_ids or not indexed]
@@ -0,0 +1,72 @@
+"""
+Configuration loading shared by the vault tools.
+
+The parsed config.yaml is cached in a marshal snapshot under .obsidian-cli/
+and reused while the file's mtime and size are unchanged, so most runs start
+without importing PyYAML or parsing YAML.
+"""
+
+import hashlib
+import marshal
+import os
+from pathlib import Path
+
+import vault_scan
+
+WORKSPACE_DIR = Path(__file__).parent.parent
+CONFIG_PATH = WORKSPACE_DIR / "config.yaml"
+STATE_DIR = WORKSPACE_DIR / ".obsidian-cli"
+CONFIG_SNAPSHOT = STATE_DIR / "config.snapshot"
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+def vault_key(vault_path):
+    """Return a short stable key identifying a vault in the state directory."""
+    return hashlib.sha1(str(vault_path).encode('utf-8')).hexdigest()[:12]
+
+def index_path_for(vault_path):
+    """Return the index database location for a vault."""
+    return STATE_DIR / f"index-{vault_key(vault_path)}.sqlite"
+
+def read_config():
+    """Return the parsed config.yaml as a dict."""
+    st = os.stat(CONFIG_PATH)
+    stamp = (SNAPSHOT_VERSION, st.st_mtime_ns, st.st_size)
+    try:
+        with open(CONFIG_SNAPSHOT, 'rb') as f:
+            snapshot_stamp, config = marshal.load(f)
+        if snapshot_stamp == stamp:
+            return config
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    # Imported here: PyYAML is slow to import and only needed when config.yaml changed
+    import yaml
+    with open(CONFIG_PATH) as f:
+        config = yaml.safe_load(f) or {}
+    write_snapshot(stamp, config)
+    return config
+
+def write_snapshot(stamp, config):
+    """Save a parsed config for read_config; skipped if it can't be stored."""
+    try:
+        data = marshal.dumps((stamp, config))
+    except ValueError:
+        return  # YAML types marshal can't store (e.g. dates)
+    temp_path = CONFIG_SNAPSHOT.with_name(f"{CONFIG_SNAPSHOT.name}.{os.getpid()}.tmp")
+    try:
+        STATE_DIR.mkdir(exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, CONFIG_SNAPSHOT)
+    except OSError:
+        pass
+
+def load_config():
+    """Load configuration to find vault path and apply the read settings."""
+    config = read_config()
+    vault_scan.configure_reads(config.get('remote_reads'))
+
+    vault_path = WORKSPACE_DIR / config['vault_path']
+    return vault_path.resolve()
@@ -0,0 +1,402 @@
+"""
+Long-running vault daemon with a live index.
+
+The daemon keeps the vault index and the text of every note in memory, applies
+inotify events (create, modify, move, delete) incrementally, and answers
+queries over a Unix socket under .obsidian-cli/. The protocol is one JSON
+object per line in each direction:
+
+    -> {"op": "tag", "tag": "project"}
+    <- {"ok": true, "results": ["Projects/Alpha.md"]}
+
+Ops: ping, search, ranked, tag, filename, tasks, agenda, links, query and shutdown.
+
+The command line tools call request() first and fall back to scanning the
+vault themselves when no daemon is running. Start it with:
+
+    python tools/obsidian_cli.py serve
+"""
+
+import json
+import os
+import struct
+import time
+from pathlib import Path
+
+from vault_config import STATE_DIR, vault_key
+from vault_scan import IGNORE_FILE, IGNORED_DIRS, load_ignore_spec, scan_dir, walk_order
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Seconds to wait for an event burst to settle before re-indexing
+SETTLE_DELAY = 0.1
+
+# Seconds between full refreshes when inotify is not available
+POLL_INTERVAL = 5.0
+
+def socket_path_for(vault_path):
+    """Return the daemon socket location for a vault."""
+    return STATE_DIR / f"daemon-{vault_key(vault_path)}.sock"
+
+def request(vault_path, payload, timeout=30):
+    """Send a request to the daemon and return its results.
+
+    Returns None when no daemon is running or the request failed, so callers
+    can fall back to scanning the vault directly.
+    """
+    path = socket_path_for(vault_path)
+    if not path.exists():
+        return None
+
+    # Imported here: most runs find no daemon and never open a socket
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+    except OSError:
+        return None
+
+    try:
+        response = json.loads(data)
+    except ValueError:
+        return None
+    if not response.get('ok'):
+        return None
+    return response.get('results')
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+
+    def __init__(self):
+        # Imported here: ctypes.util is slow to import and only the daemon needs it
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches = {}
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        self.watches[wd] = Path(path)
+        return wd
+
+    def read_events(self):
+        """Return the pending events as (directory, mask, cookie, name) tuples."""
+        try:
+            buffer = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+            offset += length
+            directory = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            events.append((directory, mask, cookie, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class VaultDaemon:
+    """Serves queries from an in-memory view of the vault kept live by inotify."""
+
+    def __init__(self, vault_path, jobs=1):
+        # Imported here so that request() stays cheap to import for the tools
+        from vault_index import VaultIndex
+
+        self.vault_path = Path(vault_path)
+        self.jobs = jobs
+        self.index = VaultIndex(self.vault_path)
+        self.links = None
+        self.texts = {}
+        # Note paths in the order the walker yields them, as direct searches do
+        self.order = []
+        self.ignore = None
+        self.paths = None
+        self.metadata = None
+        self.inotify = None
+        self.pending = set()
+        self.pending_full = False
+        self.deadline = None
+        self.running = False
+
+    def start(self):
+        """Build the initial view of the vault and start watching it."""
+        # Imported here: link_graph imports this module for the client side
+        from link_graph import LinkGraph
+
+        self.index.refresh(self.jobs)
+        self._sync_texts()
+        self.links = LinkGraph(self.index)
+        self.links.refresh()
+        try:
+            self.inotify = Inotify()
+            self.ignore = load_ignore_spec(self.vault_path)
+            self._watch_tree(self.vault_path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling every {POLL_INTERVAL:.0f}s")
+            self.inotify = None
+
+    def _watch_tree(self, directory, prefix=''):
+        """Watch a directory and every folder below it that the walker visits.
+
+        `prefix` is the directory's path relative to the vault ('' or ending
+        in '/'); folders in IGNORED_DIRS or .obsidianignore are skipped.
+        """
+        directories = [directory]
+        stack = [(directory, prefix)]
+        while stack:
+            path, path_prefix = stack.pop()
+            _files, subdirs = scan_dir(path, path_prefix, self.ignore)
+            directories.extend(subdir for subdir, _subdir_prefix in subdirs)
+            stack.extend(subdirs)
+
+        for path in directories:
+            try:
+                self.inotify.add_watch(path)
+            except OSError as e:
+                print(f"Cannot watch {path}: {e}")
+
+    def _sync_texts(self):
+        """Reload the cached text of notes whose content hash changed."""
+        current = dict(self.index.conn.execute("SELECT path, hash FROM files"))
+        for path in list(self.texts):
+            if path not in current:
+                del self.texts[path]
+        for path, digest in current.items():
+            cached = self.texts.get(path)
+            if cached and cached[0] == digest:
+                continue
+            try:
+                # Invalid UTF-8 is replaced, as in a direct scan
+                with open(self.vault_path / path, 'r', encoding='utf-8', errors='replace') as f:
+                    self.texts[path] = (digest, f.read())
+            except Exception as e:
+                print(f"Error reading {self.vault_path / path}: {e}")
+                self.texts.pop(path, None)
+        self.order = sorted(self.texts, key=walk_order)
+
+    def _handle_events(self):
+        for directory, mask, _cookie, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW or directory is None:
+                self.pending_full = True
+                continue
+            path = directory / name if name else directory
+            if mask & IN_ISDIR or mask & IN_DELETE_SELF:
+                # Directory created, moved or removed: re-walk to pick up its notes
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in IGNORED_DIRS:
+                    prefix = path.relative_to(self.vault_path).as_posix() + '/'
+                    if self.ignore is None or not self.ignore.match_file(prefix):
+                        self._watch_tree(path, prefix)
+                self.pending_full = True
+                continue
+            if name == IGNORE_FILE and directory == self.vault_path:
+                # Folders no longer ignored need watches (extra ones are harmless)
+                self.ignore = load_ignore_spec(self.vault_path)
+                self._watch_tree(self.vault_path)
+                self.pending_full = True
+            elif name.endswith('.md'):
+                self.pending.add(path.relative_to(self.vault_path))
+        self.deadline = time.monotonic() + SETTLE_DELAY
+
+    def _apply_pending(self):
+        if self.pending_full:
+            self.index.refresh(self.jobs)
+        elif self.pending:
+            self.index.refresh_paths(sorted(self.pending))
+        self.pending.clear()
+        self.pending_full = False
+        self.deadline = None
+        self._sync_texts()
+        self.links.refresh()
+
+    def handle_request(self, payload):
+        """Answer one protocol request."""
+        # Imported here: the tools import this module for the client side
+        import find_tasks
+        import task_index
+        import vault_search
+        from path_index import PathIndex
+        from vault_query import MetadataIndex, Query
+
+        op = payload.get('op')
+        if op == 'ping':
+            return {'notes': len(self.texts), 'watching': self.inotify is not None}
+
+        limit = payload.get('limit')
+        max_matches = payload.get('max_matches', 5)
+
+        if op == 'search':
+            pattern = vault_search.compile_query(payload['query'], payload.get('case_sensitive'))
+            results = []
+            for path in self.order:
+                matches = vault_search.match_text(self.texts[path][1], pattern, max_matches)
+                if matches is not None:
+                    results.append({'file': path, 'matches': matches})
+                    if limit and len(results) >= limit:
+                        break
+            return results
+
+        if op == 'ranked':
+            return vault_search.search_ranked(
+                self.vault_path, payload['query'], payload.get('top_k', 10),
+                index=self.index, max_matches=max_matches
+            )
+
+        if op == 'tag':
+            results = vault_search.search_by_tag(self.vault_path, payload['tag'], index=self.index)
+            return results[:limit] if limit else results
+
+        if op == 'filename':
+            # Refreshing only stats the folders; the table stays in memory
+            if self.paths is None:
+                self.paths = PathIndex(self.vault_path)
+            table = self.paths.refresh()
+            matches = table.search(payload['pattern'], payload.get('match', 'substring'),
+                                   payload.get('case_sensitive'), payload.get('folders'), limit)
+            return [match.path for match in matches]
+
+        if op == 'links':
+            results = self.links.query(payload['query'], payload.get('note'), payload.get('depth', 1))
+            return results[:limit] if limit else results
+
+        if op == 'query':
+            # Only notes the index re-read since the last query are updated
+            if self.metadata is None:
+                self.metadata = MetadataIndex(self.index)
+            table = self.metadata.refresh()
+            if payload.get('query') is None:
+                return table.field_summary()
+            return table.query(Query(payload['query']))
+
+        if op == 'tasks':
+            query = None
+            if payload.get('filter'):
+                query = find_tasks.TaskQuery(payload['filter'])
+            tasks = find_tasks.find_tasks(
+                self.vault_path, payload.get('query', 'to-process'), index=self.index, query=query
+            )
+            for task in tasks:
+                del task['file']
+            return tasks
+
+        if op == 'agenda':
+            return task_index.query_tasks(self.vault_path, payload['view'], payload.get('period'),
+                                          payload.get('days'), index=self.index)
+
+        if op == 'shutdown':
+            self.running = False
+            return True
+
+        raise ValueError(f"Unknown op: {op!r}")
+
+    def _serve_client(self, conn):
+        with conn:
+            conn.settimeout(5)
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            try:
+                results = self.handle_request(json.loads(data))
+                response = {'ok': True, 'results': results}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            conn.sendall(json.dumps(response, default=str).encode('utf-8') + b'\n')
+
+    def serve_forever(self):
+        """Listen on the vault's socket until a shutdown request arrives."""
+        path = socket_path_for(self.vault_path)
+        if request(self.vault_path, {'op': 'ping'}, timeout=1) is not None:
+            raise RuntimeError(f"A daemon is already serving {self.vault_path}")
+        path.unlink(missing_ok=True)
+
+        # Imported here: only the daemon itself listens and multiplexes
+        import selectors
+        import socket
+        self.start()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(path))
+        os.chmod(path, 0o600)
+        server.listen()
+
+        selector = selectors.DefaultSelector()
+        selector.register(server, selectors.EVENT_READ, 'client')
+        if self.inotify:
+            selector.register(self.inotify.fd, selectors.EVENT_READ, 'inotify')
+        last_poll = time.monotonic()
+
+        print(f"Serving {self.vault_path} ({len(self.texts)} notes) on {path}")
+        self.running = True
+        try:
+            while self.running:
+                if self.deadline is not None:
+                    timeout = max(0, self.deadline - time.monotonic())
+                elif self.inotify is None:
+                    timeout = max(0, last_poll + POLL_INTERVAL - time.monotonic())
+                else:
+                    timeout = None
+
+                for key, _events in selector.select(timeout):
+                    if key.data == 'inotify':
+                        self._handle_events()
+                    else:
+                        conn, _addr = server.accept()
+                        # Answer from an up-to-date view
+                        if self.deadline is not None:
+                            self._apply_pending()
+                        self._serve_client(conn)
+
+                now = time.monotonic()
+                if self.deadline is not None and now >= self.deadline:
+                    self._apply_pending()
+                elif self.inotify is None and now >= last_poll + POLL_INTERVAL:
+                    self.pending_full = True
+                    self._apply_pending()
+                    last_poll = now
+        finally:
+            selector.close()
+            server.close()
+            path.unlink(missing_ok=True)
+            if self.inotify:
+                self.inotify.close()
+            self.index.close()
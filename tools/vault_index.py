@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Persistent incremental index for an Obsidian vault.
+
+The index is a SQLite database under .obsidian-cli/ in the workspace. For every
+note it keeps the mtime, size and content hash together with the parsed
+frontmatter, tags and task lines (with their line numbers and byte offsets).
+A refresh only re-reads notes whose mtime or size changed, and only re-parses
+notes whose content hash changed.
+
+Usage:
+    python tools/vault_index.py            # Refresh the index and show stats
+    python tools/vault_index.py --rebuild  # Drop and rebuild the index
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import vault_profile
+import vault_scan
+from frontmatter import (MAX_FRONTMATTER_BYTES, InlineTagScanner, frontmatter_tags,
+                         normalize_tag, parse_frontmatter)
+from vault_config import index_path_for, load_config
+from vault_scan import is_ignored, iter_note_entries, load_ignore_spec, map_files, read_ahead
+
+# Bump when the schema or the parsed representation changes
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    frontmatter TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, file_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tasks (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line_num INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    PRIMARY KEY (file_id, line_num)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_file ON tags(file_id);
+"""
+
+TASK_LINE_PATTERN = re.compile(rb'^\s*- \[.\]\s')
+
+def new_hasher():
+    """Return a hash object for computing content hashes incrementally."""
+    return hashlib.blake2b(digest_size=16)
+
+def parse_note(lines):
+    """Parse a note from an iterable of raw byte lines (with line endings).
+
+    Lines are processed one at a time, so memory use does not grow with the
+    size of the note. Returns (content hash, parsed fields).
+    """
+    hasher = new_hasher()
+    scanner = InlineTagScanner()
+    tasks = []
+    frontmatter = {}
+    # Lines of the leading '---' block until its closing line is seen
+    block = None
+    block_size = 0
+    offset = 0
+
+    for line_num, raw_line in enumerate(lines, 1):
+        hasher.update(raw_line)
+        # Like the scan, which decodes matched lines with 'replace'
+        line = raw_line.decode('utf-8', 'replace').rstrip('\r\n')
+        if TASK_LINE_PATTERN.match(raw_line):
+            tasks.append((line_num, offset, line))
+        offset += len(raw_line)
+
+        if block is not None:
+            if line.rstrip() in ('---', '...'):
+                frontmatter = parse_frontmatter('\n'.join(block))
+                block = None
+                continue
+            block.append(line)
+            block_size += len(raw_line)
+            if block_size > MAX_FRONTMATTER_BYTES:
+                for block_line in block:
+                    scanner.feed(block_line)
+                block = None
+        elif line_num == 1 and line.rstrip() == '---':
+            block = []
+        else:
+            scanner.feed(line)
+
+    if block is not None:
+        # Unterminated block: the lines are body text after all
+        for block_line in block:
+            scanner.feed(block_line)
+
+    tags = set(frontmatter_tags(frontmatter))
+    tags.update(scanner.tags)
+    return hasher.hexdigest(), {
+        'frontmatter': frontmatter,
+        'tags': sorted(tags),
+        'tasks': tasks,
+    }
+
+def load_note(item, data=None):
+    """Read, hash and parse one note; runs in scan worker processes.
+
+    `item` is a (path, known hash) pair and `data` the note's content when it
+    was already read (see read_ahead). Returns (hash, parsed, error), where
+    parsed is None when the content still matches the known hash.
+    """
+    md_file, known_digest = item
+    try:
+        with vault_profile.phase('parse'):
+            if data is not None:
+                digest, parsed = parse_note(io.BytesIO(data))
+            else:
+                with open(md_file, 'rb') as f:
+                    digest, parsed = parse_note(f)
+                    vault_profile.count('bytes read', f.tell())
+        vault_profile.count('files parsed')
+        if digest == known_digest:
+            return digest, None, None
+        return digest, parsed, None
+    except Exception as e:
+        return None, None, str(e)
+
+class VaultIndex:
+    """SQLite-backed index of the notes in a vault."""
+
+    def __init__(self, vault_path, db_path=None):
+        self.vault_path = Path(vault_path)
+        self.db_path = Path(db_path) if db_path else index_path_for(self.vault_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._init_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _init_schema(self):
+        row = None
+        try:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'schema_version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            pass
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            self.reset()
+
+    def reset(self):
+        """Drop all indexed data, including tables of derived indexes."""
+        tables = [name for (name,) in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )]
+        # Foreign key enforcement can only be toggled outside a transaction
+        self.conn.execute("PRAGMA foreign_keys=OFF")
+        with self.conn:
+            for table in tables:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),)
+            )
+        self.conn.execute("PRAGMA foreign_keys=ON")
+
+    def refresh(self, jobs=1):
+        """Bring the index up to date with the vault.
+
+        Changed notes are read and parsed across `jobs` worker processes, or
+        through the async read pipeline for remote vaults (remote_reads).
+        Returns a dict with the number of unchanged, updated and removed notes.
+        """
+        stored = {
+            path: (file_id, mtime_ns, size, digest)
+            for file_id, path, mtime_ns, size, digest in self.conn.execute(
+                "SELECT id, path, mtime_ns, size, hash FROM files"
+            )
+        }
+        stats = {'unchanged': 0, 'updated': 0, 'removed': 0}
+
+        # Stat phase: find notes whose mtime or size changed
+        changed = []
+        for rel_path, entry in iter_note_entries(self.vault_path):
+            row = stored.pop(rel_path, None)
+            try:
+                with vault_profile.phase('stat'):
+                    st = entry.stat()
+            except OSError as e:
+                print(f"Error reading {entry.path}: {e}", file=sys.stderr)
+                if row:
+                    stored[rel_path] = row
+                continue
+            if row and row[1] == st.st_mtime_ns and row[2] == st.st_size:
+                stats['unchanged'] += 1
+                vault_profile.count('index cache hits')
+                continue
+            changed.append((rel_path, st, row))
+
+        # Parse phase: read, hash and parse the changed notes
+        items = [(self.vault_path / rel_path, row[3] if row else None)
+                 for rel_path, _st, row in changed]
+        if vault_scan.remote_reads:
+            loaded = ((item, (None, None, str(error)) if error else load_note(item, data))
+                      for item, data, error in read_ahead(items, key=lambda item: item[0]))
+        else:
+            loaded = map_files(load_note, items, jobs)
+
+        with self.conn:
+            for (rel_path, st, row), (item, (digest, parsed, error)) in zip(changed, loaded):
+                if error:
+                    print(f"Error reading {item[0]}: {error}", file=sys.stderr)
+                    if row:
+                        self._delete(row[0])
+                    continue
+
+                if parsed is None:
+                    # Touched but not modified: only record the new stat data
+                    self.conn.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (st.st_mtime_ns, st.st_size, row[0])
+                    )
+                    stats['unchanged'] += 1
+                    continue
+
+                self._store(rel_path, st, digest, parsed)
+                stats['updated'] += 1
+
+            for file_id, *_ in stored.values():
+                self._delete(file_id)
+                stats['removed'] += 1
+
+        return stats
+
+    def refresh_paths(self, rel_paths):
+        """Re-index specific notes, e.g. in response to file system events.
+
+        Paths that no longer exist (or are not notes) are removed from the index.
+        Returns a dict with the number of updated and removed notes.
+        """
+        stats = {'updated': 0, 'removed': 0}
+        ignore = load_ignore_spec(self.vault_path)
+
+        with self.conn:
+            for rel_path in rel_paths:
+                rel_path = Path(rel_path).as_posix()
+                md_file = self.vault_path / rel_path
+                row = self.conn.execute(
+                    "SELECT id, hash FROM files WHERE path = ?", (rel_path,)
+                ).fetchone()
+
+                try:
+                    st = md_file.stat()
+                    is_note = (md_file.is_file() and md_file.suffix == '.md'
+                               and not is_ignored(rel_path, ignore))
+                except OSError:
+                    is_note = False
+                if not is_note:
+                    if row:
+                        self._delete(row[0])
+                        stats['removed'] += 1
+                    continue
+
+                digest, parsed, error = load_note((md_file, row[1] if row else None))
+                if error:
+                    print(f"Error reading {md_file}: {error}", file=sys.stderr)
+                    continue
+                if parsed is None:
+                    self.conn.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (st.st_mtime_ns, st.st_size, row[0])
+                    )
+                    continue
+
+                self._store(rel_path, st, digest, parsed)
+                stats['updated'] += 1
+
+        return stats
+
+    def _store(self, rel_path, st, digest, parsed):
+        vault_profile.count('index rows written')
+        frontmatter = json.dumps(parsed['frontmatter'], default=str)
+        file_id = self.conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, hash, frontmatter) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, "
+            "size = excluded.size, hash = excluded.hash, frontmatter = excluded.frontmatter "
+            "RETURNING id",
+            (rel_path, st.st_mtime_ns, st.st_size, digest, frontmatter)
+        ).fetchone()[0]
+
+        self.conn.execute("DELETE FROM tags WHERE file_id = ?", (file_id,))
+        self.conn.execute("DELETE FROM tasks WHERE file_id = ?", (file_id,))
+        self.conn.executemany(
+            "INSERT INTO tags (file_id, tag) VALUES (?, ?)",
+            [(file_id, tag) for tag in parsed['tags']]
+        )
+        self.conn.executemany(
+            "INSERT INTO tasks (file_id, line_num, offset, line) VALUES (?, ?, ?, ?)",
+            [(file_id, *task) for task in parsed['tasks']]
+        )
+
+    def _delete(self, file_id):
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def files(self):
+        """Return the relative paths of all indexed notes."""
+        return [Path(path) for (path,) in
+                self.conn.execute("SELECT path FROM files ORDER BY path")]
+
+    def frontmatter(self, rel_path):
+        """Return the parsed frontmatter of a note, or None if it is not indexed."""
+        row = self.conn.execute(
+            "SELECT frontmatter FROM files WHERE path = ?", (Path(rel_path).as_posix(),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def files_with_tag(self, tag):
+        """Return the relative paths of notes that carry a tag or one of its nested tags."""
+        tag = normalize_tag(tag)
+        # 'parent/child' sorts between 'parent/' and 'parent0' ('0' follows '/')
+        return [Path(path) for (path,) in self.conn.execute(
+            "SELECT DISTINCT files.path FROM tags JOIN files ON files.id = tags.file_id "
+            "WHERE tags.tag = ? OR (tags.tag >= ? AND tags.tag < ?) ORDER BY files.path",
+            (tag, f"{tag}/", f"{tag}0")
+        )]
+
+    def iter_task_lines(self):
+        """Yield (relative path, line number, byte offset, line) for every task line."""
+        for path, line_num, offset, line in self.conn.execute(
+            "SELECT files.path, tasks.line_num, tasks.offset, tasks.line "
+            "FROM tasks JOIN files ON files.id = tasks.file_id "
+            "ORDER BY files.path, tasks.line_num"
+        ):
+            yield Path(path), line_num, offset, line
+
+    def stats(self):
+        """Return row counts for the indexed tables."""
+        return {
+            table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('files', 'tags', 'tasks')
+        }
+
+def open_index(vault_path, refresh=True, jobs=1):
+    """Open the index for a vault, refreshing it by default."""
+    index = VaultIndex(vault_path)
+    if refresh:
+        index.refresh(jobs)
+    return index
+
+@contextmanager
+def use_index(vault_path, index=None, jobs=1):
+    """Yield `index` if given (e.g. the daemon's live index), else open a refreshed one."""
+    if index is not None:
+        yield index
+        return
+    with open_index(vault_path, jobs=jobs) as opened:
+        yield opened
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the Obsidian vault index")
+    parser.add_argument("--rebuild", action="store_true",
+                       help="Drop the index and rebuild it from scratch")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Parse changed notes with N worker processes (0 = all CPUs)")
+
+    args = parser.parse_args()
+
+    vault_path = load_config()
+
+    with VaultIndex(vault_path) as index:
+        if args.rebuild:
+            index.reset()
+        changes = index.refresh(args.jobs)
+        counts = index.stats()
+
+    print(f"Index: {index.db_path}")
+    print(f"  Unchanged: {changes['unchanged']}, updated: {changes['updated']}, "
+          f"removed: {changes['removed']}")
+    print(f"  {counts['files']} notes, {counts['tags']} tag entries, "
+          f"{counts['tasks']} task lines")
+
+if __name__ == "__main__":
+    main()
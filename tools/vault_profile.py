@@ -0,0 +1,189 @@
+"""
+Lightweight profiling for the vault tools.
+
+Enabled with --profile (a summary on stderr) or --profile-json FILE on any
+tool, or by setting OBSIDIAN_CLI_PROFILE (to 1 for a summary on stderr, or to
+a file name for JSON). While enabled, the scan
+code records per-phase timers (walk, read, yaml, regex, parse, output, ...)
+and counters (files walked, bytes read, files parsed, cache hits, regex
+evaluations). Worker processes send their numbers back with their results.
+
+When disabled, phase() returns a shared no-op context manager and count()
+returns immediately, so the instrumentation costs next to nothing.
+
+--profile-stacks FILE samples the main thread's stack every millisecond and
+writes it in the folded format read by flamegraph.pl and speedscope;
+--cprofile FILE additionally runs the tool under cProfile and saves pstats
+data.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = "OBSIDIAN_CLI_PROFILE"
+
+enabled = bool(os.environ.get(ENV_VAR))
+timers = Counter()
+counters = Counter()
+
+_NO_PHASE = nullcontext()
+
+class _Phase:
+    """Context manager adding the time spent inside it to a named timer."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timers[self.name] += time.perf_counter() - self.start
+
+def phase(name):
+    """Return a context manager timing a phase (a no-op when disabled)."""
+    return _Phase(name) if enabled else _NO_PHASE
+
+def count(name, amount=1):
+    """Add to a named counter when profiling is enabled."""
+    if enabled:
+        counters[name] += amount
+
+def timed_iter(name, iterable):
+    """Yield from iterable, adding the time spent producing items to a timer."""
+    if not enabled:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timers[name] += time.perf_counter() - start
+            return
+        timers[name] += time.perf_counter() - start
+        yield item
+
+def snapshot():
+    """Return the current timers and counters, and reset them."""
+    data = {'timers': dict(timers), 'counters': dict(counters)}
+    timers.clear()
+    counters.clear()
+    return data
+
+def merge(data):
+    """Add timers and counters collected elsewhere (e.g. a worker process)."""
+    timers.update(data['timers'])
+    counters.update(data['counters'])
+
+class StackSampler(threading.Thread):
+    """Sample the stack of a thread periodically into folded stack counts."""
+
+    def __init__(self, thread_id, interval=0.001):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, path):
+        """Write 'frame;frame;frame count' lines (flamegraph.pl input)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in sorted(self.stacks.items()):
+                f.write(f"{stack} {samples}\n")
+
+def format_report(tool, data, elapsed):
+    """Return a human-readable profile summary."""
+    lines = [f"Profile for {tool}: {elapsed:.3f}s total"]
+    if data['timers']:
+        lines.append("  Phase timers:")
+        for name, seconds in sorted(data['timers'].items(), key=lambda item: -item[1]):
+            lines.append(f"    {name:<24} {seconds:>9.3f}s")
+    if data['counters']:
+        lines.append("  Counters:")
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f"    {name:<24} {value:>10}")
+    return "\n".join(lines)
+
+def add_arguments(parser):
+    """Add the shared profiling options to an argparse parser."""
+    parser.add_argument("--profile", action="store_true",
+                       help="Print phase timers and counters to stderr")
+    parser.add_argument("--profile-json", metavar="FILE",
+                       help="Write phase timers and counters to FILE as JSON")
+    parser.add_argument("--profile-stacks", metavar="FILE",
+                       help="Write sampled stacks in folded (flamegraph) format to FILE")
+    parser.add_argument("--cprofile", metavar="FILE",
+                       help="Run under cProfile and save pstats data to FILE")
+
+@contextmanager
+def session(tool, args):
+    """Profile the body of a tool run according to its parsed arguments.
+
+    The summary goes to stderr (or a JSON file) when the body finishes. Does
+    nothing unless --profile, --profile-json, --profile-stacks, --cprofile or
+    the environment variable asked for profiling.
+    """
+    global enabled
+    destination = '-' if args.profile else args.profile_json or os.environ.get(ENV_VAR)
+    if destination == '1':
+        destination = '-'
+    if not (destination or args.profile_stacks or args.cprofile):
+        yield
+        return
+
+    enabled = True
+    # Worker processes started from here on enable profiling themselves
+    os.environ[ENV_VAR] = '1'
+    snapshot()
+
+    sampler = None
+    if args.profile_stacks:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+    profiler = cProfile.Profile() if args.cprofile else None
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+        elapsed = time.perf_counter() - start
+        if sampler:
+            sampler.stop()
+            sampler.write(args.profile_stacks)
+
+        data = snapshot()
+        if destination == '-':
+            print(format_report(tool, data, elapsed), file=sys.stderr)
+        elif destination:
+            with open(destination, 'w') as f:
+                json.dump(dict(data, tool=tool, elapsed=elapsed), f, indent=2)
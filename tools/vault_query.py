@@ -0,0 +1,826 @@
+#!/usr/bin/env python3
+"""
+Dataview-style queries over note frontmatter.
+
+Frontmatter fields are kept in a column store next to the vault index: one
+column per field, dictionary-encoded, so it holds every distinct value once
+plus, for each note that has the field, the note's row number and the code
+of its value (in array('I')s). Values keep the types YAML gave them; ISO
+dates (2026-11-01, 2026-11-01T09:30) sort and compare as dates, and lists
+stay lists. Nested keys are flattened (project.owner). Every note also has
+the fields file.path, file.name, file.folder, file.tags (frontmatter and
+inline tags) and file.mtime.
+
+A condition is checked once per distinct value of its field and then mapped
+over the field's codes in one C-level pass, which gives a bitset (a Python
+int) of the matching rows; AND, OR and NOT are bitwise operations. Only
+the rows that match are sorted and have their fields looked up.
+
+Query syntax (keywords are case-insensitive):
+
+    TABLE field, ...        Fields to show (default: the fields the query uses)
+    FROM #tag "folder"      Notes with a tag (or a nested tag) or under a
+                            folder; AND, OR, NOT and parentheses combine them
+    WHERE condition         field = value, !=, <, <=, >, >=, contains; a bare
+                            field is true when it is set and not false, 0, ""
+                            or empty; AND, OR, NOT and parentheses
+    SORT field [ASC|DESC], ...
+    GROUP BY field
+    LIMIT n
+
+A query that does not start with a keyword is a WHERE condition. Values are
+numbers, true/false, dates (YYYY-MM-DD, today, tomorrow, yesterday), quoted
+strings or bare words. Comparisons on a list match when any element does.
+Comparisons only match notes that have the field, so NOT status = done also
+lists notes without a status. Text comparisons are case-sensitive.
+
+The columns are cached in .obsidian-cli/ and only the notes whose content or
+mtime changed in the vault index are updated before a query.
+
+Usage:
+    python tools/vault_query.py 'status = active AND due < 2026-11-01 SORT priority'
+    python tools/vault_query.py 'TABLE due FROM #project WHERE due < today SORT due DESC LIMIT 10'
+    python tools/vault_query.py 'FROM "Projects" GROUP BY status' --json
+    python tools/vault_query.py --fields
+"""
+
+import argparse
+import json
+import marshal
+import operator
+import os
+import re
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from heapq import nsmallest
+from itertools import compress, groupby
+from pathlib import Path
+
+import vault_daemon
+from path_index import BIT_DIGITS, bit_indexes, file_stamp
+from vault_config import STATE_DIR, load_config, vault_key
+from vault_index import use_index
+
+# Bump when the snapshot layout or the stored values change
+SNAPSHOT_VERSION = 1
+
+# The table is rebuilt once removed notes make up this share of its rows
+# (and number at least MIN_DELETED)
+MAX_DELETED_SHARE = 0.2
+MIN_DELETED = 1024
+
+# A condition matching up to this many distinct values of a field ORs
+# their cached bitsets; one matching more maps over the codes of all rows
+CACHED_VALUES = 16
+
+# Rows are read from the vault index in chunks of this many paths
+FETCH_CHUNK = 500
+
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?')
+NUMBER_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+TOKEN_PATTERN = re.compile(r'\s*(?:("(?:[^"\\]|\\.)*")|(<=|>=|!=|[=<>:(),])|([^\s"<>=!:(),]+))')
+
+# Value families; values of different families never compare equal or ordered
+BOOLEAN, NUMBER, TEXT, LIST = range(4)
+
+CLAUSES = ('table', 'from', 'where', 'sort', 'group', 'limit')
+RELATIVE_DAYS = {'today': 0, 'tomorrow': 1, 'yesterday': -1}
+COMPARISONS = {
+    '=': operator.eq,
+    ':': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+class QueryError(ValueError):
+    """Raised for queries the query language does not understand."""
+
+def column_value(value):
+    """Return the stored form of a frontmatter value, or None for no value.
+
+    Lists become tuples and nested mappings JSON text; ISO date-times are
+    spelled with a 'T' so that they sort as dates.
+    """
+    if isinstance(value, str):
+        return value.replace(' ', 'T', 1) if DATE_PATTERN.fullmatch(value) else value
+    if isinstance(value, (list, tuple)):
+        return tuple(item for item in map(column_value, value) if item is not None)
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return value
+
+def frontmatter_fields(frontmatter, prefix=''):
+    """Yield (field name, stored value) for a frontmatter dict; names are lowercased and dotted."""
+    for key, value in frontmatter.items():
+        name = prefix + str(key).lower()
+        if isinstance(value, dict):
+            yield from frontmatter_fields(value, name + '.')
+            continue
+        value = column_value(value)
+        # file.* fields describe the note itself
+        if value is not None and not name.startswith('file.'):
+            yield name, value
+
+def file_fields(path, tags):
+    """Yield the file.* fields of a note that are stored; see DERIVED_FIELDS."""
+    yield 'file.folder', path.rpartition('/')[0]
+    yield 'file.tags', tuple(sorted(tags))
+
+def note_name(path):
+    name = path.rpartition('/')[2]
+    return name[:-3] if name.endswith('.md') else name
+
+def mtime_text(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9).isoformat(timespec='seconds')
+
+# file.* fields with a different value for every note, computed from the
+# table's paths and (mtime_ns, hash) versions when a query uses them
+# rather than stored in the snapshot
+DERIVED_FIELDS = {
+    'file.path': lambda path, version: path,
+    'file.name': lambda path, version: note_name(path),
+    'file.mtime': lambda path, version: mtime_text(version[0]),
+}
+
+def family(value):
+    if isinstance(value, bool):
+        return BOOLEAN
+    if isinstance(value, (int, float)):
+        return NUMBER
+    if isinstance(value, str):
+        return TEXT
+    return LIST
+
+def sort_key(value):
+    """Order values by family, then by value; ISO dates sort as text."""
+    if isinstance(value, tuple):
+        return LIST, tuple(map(sort_key, value))
+    return family(value), value
+
+def type_name(value):
+    """Name the inferred type of a stored value."""
+    kind = family(value)
+    if kind == TEXT:
+        return 'date' if DATE_PATTERN.fullmatch(value) else 'text'
+    return ('boolean', 'number', 'text', 'list')[kind]
+
+def compare(value, op, literal):
+    """Return whether `value op literal` holds for a stored value.
+
+    A list matches when any element does ('!=' when none is equal). contains
+    finds a substring in text and an element in a list.
+    """
+    if isinstance(value, tuple):
+        if op == '!=':
+            return not any(compare(item, '=', literal) for item in value)
+        if op == 'contains':
+            op = '='
+        return any(compare(item, op, literal) for item in value)
+    if op == 'contains':
+        if isinstance(value, str) and isinstance(literal, str):
+            return literal in value
+        op = '='
+    if family(value) != family(literal):
+        return op == '!='
+    return COMPARISONS[op](value, literal)
+
+def has_tag(tags, tag):
+    """Return whether a file.tags value holds a tag or one of its nested tags."""
+    return any(item == tag or item.startswith(tag + '/') for item in tags)
+
+def in_folder(folder, parent):
+    return not parent or folder == parent or folder.startswith(parent + '/')
+
+def tokenize(text):
+    """Split a query into (kind, token) pairs; kind is 'string', 'op' or 'word'."""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise QueryError(f"Unexpected {text[position:].strip()[:1]!r} in query")
+        string, op, word = match.groups()
+        tokens.append(('string', string) if string else ('op', op) if op else ('word', word))
+        position = match.end()
+    return tokens
+
+def parse_value(kind, token, today):
+    """Parse a value token into its stored form."""
+    if kind == 'string':
+        try:
+            return column_value(json.loads(token))
+        except ValueError:
+            raise QueryError(f"Invalid string: {token}")
+    lowered = token.lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    if lowered in RELATIVE_DAYS:
+        return (today + timedelta(days=RELATIVE_DAYS[lowered])).isoformat()
+    if NUMBER_PATTERN.fullmatch(token):
+        return float(token) if '.' in token else int(token)
+    return column_value(token)
+
+class Query:
+    """A parsed metadata query (see the module docstring for the syntax).
+
+    `conditions` holds the FROM and WHERE expressions, which must all hold,
+    as nested tuples: ('and', a, b), ('or', a, b), ('not', a),
+    ('compare', field, op, value), ('truthy', field), ('tag', tag) and
+    ('folder', folder).
+    """
+
+    def __init__(self, text, today=None):
+        self.text = text
+        self.today = today or date.today()
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.fields = []
+        self.used = []
+        self.conditions = []
+        self.sort = []
+        self.group = None
+        self.limit = None
+        self._parse()
+        if not self.fields:
+            self.fields = [field for field in self.used if field != 'file.path']
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise QueryError("Unexpected end of query")
+        self.position += 1
+        return token
+
+    def _keyword(self, *words):
+        """Consume and return the next token if it is one of the keywords."""
+        kind, token = self._peek()
+        if kind == 'word' and token.lower() in words:
+            self.position += 1
+            return token.lower()
+        return None
+
+    def _field(self):
+        kind, token = self._next()
+        if kind != 'word' or token.lower() in CLAUSES:
+            raise QueryError(f"Expected a field name, got {token!r}")
+        field = token.lower()
+        if field not in self.used:
+            self.used.append(field)
+        return field
+
+    def _parse(self):
+        if self._peek()[0] is not None and self._peek()[1].lower() not in CLAUSES:
+            self.conditions.append(self._expression(self._condition))
+        while self._peek()[0] is not None:
+            clause = self._keyword(*CLAUSES)
+            if clause is None:
+                raise QueryError(f"Expected one of {', '.join(CLAUSES).upper()}, got {self._peek()[1]!r}")
+            if clause == 'table':
+                self.fields.append(self._field())
+                while self._peek() == ('op', ','):
+                    self._next()
+                    self.fields.append(self._field())
+            elif clause == 'from':
+                self.conditions.append(self._expression(self._source))
+            elif clause == 'where':
+                self.conditions.append(self._expression(self._condition))
+            elif clause == 'sort':
+                self._keyword('by')
+                while True:
+                    field = self._field()
+                    self.sort.append((field, self._keyword('asc', 'desc') == 'desc'))
+                    if self._peek() != ('op', ','):
+                        break
+                    self._next()
+            elif clause == 'group':
+                if not self._keyword('by'):
+                    raise QueryError("Expected GROUP BY")
+                self.group = self._field()
+            else:
+                kind, token = self._next()
+                if kind != 'word' or not token.isdigit():
+                    raise QueryError(f"LIMIT needs a number, got {token!r}")
+                self.limit = int(token)
+
+    def _expression(self, atom):
+        """Parse `atom`s combined with OR, AND, NOT and parentheses."""
+        node = self._conjunction(atom)
+        while self._keyword('or'):
+            node = ('or', node, self._conjunction(atom))
+        return node
+
+    def _conjunction(self, atom):
+        node = self._unary(atom)
+        while self._keyword('and'):
+            node = ('and', node, self._unary(atom))
+        return node
+
+    def _unary(self, atom):
+        if self._keyword('not'):
+            return ('not', self._unary(atom))
+        if self._peek() == ('op', '('):
+            self._next()
+            node = self._expression(atom)
+            if self._next() != ('op', ')'):
+                raise QueryError("Expected ')'")
+            return node
+        return atom()
+
+    def _condition(self):
+        field = self._field()
+        kind, token = self._peek()
+        if kind == 'op' and token in COMPARISONS:
+            op = token
+        elif kind == 'word' and token.lower() == 'contains':
+            op = 'contains'
+        else:
+            return ('truthy', field)
+        self._next()
+        kind, token = self._next()
+        if kind == 'op':
+            raise QueryError(f"Expected a value after {op}, got {token!r}")
+        return ('compare', field, '=' if op == ':' else op, parse_value(kind, token, self.today))
+
+    def _source(self):
+        kind, token = self._next()
+        if kind == 'word' and token.startswith('#') and len(token) > 1:
+            return ('tag', token[1:].lower())
+        if kind == 'string':
+            return ('folder', json.loads(token).strip('/'))
+        raise QueryError(f"Expected #tag or \"folder\", got {token!r}")
+
+class Column:
+    """One field of a MetadataTable.
+
+    `values` holds the distinct values of the field; `rows` the rows that
+    have the field, in increasing order, and `codes` the index in `values`
+    of each row's value.
+    """
+
+    def __init__(self, values=None, rows=b'', codes=b''):
+        self.values = values if values is not None else []
+        self.rows = array('I', rows)
+        self.codes = array('I', codes)
+        # {(type, value): code}, built when the first value is stored
+        self.lookup = None
+        self._changed()
+
+    def _changed(self):
+        # Derived from rows and codes, and built on first use: the code of
+        # every row of the table, bitsets of single values, and sort ranks
+        self._dense = None
+        self._bits = {}
+        self._ranks = {}
+
+    @property
+    def state(self):
+        return self.values, self.rows.tobytes(), self.codes.tobytes()
+
+    def code(self, value):
+        """Return the code of a value, adding it to the dictionary if it is new."""
+        if self.lookup is None:
+            # Keyed by type too, as True == 1 == 1.0
+            self.lookup = {(type(item), item): code for code, item in enumerate(self.values)}
+        key = (type(value), value)
+        code = self.lookup.get(key)
+        if code is None:
+            code = self.lookup[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get(self, row):
+        """Return the value of a row, or None if it doesn't have the field."""
+        position = bisect_left(self.rows, row)
+        if position < len(self.rows) and self.rows[position] == row:
+            return self.values[self.codes[position]]
+        return None
+
+    def set(self, row, value):
+        code = self.code(value)
+        position = bisect_left(self.rows, row)
+        if position < len(self.rows) and self.rows[position] == row:
+            self.codes[position] = code
+        else:
+            self.rows.insert(position, row)
+            self.codes.insert(position, code)
+        self._changed()
+
+    def clear(self, row):
+        position = bisect_left(self.rows, row)
+        if position < len(self.rows) and self.rows[position] == row:
+            del self.rows[position]
+            del self.codes[position]
+            self._changed()
+
+    def dense(self, count):
+        """Return the code of each of `count` rows, len(values) for rows without the field."""
+        if self._dense is None or len(self._dense) != count:
+            if len(self.rows) == count:
+                self._dense = self.codes
+            else:
+                dense = array('I', [len(self.values)]) * count
+                for row, code in zip(self.rows, self.codes):
+                    dense[row] = code
+                self._dense = dense
+        return self._dense
+
+    def matching_bits(self, predicate, count):
+        """Return the bitset of the rows whose value satisfies `predicate`.
+
+        The predicate sees each distinct value once. A few matching values
+        are combined from cached per-value bitsets; more are found in one
+        pass over the codes of all rows.
+        """
+        wanted = [code for code, value in enumerate(self.values) if predicate(value)]
+        if len(wanted) > CACHED_VALUES:
+            return _flag_bits(bytes(map(set(wanted).__contains__, self.dense(count))))
+        bits = 0
+        for code in wanted:
+            if code not in self._bits:
+                self._bits[code] = _flag_bits(bytes(map(code.__eq__, self.dense(count))))
+            bits |= self._bits[code]
+        return bits
+
+    def ranks(self, descending=False):
+        """Return the sort rank of every code, plus a last one (ranked last) for rows without the field."""
+        if descending not in self._ranks:
+            order = sorted(range(len(self.values)), key=lambda code: sort_key(self.values[code]),
+                           reverse=descending)
+            ranks = [0] * (len(order) + 1)
+            for rank, code in enumerate(order):
+                ranks[code] = rank
+            ranks[-1] = len(order)
+            self._ranks[descending] = ranks
+        return self._ranks[descending]
+
+def _flag_bits(flags):
+    """Return a bitset (int) from one byte per row, non-zero for the rows in the set."""
+    return int(flags.translate(BIT_DIGITS)[::-1], 2) if flags else 0
+
+class MetadataTable:
+    """Column store of the fields of a set of notes.
+
+    Rows are numbered in the order notes were added. A removed note leaves
+    an empty row (path None) until the table is rebuilt. `versions` holds
+    each row's (mtime_ns, content hash) as of its last update.
+    """
+
+    def __init__(self, state=None):
+        paths, versions, columns = state if state is not None else ([], [], {})
+        self.paths = paths
+        self.versions = versions
+        self.columns = {name: Column(*column) for name, column in columns.items()}
+        self.deleted = paths.count(None)
+        self._row_of = None
+        self._changed()
+
+    def _changed(self):
+        self._live = None
+        self._derived = {}
+        self._in_path_order = None
+
+    @property
+    def state(self):
+        """The table as lists, bytes and a dict, for marshal."""
+        return self.paths, self.versions, {name: column.state for name, column in self.columns.items()}
+
+    @property
+    def row_of(self):
+        """{path: row} of the notes in the table."""
+        # Built on first use: a query against an unchanged index never needs it
+        if self._row_of is None:
+            self._row_of = {path: row for row, path in enumerate(self.paths) if path is not None}
+        return self._row_of
+
+    def __len__(self):
+        return len(self.paths) - self.deleted
+
+    def set_row(self, path, version, fields):
+        """Store the (name, value) fields of a note, replacing any it had."""
+        row = self.row_of.get(path)
+        if row is None:
+            row = self.row_of[path] = len(self.paths)
+            self.paths.append(path)
+            self.versions.append(version)
+        else:
+            self.versions[row] = version
+            for column in self.columns.values():
+                column.clear(row)
+        for name, value in fields:
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = Column()
+            column.set(row, value)
+        self._changed()
+
+    def remove(self, path):
+        row = self.row_of.pop(path, None)
+        if row is None:
+            return
+        self.paths[row] = self.versions[row] = None
+        for column in self.columns.values():
+            column.clear(row)
+        self.deleted += 1
+        self._changed()
+
+    def needs_rebuild(self):
+        """Return whether enough notes were removed to make a rebuild worthwhile."""
+        return self.deleted > max(MIN_DELETED, len(self.paths) * MAX_DELETED_SHARE)
+
+    def column(self, name):
+        """Return the Column of a field, or None if no note has it."""
+        column = self.columns.get(name)
+        if column is None and name in DERIVED_FIELDS:
+            column = self._derived.get(name)
+            if column is None:
+                derive = DERIVED_FIELDS[name]
+                rows = [row for row, path in enumerate(self.paths) if path is not None]
+                values = [derive(self.paths[row], self.versions[row]) for row in rows]
+                column = self._derived[name] = Column(values, rows, range(len(rows)))
+        return column
+
+    def in_path_order(self):
+        """Return whether the rows are numbered in path order."""
+        if self._in_path_order is None:
+            paths = [path for path in self.paths if path is not None]
+            self._in_path_order = all(map(operator.lt, paths, paths[1:]))
+        return self._in_path_order
+
+    def live_bits(self):
+        """Return the bitset of the rows that hold a note."""
+        if self._live is None:
+            self._live = _flag_bits(bytes(map(bool, self.paths)))
+        return self._live
+
+    def evaluate(self, node):
+        """Return the bitset of the rows satisfying a Query condition."""
+        kind = node[0]
+        if kind == 'and':
+            return self.evaluate(node[1]) & self.evaluate(node[2])
+        if kind == 'or':
+            return self.evaluate(node[1]) | self.evaluate(node[2])
+        if kind == 'not':
+            return self.live_bits() & ~self.evaluate(node[1])
+        if kind == 'compare':
+            _kind, field, op, literal = node
+            predicate = lambda value: compare(value, op, literal)
+        elif kind == 'truthy':
+            field, predicate = node[1], bool
+        elif kind == 'tag':
+            field, predicate = 'file.tags', lambda tags: has_tag(tags, node[1])
+        else:
+            field, predicate = 'file.folder', lambda folder: in_folder(folder, node[1])
+        column = self.column(field)
+        if column is None:
+            return 0
+        return column.matching_bits(predicate, len(self.paths))
+
+    def select(self, query):
+        """Return the rows matching a query, in its order.
+
+        With GROUP BY, returns [(group value, rows)] instead. LIMIT applies
+        to the rows, or to the groups when grouping.
+        """
+        bits = self.live_bits()
+        for condition in query.conditions:
+            bits &= self.evaluate(condition)
+        if bits <= 0:
+            return []
+        if query.limit is not None and not query.sort and not query.group and self.in_path_order():
+            # The first page is the lowest set bits
+            rows = []
+            while bits and len(rows) < query.limit:
+                lowest = bits & -bits
+                rows.append(lowest.bit_length() - 1)
+                bits ^= lowest
+            return rows
+        rows = bit_indexes(bits)
+
+        # Ties go by path: rows are put in path order (which a table built
+        # in one go is already in) and the sort on the keys below is stable
+        if not self.in_path_order():
+            rows.sort(key=self.paths.__getitem__)
+        # Sort keys are ranks among each field's distinct values
+        count = len(self.paths)
+        keys = []
+        for field, descending in ([(query.group, False)] if query.group else []) + query.sort:
+            column = self.column(field) or Column()
+            keys.append(list(map(column.ranks(descending).__getitem__,
+                                 map(column.dense(count).__getitem__, rows))))
+        if query.group and query.limit is not None:
+            # Only the rows of the first LIMIT groups are sorted
+            last = sorted(set(keys[0]))[:query.limit][-1:]
+            if last:
+                kept = [rank <= last[0] for rank in keys[0]]
+                rows = list(compress(rows, kept))
+                keys = [list(compress(key, kept)) for key in keys]
+        ordered = zip(*keys, range(len(rows)))
+        limit = None if query.group else query.limit
+        ordered = nsmallest(limit, ordered) if limit is not None else sorted(ordered)
+        if not query.group:
+            return [rows[key[-1]] for key in ordered]
+
+        column = self.column(query.group) or Column()
+        order = sorted(range(len(column.values)), key=column.ranks().__getitem__) + [None]
+        return [(None if order[rank] is None else column.values[order[rank]],
+                 [rows[key[-1]] for key in group])
+                for rank, group in groupby(ordered, key=operator.itemgetter(0))]
+
+    def records(self, rows, fields):
+        """Return the JSON-friendly result dicts of rows: {'file', fields...}."""
+        count = len(self.paths)
+        values = [map(self.paths.__getitem__, rows)]
+        for field in fields:
+            column = self.column(field) or Column()
+            # Rows without the field have code len(values), which maps to None
+            values.append(map((column.values + [None]).__getitem__,
+                              map(column.dense(count).__getitem__, rows)))
+        names = ['file'] + fields
+        return [dict(zip(names, row_values)) for row_values in zip(*values)]
+
+    def query(self, query):
+        """Answer a Query with result dicts: {'file', fields...}, or {'group', 'files'} with GROUP BY."""
+        selected = self.select(query)
+        if query.group:
+            return [{'group': value, 'files': self.records(rows, query.fields)}
+                    for value, rows in selected]
+        return self.records(selected, query.fields)
+
+    def field_summary(self):
+        """Return {'field', 'types', 'notes'} for every field some note has, by name."""
+        summary = []
+        for name in sorted(set(self.columns) | set(DERIVED_FIELDS)):
+            column = self.column(name)
+            if column.rows:
+                types = sorted({type_name(column.values[code]) for code in set(column.codes)})
+                summary.append({'field': name, 'types': types, 'notes': len(column.rows)})
+        return summary
+
+def snapshot_path_for(vault_path):
+    """Return the column store snapshot location for a vault."""
+    return STATE_DIR / f"metadata-{vault_key(vault_path)}.snapshot"
+
+class MetadataIndex:
+    """A vault's MetadataTable, cached on disk and updated from its VaultIndex."""
+
+    def __init__(self, vault_index, snapshot_path=None):
+        self.vault_index = vault_index
+        self.conn = vault_index.conn
+        self.snapshot_path = (Path(snapshot_path) if snapshot_path
+                              else snapshot_path_for(vault_index.vault_path))
+        self.index_stamp = None
+        self.table = None
+
+    def load(self):
+        """Read the snapshot left by the last refresh, if it is usable."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                version, self.index_stamp, state = marshal.load(f)
+            if version != SNAPSHOT_VERSION:
+                raise ValueError("old snapshot layout")
+            self.table = MetadataTable(state)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.index_stamp = self.table = None
+
+    def refresh(self):
+        """Bring the table up to date with the vault index and return it.
+
+        Nothing is read while the index database is unchanged; otherwise
+        only notes whose mtime or content hash changed are re-read from it.
+        """
+        db_path = self.vault_index.db_path
+        index_stamp = (file_stamp(db_path), file_stamp(f"{db_path}-wal"))
+        if self.table is None:
+            self.load()
+        if self.table is not None and index_stamp == self.index_stamp:
+            return self.table
+
+        current = {path: (mtime_ns, digest) for path, mtime_ns, digest in
+                   self.conn.execute("SELECT path, mtime_ns, hash FROM files")}
+        table = self.table
+        if table is None or table.needs_rebuild():
+            table = MetadataTable()
+        for path in [path for path in table.row_of if path not in current]:
+            table.remove(path)
+        changed = [path for path, version in current.items()
+                   if path not in table.row_of or table.versions[table.row_of[path]] != version]
+        for path, version, fields in self._read_rows(changed, len(changed) == len(current)):
+            table.set_row(path, version, fields)
+
+        self.table = table
+        self.index_stamp = index_stamp
+        self.save()
+        return table
+
+    def _read_rows(self, paths, everything=False):
+        """Yield (path, version, fields) for notes in the vault index."""
+        select = ("SELECT id, path, mtime_ns, hash, frontmatter FROM files ORDER BY path"
+                  if everything else
+                  "SELECT id, path, mtime_ns, hash, frontmatter FROM files WHERE path IN ({})")
+        chunks = [None] if everything else [paths[i:i + FETCH_CHUNK]
+                                            for i in range(0, len(paths), FETCH_CHUNK)]
+        for chunk in chunks:
+            if chunk is None:
+                rows = self.conn.execute(select).fetchall()
+            else:
+                rows = self.conn.execute(select.format(','.join('?' * len(chunk))), chunk).fetchall()
+            ids = [file_id for file_id, *_ in rows]
+            tags = {}
+            tag_select = "SELECT file_id, tag FROM tags"
+            if chunk is not None:
+                tag_select += f" WHERE file_id IN ({','.join('?' * len(ids))})"
+            for file_id, tag in self.conn.execute(tag_select, () if chunk is None else ids):
+                tags.setdefault(file_id, []).append(tag)
+            for file_id, path, mtime_ns, digest, frontmatter in rows:
+                fields = list(frontmatter_fields(json.loads(frontmatter or '{}')))
+                fields += file_fields(path, tags.get(file_id, ()))
+                yield path, (mtime_ns, digest), fields
+
+    def save(self):
+        """Write the snapshot atomically; skipped if it can't be stored."""
+        snapshot = (SNAPSHOT_VERSION, self.index_stamp, self.table.state)
+        temp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                marshal.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            pass
+
+def run_query(vault_path, text=None, jobs=1, index=None):
+    """Refresh the column store and answer a query, or list the fields without one."""
+    # Parsed first, so that a bad query fails before the index is refreshed
+    query = Query(text) if text is not None else None
+    with use_index(vault_path, index, jobs) as index:
+        table = MetadataIndex(index).refresh()
+        return table.query(query) if query else table.field_summary()
+
+def format_value(value):
+    if isinstance(value, (list, tuple)):
+        return ', '.join(map(format_value, value))
+    return json.dumps(value) if isinstance(value, bool) or value is None else str(value)
+
+def print_record(record, indent='  '):
+    details = ', '.join(f"{field}: {format_value(value)}"
+                        for field, value in record.items() if field != 'file')
+    print(f"{indent}- {record['file']}" + (f"  ({details})" if details else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the frontmatter of an Obsidian vault")
+    parser.add_argument("query", nargs='?',
+                       help="Query, e.g. 'status = active AND due < today SORT priority LIMIT 10'")
+    parser.add_argument("--fields", action="store_true",
+                       help="List the fields notes have, with their types and note counts")
+    parser.add_argument("--json", action="store_true",
+                       help="Emit one JSON object per result (NDJSON)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Scan with N worker processes (0 = all CPUs)")
+    parser.add_argument("--no-daemon", action="store_true",
+                       help="Read the index directly even if the daemon is running")
+
+    args = parser.parse_args()
+    if not args.query and not args.fields:
+        parser.print_help()
+        return 1
+    text = None if args.fields else args.query
+
+    vault_path = load_config()
+
+    results = None
+    if not args.no_daemon:
+        results = vault_daemon.request(vault_path, {'op': 'query', 'query': text})
+    try:
+        if results is None:
+            results = run_query(vault_path, text, args.jobs)
+    except QueryError as e:
+        print(f"Error: {e}")
+        return 1
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        elif 'types' in result:
+            print(f"  {result['field']:<24} {', '.join(result['types']):<16} {result['notes']} notes")
+        elif 'group' in result:
+            print(f"\n{format_value(result['group'])} ({len(result['files'])} notes)")
+            for record in result['files']:
+                print_record(record, '    ')
+        else:
+            print_record(result)
+
+    if not args.json:
+        noun = 'fields' if args.fields else 'groups' if results and 'group' in results[0] else 'notes'
+        print(f"\nFound {len(results)} {noun}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
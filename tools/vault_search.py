@@ -2,140 +2,554 @@
 """
 Search tool for Obsidian vault.
 
+Results are printed as soon as they are found; use --limit to stop after the
+first N notes and --json to emit one JSON object per line (NDJSON).
+
+--batch reads many queries, one JSON object per line, and answers them in one
+pass over the vault; see search_batch for the query format.
+
 Usage:
     python vault_search.py "search term"
+    python vault_search.py "search term" --limit 3 --json
+    python vault_search.py "regex" --indexed
+    python vault_search.py --ranked "search terms"
     python vault_search.py --tag "tag-name"
     python vault_search.py --filename "pattern"
+    python vault_search.py --filename "prjpln" --match fuzzy --limit 10
+    python vault_search.py --batch queries.jsonl --json
 """
 
 import argparse
+import json
 import os
 import re
+import sys
+from functools import partial
 from pathlib import Path
-import yaml
 
-def load_config():
-    """Load configuration to find vault path."""
-    config_path = Path(__file__).parent.parent / "config.yaml"
-    with open(config_path) as f:
-        config = yaml.safe_load(f)
+import vault_daemon
+import vault_profile
+import vault_scan
+from path_index import MATCH_MODES, PathIndex
+from vault_config import load_config
+from vault_scan import (NeedsTextScan, byte_pattern_for, grep_bytes, grep_literal, grep_mapped,
+                        has_unicode_folds, iter_note_entries, iter_notes, literal_for, map_files,
+                        read_ahead, walk_order)
 
-    vault_path = Path(__file__).parent.parent / config['vault_path']
-    return vault_path.resolve()
+# The index modules (vault_index, fulltext_index, trigram_index, find_tasks)
+# are imported by the functions that use them, so scans and --filename
+# queries start without loading SQLite, PyYAML and the query parsers
 
-def search_content(vault_path, query, case_sensitive=False):
-    """Search for content in markdown files."""
-    results = []
-    flags = 0 if case_sensitive else re.IGNORECASE
-    pattern = re.compile(query, flags)
+# Query types --batch understands, in the daemon's request format
+BATCH_OPS = ('search', 'ranked', 'tag', 'filename', 'tasks')
+INDEX_OPS = ('ranked', 'tag', 'tasks')
 
-    for md_file in vault_path.rglob("*.md"):
-        # Skip .obsidian folder
-        if ".obsidian" in md_file.parts:
-            continue
+def compile_query(query, case_sensitive=False):
+    """Compile a content search query; '^' anchors at the start of every line."""
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return re.compile(query, flags)
+
+def match_file(md_file, pattern, max_matches=None, byte_pattern=None, data=None):
+    """Return the matching lines of one note; runs in scan workers.
 
+    With a byte_pattern the note is scanned through mmap without decoding it.
+    `data` is the note's content when it was already read (see read_ahead).
+    """
+    if byte_pattern is not None:
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if pattern.search(content):
-                    # Find matching lines
-                    lines = content.split('\n')
-                    matches = []
-                    for i, line in enumerate(lines, 1):
-                        if pattern.search(line):
-                            matches.append(f"  Line {i}: {line.strip()}")
-
-                    results.append({
-                        'file': md_file.relative_to(vault_path),
-                        'matches': matches[:5]  # Limit to first 5 matches
-                    })
+            if data is not None:
+                with vault_profile.phase('regex'):
+                    return grep_bytes(data, byte_pattern, max_matches, md_file), None
+            return grep_mapped(md_file, byte_pattern, max_matches), None
+        except NeedsTextScan:
+            pass
         except Exception as e:
-            print(f"Error reading {md_file}: {e}")
+            return None, str(e)
 
-    return results
+    try:
+        if data is not None:
+            content = data.decode('utf-8', 'replace')
+        else:
+            # Invalid UTF-8 is replaced, as on the bytes path, so every path finds the same notes
+            with vault_profile.phase('read'), open(md_file, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+            vault_profile.count('bytes read', len(content))
+    except Exception as e:
+        return None, str(e)
 
-def search_by_tag(vault_path, tag):
-    """Find notes with a specific tag."""
-    results = []
+    with vault_profile.phase('regex'):
+        return match_text(content, pattern, max_matches), None
 
-    for md_file in vault_path.rglob("*.md"):
-        if ".obsidian" in md_file.parts:
-            continue
+def match_text(content, pattern, max_matches=None):
+    """Return (line number, line) pairs matching in a note, or None if it does not match."""
+    vault_profile.count('regex evaluations')
+    if not pattern.search(content):
+        return None
+
+    # Find matching lines, stopping once enough were collected
+    matches = []
+    for i, line in enumerate(content.split('\n'), 1):
+        if pattern.search(line):
+            matches.append((i, line.strip()))
+            if max_matches is not None and len(matches) >= max_matches:
+                break
+    vault_profile.count('regex evaluations', i)
+    return matches
+
+def search_content(vault_path, query, case_sensitive=False, jobs=1, max_matches=5):
+    """Yield notes whose content matches, as soon as each one is found.
+
+    Closing the generator (e.g. after enough results) stops reading files.
+    For remote vaults (remote_reads in config.yaml) notes are read through
+    the async read-ahead pipeline and matched in this process.
+    """
+    pattern = compile_query(query, case_sensitive)
+
+    worker = partial(match_file, pattern=pattern, max_matches=max_matches,
+                     byte_pattern=byte_pattern_for(pattern))
+    if vault_scan.remote_reads:
+        results = ((md_file, (None, str(error)) if error else worker(md_file, data=data))
+                   for md_file, data, error in read_ahead(iter_notes(vault_path)))
+    else:
+        results = map_files(worker, iter_notes(vault_path), jobs)
+    for md_file, (matches, error) in results:
+        if error:
+            print(f"Error reading {md_file}: {error}", file=sys.stderr)
+        elif matches is not None:
+            yield {
+                'file': md_file.relative_to(vault_path),
+                'matches': matches
+            }
+
+def search_indexed(vault_path, query, case_sensitive=False, jobs=1, index=None, max_matches=5):
+    """Like search_content, but only search notes the trigram index can't rule out."""
+    from trigram_index import TrigramIndex
+    from vault_index import use_index
+
+    pattern = compile_query(query, case_sensitive)
+    with use_index(vault_path, index, jobs) as index:
+        trigrams = TrigramIndex(index)
+        trigrams.refresh(jobs)
+        with vault_profile.phase('trigram query'):
+            candidates = sorted(trigrams.candidates(pattern), key=walk_order)
+    vault_profile.count('trigram candidates', len(candidates))
 
+    worker = partial(match_file, pattern=pattern, max_matches=max_matches,
+                     byte_pattern=byte_pattern_for(pattern))
+    paths = [vault_path / rel_path for rel_path in candidates]
+    for md_file, (matches, error) in map_files(worker, paths, jobs):
+        if error:
+            print(f"Error reading {md_file}: {error}", file=sys.stderr)
+        elif matches is not None:
+            yield {
+                'file': md_file.relative_to(vault_path),
+                'matches': matches
+            }
+
+def search_ranked(vault_path, query, top_k=10, jobs=1, index=None, max_matches=5):
+    """Search the full-text index and return the best matching notes."""
+    from fulltext_index import FullTextIndex
+    from vault_index import use_index
+
+    with use_index(vault_path, index, jobs) as index:
+        fulltext = FullTextIndex(index)
+        fulltext.refresh()
+        results = fulltext.search(query, top_k)
+
+    for result in results:
+        md_file = vault_path / result['file']
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # Check frontmatter tags
-                if content.startswith('---'):
-                    parts = content.split('---', 2)
-                    if len(parts) >= 3:
-                        try:
-                            frontmatter = yaml.safe_load(parts[1])
-                            if 'tags' in frontmatter:
-                                tags = frontmatter['tags']
-                                if isinstance(tags, str):
-                                    tags = [tags]
-                                if tag in tags:
-                                    results.append(md_file.relative_to(vault_path))
-                        except (yaml.YAMLError, KeyError, TypeError):
-                            pass
-
-                # Check inline tags
-                if f"#{tag}" in content or f"#{tag} " in content:
-                    if md_file.relative_to(vault_path) not in results:
-                        results.append(md_file.relative_to(vault_path))
+            with open(md_file, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().split('\n')
         except Exception as e:
-            print(f"Error reading {md_file}: {e}")
+            print(f"Error reading {md_file}: {e}", file=sys.stderr)
+            lines = []
+
+        result['matches'] = [
+            (i, lines[i - 1].strip())
+            for i in result['line_nums'][:max_matches]
+            if i <= len(lines)
+        ]
 
     return results
 
-def search_by_filename(vault_path, pattern):
-    """Find files matching a filename pattern."""
-    results = []
+def search_by_tag(vault_path, tag, jobs=1, index=None):
+    """Find notes with a specific tag (frontmatter or inline)."""
+    from vault_index import use_index
+
+    with use_index(vault_path, index, jobs) as index:
+        return index.files_with_tag(tag.lstrip('#'))
+
+def search_by_filename(vault_path, pattern, match='substring', case_sensitive=False, folders=False,
+                       limit=None):
+    """Return the notes whose name or an alias matches a pattern, best first.
+
+    `match` is 'substring', 'prefix' or 'fuzzy' (see path_index). Queries are
+    answered from the path index, which only re-lists folders that changed.
+    With `folders`, matching folders are included as 'Folder/' strings.
+    """
+    table = PathIndex(vault_path).refresh()
+    return filename_results(table.search(pattern, match, case_sensitive, folders, limit))
+
+def filename_results(matches):
+    """Turn PathMatches into results: Paths for notes, 'Folder/' strings for folders."""
+    return [match.path if match.path.endswith('/') else Path(match.path) for match in matches]
+
+def batch_pattern(query_id, pattern, max_matches):
+    """Return the (query id, pattern, byte pattern, literal, max matches) match_batch uses."""
+    return query_id, pattern, byte_pattern_for(pattern), literal_for(pattern), max_matches
+
+def match_batch(md_file, patterns, data=None):
+    """Return ({query id: matching lines}, error) for one note; runs in scan workers.
+
+    `patterns` come from batch_pattern. The note is read once and its
+    Unicode fold check (see byte_pattern_for) runs at most once. Plain
+    literals are found with bytes.find, in the note lowercased once for
+    case-insensitive ones, and other patterns are searched as bytes where
+    they allow it.
+    """
+    content = lowered = folds = None
+
+    def search(query_id, pattern, byte_pattern, literal, max_matches):
+        nonlocal content, lowered, folds
+        if byte_pattern is not None and byte_pattern.fold_check:
+            # Checked once per note for all patterns, and only on non-ASCII notes
+            if folds is None:
+                folds = not data.isascii() and has_unicode_folds(data)
+            if not folds:
+                byte_pattern = byte_pattern._replace(fold_check=False)
+        if literal is not None and not byte_pattern.fold_check:
+            if not pattern.flags & re.IGNORECASE:
+                return grep_literal(data, literal, max_matches)
+            if lowered is None:
+                lowered = data.lower()
+            return grep_literal(data, literal, max_matches, lowered)
+        if byte_pattern is not None:
+            try:
+                return grep_bytes(data, byte_pattern, max_matches, md_file)
+            except NeedsTextScan:
+                pass
+        if content is None:
+            content = data.decode('utf-8', 'replace')
+        return match_text(content, pattern, max_matches)
+
+    found = {}
+    try:
+        if data is None:
+            with vault_profile.phase('read'), open(md_file, 'rb') as f:
+                data = f.read()
+            vault_profile.count('bytes read', len(data))
+        with vault_profile.phase('regex'):
+            for query in patterns:
+                matches = search(*query)
+                if matches is not None:
+                    found[query[0]] = matches
+    except Exception as e:
+        return None, str(e)
+    return found, None
+
+def read_batch(lines):
+    """Parse and check batch queries, one JSON object per line.
 
-    for md_file in vault_path.rglob(f"*{pattern}*.md"):
-        if ".obsidian" not in md_file.parts:
-            results.append(md_file.relative_to(vault_path))
+    Each query is a daemon request ({"op": "search", "query": "budget"}, see
+    search_batch) with an optional "id", which defaults to its line number.
+    Raises ValueError for a line that is not a valid query.
+    """
+    from task_query import TaskQuery
 
+    queries = []
+    ids = set()
+    for line_num, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            query = json.loads(line)
+            if not isinstance(query, dict):
+                raise ValueError("expected a JSON object")
+            query.setdefault('id', line_num)
+            if query['id'] in ids:
+                raise ValueError(f"duplicate id {query['id']!r}")
+            if query.get('op') not in BATCH_OPS:
+                raise ValueError(f"unknown op {query.get('op')!r} (expected one of {', '.join(BATCH_OPS)})")
+            field = {'search': 'query', 'ranked': 'query', 'tag': 'tag', 'filename': 'pattern'}.get(query['op'])
+            if field and not isinstance(query.get(field), str):
+                raise ValueError(f"'{query['op']}' needs a '{field}' string")
+            if query['op'] == 'search':
+                compile_query(query['query'], query.get('case_sensitive'))
+            if query['op'] == 'filename' and query.get('match', 'substring') not in MATCH_MODES:
+                raise ValueError(f"unknown match {query['match']!r} (expected one of {', '.join(MATCH_MODES)})")
+            if query['op'] == 'tasks' and query.get('filter'):
+                TaskQuery(query['filter'])
+        except (ValueError, re.error) as e:
+            raise ValueError(f"Batch line {line_num}: {e}") from None
+        ids.add(query['id'])
+        queries.append(query)
+    return queries
+
+def task_results(tasks):
+    """Group find_tasks results into search results, one per note."""
+    results = []
+    for task in tasks:
+        match = (task['line_num'], task['line'].strip())
+        if results and results[-1]['file'] == task['file_relative']:
+            results[-1]['matches'].append(match)
+        else:
+            results.append({'file': task['file_relative'], 'matches': [match]})
     return results
 
+def search_batch(vault_path, queries, jobs=1, index=None, max_matches=5, limit=None):
+    """Answer many queries with one walk of the vault and one read of each note.
+
+    `queries` come from read_batch and use the daemon's request format:
+
+        {"id": "a", "op": "search", "query": "regex", "case_sensitive": false}
+        {"id": "b", "op": "ranked", "query": "terms", "top_k": 10}
+        {"id": "c", "op": "tag", "tag": "project"}
+        {"id": "d", "op": "filename", "pattern": "meeting", "match": "prefix"}
+        {"id": "e", "op": "tasks", "query": "to-process", "filter": "not done"}
+
+    Content searches share a single scan that reads every note once (see
+    match_batch). Filename queries are answered from the same walk, and tag,
+    ranked and task queries from one refresh of the index, whose note list
+    then replaces the walk. "limit" and "max_matches" in a query override the
+    arguments. Returns {id: results}.
+    """
+    from find_tasks import find_tasks
+    from task_query import TaskQuery
+    from vault_index import use_index
+
+    answers = {query['id']: [] for query in queries}
+    searches = [query for query in queries if query['op'] == 'search']
+    filenames = [query for query in queries if query['op'] == 'filename']
+
+    if any(query['op'] in INDEX_OPS for query in queries):
+        with use_index(vault_path, index, jobs) as index:
+            for query in queries:
+                if query['op'] == 'ranked':
+                    answers[query['id']] = search_ranked(
+                        vault_path, query['query'], query.get('top_k', 10),
+                        index=index, max_matches=query.get('max_matches', max_matches)
+                    )
+                elif query['op'] == 'tag':
+                    answers[query['id']] = search_by_tag(vault_path, query['tag'], index=index)
+                elif query['op'] == 'tasks':
+                    task_query = TaskQuery(query['filter']) if query.get('filter') else None
+                    answers[query['id']] = task_results(find_tasks(
+                        vault_path, query.get('query', 'to-process'), index=index, query=task_query
+                    ))
+            rel_paths = sorted((path.as_posix() for path in index.files()), key=walk_order)
+    elif searches:
+        rel_paths = [rel_path for rel_path, _entry in iter_note_entries(vault_path)]
+
+    if filenames:
+        table = PathIndex(vault_path).refresh()
+        for query in filenames:
+            answers[query['id']] = filename_results(table.search(
+                query['pattern'], query.get('match', 'substring'), query.get('case_sensitive'),
+                query.get('folders'), query.get('limit', limit)
+            ))
+
+    if searches:
+        scan_batch(vault_path, searches, rel_paths, answers, jobs, max_matches, limit)
+
+    for query in queries:
+        query_limit = query.get('limit', limit)
+        if query_limit:
+            del answers[query['id']][query_limit:]
+    return answers
+
+def scan_batch(vault_path, searches, rel_paths, answers, jobs=1, max_matches=5, limit=None):
+    """Run the content searches of a batch in one scan, adding results to `answers`."""
+    patterns = [batch_pattern(query['id'], compile_query(query['query'], query.get('case_sensitive')),
+                              query.get('max_matches', max_matches)) for query in searches]
+    limits = {query['id']: query.get('limit', limit) for query in searches}
+    worker = partial(match_batch, patterns=patterns)
+
+    paths = [vault_path / rel_path for rel_path in rel_paths]
+    if vault_scan.remote_reads:
+        results = ((md_file, (None, str(error)) if error else worker(md_file, data=data))
+                   for md_file, data, error in read_ahead(paths))
+    else:
+        results = map_files(worker, paths, jobs)
+
+    # Stop reading notes once every search has enough results
+    pending = {query_id for query_id, query_limit in limits.items() if query_limit}
+    try:
+        for md_file, (found, error) in results:
+            if error:
+                print(f"Error reading {md_file}: {error}", file=sys.stderr)
+                continue
+            for query_id, matches in found.items():
+                answers[query_id].append({'file': md_file.relative_to(vault_path), 'matches': matches})
+                if query_id in pending and len(answers[query_id]) >= limits[query_id]:
+                    pending.discard(query_id)
+                    if not pending and all(limits.values()):
+                        return
+    finally:
+        if hasattr(results, 'close'):
+            results.close()
+
+def print_result(result, as_json):
+    """Print one result: a note path, or a dict with 'file' and 'matches'."""
+    if not isinstance(result, dict):
+        result = {'file': result}
+
+    if as_json:
+        print(json.dumps(result_record(result), ensure_ascii=False), flush=True)
+        return
+
+    if 'matches' not in result:
+        print(f"  - {result['file']}", flush=True)
+        return
+
+    score = f" (score {result['score']:.2f})" if 'score' in result else ""
+    print(f"\n{result['file']}{score}:")
+    for i, text in result['matches']:
+        print(f"  Line {i}: {text}")
+    sys.stdout.flush()
+
+def result_record(result):
+    """Return the JSON-serializable form of one result."""
+    if not isinstance(result, dict):
+        result = {'file': result}
+    record = dict(result, file=str(result['file']))
+    if 'matches' in record:
+        record['matches'] = [{'line': i, 'text': text} for i, text in record['matches']]
+    return record
+
+def print_batch_answer(query, results, as_json):
+    """Print the results of one batch query under its id."""
+    if as_json:
+        record = {'id': query['id'], 'op': query['op'],
+                  'results': [result_record(result) for result in results]}
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+        return
+
+    subject = query.get('query') or query.get('tag') or query.get('pattern') or ''
+    print(f"\n[{query['id']}] {query['op']}: {subject}")
+    for result in results:
+        print_result(result, as_json)
+    print(f"Found {len(results)} notes")
+
 def main():
     parser = argparse.ArgumentParser(description="Search Obsidian vault")
     parser.add_argument("query", nargs='?', help="Search query")
     parser.add_argument("--tag", help="Search by tag")
-    parser.add_argument("--filename", help="Search by filename pattern")
+    parser.add_argument("--filename", help="Search note names, aliases (and folders) for a pattern")
+    parser.add_argument("--match", choices=MATCH_MODES, default='substring',
+                       help="How --filename matches names (default: substring)")
+    parser.add_argument("--folders", action="store_true",
+                       help="Include matching folders in --filename results")
+    parser.add_argument("--batch", metavar="FILE",
+                       help="Answer the queries in FILE (JSON lines, - for stdin) in one pass")
     parser.add_argument("-i", "--case-sensitive", action="store_true",
                        help="Case sensitive search")
+    parser.add_argument("--ranked", action="store_true",
+                       help="Rank notes with the full-text index instead of a regex scan")
+    parser.add_argument("--indexed", action="store_true",
+                       help="Only regex-search notes selected by the trigram index")
+    parser.add_argument("--top-k", type=int, default=10, metavar="N",
+                       help="Number of ranked results to show (default: 10)")
+    parser.add_argument("--limit", type=int, metavar="N",
+                       help="Stop after N matching notes")
+    parser.add_argument("--max-matches-per-file", type=int, default=5, metavar="K",
+                       help="Matching lines to show per note (default: 5)")
+    parser.add_argument("--json", action="store_true",
+                       help="Emit one JSON object per result (NDJSON)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                       help="Scan with N worker processes (0 = all CPUs)")
+    parser.add_argument("--no-daemon", action="store_true",
+                       help="Scan the vault directly even if the daemon is running")
+    vault_profile.add_arguments(parser)
 
     args = parser.parse_args()
 
+    with vault_profile.session("vault_search", args):
+        run_search(args, parser)
+
+def run_search(args, parser):
+    """Run the search described by the parsed command line."""
     vault_path = load_config()
+    max_matches = args.max_matches_per_file
+
+    def ask_daemon(payload):
+        if args.no_daemon:
+            return None
+        return vault_daemon.request(vault_path, dict(payload, limit=args.limit))
+
+    def report(message):
+        if not args.json:
+            print(message)
+
+    if args.batch:
+        try:
+            if args.batch == '-':
+                queries = read_batch(sys.stdin)
+            else:
+                with open(args.batch, encoding='utf-8') as f:
+                    queries = read_batch(f)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        answers = search_batch(vault_path, queries, args.jobs, max_matches=max_matches,
+                               limit=args.limit)
+        with vault_profile.phase('output'):
+            for query in queries:
+                print_batch_answer(query, answers[query['id']], args.json)
+        return
 
     if args.tag:
-        print(f"Searching for tag: #{args.tag}")
-        results = search_by_tag(vault_path, args.tag)
-        print(f"\nFound {len(results)} notes:")
-        for file in results:
-            print(f"  - {file}")
+        report(f"Searching for tag: #{args.tag}\n")
+        results = ask_daemon({'op': 'tag', 'tag': args.tag})
+        if results is None:
+            results = search_by_tag(vault_path, args.tag, args.jobs)
 
     elif args.filename:
-        print(f"Searching for filename: *{args.filename}*")
-        results = search_by_filename(vault_path, args.filename)
-        print(f"\nFound {len(results)} notes:")
-        for file in results:
-            print(f"  - {file}")
+        report(f"Searching for filename ({args.match}): {args.filename}\n")
+        results = ask_daemon({'op': 'filename', 'pattern': args.filename, 'match': args.match,
+                              'case_sensitive': args.case_sensitive, 'folders': args.folders})
+        if results is None:
+            results = search_by_filename(vault_path, args.filename, args.match, args.case_sensitive,
+                                         args.folders, args.limit)
+
+    elif args.query and args.ranked:
+        report(f"Ranked search for: {args.query}")
+        top_k = min(args.top_k, args.limit) if args.limit else args.top_k
+        results = ask_daemon({'op': 'ranked', 'query': args.query, 'top_k': top_k,
+                              'max_matches': max_matches})
+        if results is None:
+            results = search_ranked(vault_path, args.query, top_k, args.jobs,
+                                    max_matches=max_matches)
+
+    elif args.query and args.indexed:
+        report(f"Searching vault for: {args.query}")
+        results = search_indexed(vault_path, args.query, args.case_sensitive, args.jobs,
+                                 max_matches=max_matches)
 
     elif args.query:
-        print(f"Searching vault for: {args.query}")
-        results = search_content(vault_path, args.query, args.case_sensitive)
-        print(f"\nFound {len(results)} notes:")
-        for result in results:
-            print(f"\n{result['file']}:")
-            for match in result['matches']:
-                print(match)
+        report(f"Searching vault for: {args.query}")
+        results = ask_daemon({'op': 'search', 'query': args.query,
+                              'case_sensitive': args.case_sensitive,
+                              'max_matches': max_matches})
+        if results is None:
+            results = search_content(vault_path, args.query, args.case_sensitive,
+                                     args.jobs, max_matches)
 
     else:
         parser.print_help()
+        return
+
+    count = 0
+    for result in vault_profile.timed_iter('scan', results):
+        with vault_profile.phase('output'):
+            print_result(result, args.json)
+        count += 1
+        if args.limit and count >= args.limit:
+            break
+    # Stop any scan that is still in progress
+    if hasattr(results, 'close'):
+        results.close()
+
+    report(f"\nFound {count} notes")
 
 if __name__ == "__main__":
     main()
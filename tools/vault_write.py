@@ -0,0 +1,253 @@
+"""
+Atomic, journaled line edits for Obsidian notes.
+
+Edits are grouped per note and each note is written once: the new content
+goes to a temporary file in the same folder, is fsynced and then moved over
+the note with os.replace(), so a note is never left half-written. Before
+anything is written every target line is checked against the text it had when
+it was indexed; notes whose lines changed since are skipped.
+
+Instead of a .bak copy next to every note, each run records one gzip
+compressed JSON journal under .obsidian-cli/journal/ holding the old and new
+text of every edited line, and the old and new path of every renamed file.
+undo_run() uses it to revert a run.
+"""
+
+import gzip
+import json
+import os
+import secrets
+from datetime import datetime
+from pathlib import Path
+
+from vault_config import STATE_DIR, vault_key
+
+JOURNAL_DIR = STATE_DIR / "journal"
+
+def new_run_id():
+    """Return a sortable, unique id for a write run."""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(2)}"
+
+def journal_path_for(vault_path, run_id):
+    """Return the undo journal location for a run."""
+    return JOURNAL_DIR / vault_key(vault_path) / f"{run_id}.json.gz"
+
+def atomic_write(path, data):
+    """Write `data` (bytes) to a file via a fsynced temp file and os.replace()."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    # Make the rename itself durable
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def plan_file(file_path, file_edits):
+    """Apply line edits to a note's content in memory.
+
+    `file_edits` are dicts with 'line_num', 'old' and 'new' (line text without
+    the line ending). 'old' and 'new' may span several lines joined with '\n',
+    e.g. to insert a line before the edited one; new lines get the ending of
+    the line they replace. Returns the new content, or raises ValueError if a
+    target line no longer matches its 'old' text.
+    """
+    lines = Path(file_path).read_bytes().split(b'\n')
+    # Bottom up, so that edits adding or removing lines don't move the others
+    for edit in sorted(file_edits, key=lambda edit: edit['line_num'], reverse=True):
+        line_idx = edit['line_num'] - 1
+        old_lines = edit['old'].split('\n')
+        if line_idx + len(old_lines) > len(lines):
+            raise ValueError(f"line {edit['line_num']} no longer exists")
+        line = lines[line_idx]
+        ending = b'\r' if line.endswith(b'\r') else b''
+        current = [line[:-1] if line.endswith(b'\r') else line
+                   for line in lines[line_idx:line_idx + len(old_lines)]]
+        if [line.decode('utf-8') for line in current] != old_lines:
+            raise ValueError(f"line {edit['line_num']} no longer matches the expected text")
+        lines[line_idx:line_idx + len(old_lines)] = [
+            new_line.encode('utf-8') + ending for new_line in edit['new'].split('\n')
+        ]
+    return b'\n'.join(lines)
+
+def _plan_edits(vault_path, edits):
+    """Group edits per note and apply them in memory; returns (path, edits, data) triples."""
+    edits_by_file = {}
+    for edit in edits:
+        edits_by_file.setdefault(Path(edit['path']).as_posix(), []).append(edit)
+
+    planned = []
+    for rel_path, file_edits in sorted(edits_by_file.items()):
+        try:
+            planned.append((rel_path, file_edits, plan_file(vault_path / rel_path, file_edits)))
+        except Exception as e:
+            print(f"Skipping {rel_path}: {e}")
+    return planned
+
+def _write_journal(vault_path, planned, renames=()):
+    """Record a run's edits and renames before any of them is applied; returns its id."""
+    run_id = new_run_id()
+    entries = [
+        {'path': rel_path, 'line_num': edit['line_num'], 'old': edit['old'], 'new': edit['new']}
+        for rel_path, file_edits, _data in planned
+        for edit in file_edits
+    ]
+    record = {
+        'run_id': run_id,
+        'vault': str(vault_path),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'edits': entries,
+    }
+    if renames:
+        record['renames'] = [{'old': old, 'new': new} for old, new in renames]
+    journal_path = journal_path_for(vault_path, run_id)
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(journal_path, gzip.compress(json.dumps(record, ensure_ascii=False).encode('utf-8')))
+    return run_id
+
+def _write_planned(vault_path, planned):
+    """Write planned notes; returns the number of lines updated."""
+    updated_count = 0
+    for rel_path, file_edits, data in planned:
+        try:
+            atomic_write(vault_path / rel_path, data)
+        except Exception as e:
+            print(f"Error updating {vault_path / rel_path}: {e}")
+            continue
+        updated_count += len(file_edits)
+        print(f"Updated {len(file_edits)} line(s) in {rel_path}")
+    return updated_count
+
+def _rename_all(vault_path, renames):
+    """Rename files, never over an existing one; returns the renames done."""
+    done = []
+    for old, new in renames:
+        old_path, new_path = vault_path / old, vault_path / new
+        if os.path.lexists(new_path):
+            print(f"Skipping {old}: {new} already exists")
+            continue
+        try:
+            os.rename(old_path, new_path)
+        except OSError as e:
+            print(f"Error renaming {old}: {e}")
+            continue
+        done.append((old, new))
+
+    # Make the renames durable
+    for folder in sorted({(vault_path / new).parent for _old, new in done}):
+        dir_fd = os.open(folder, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return done
+
+def apply_line_edits(vault_path, edits, journal=True):
+    """Apply line edits to notes atomically, one write per note.
+
+    `edits` are dicts with 'path' (relative to the vault), 'line_num', 'old'
+    and 'new'. All notes are checked before the first one is written. Returns
+    (run id or None, number of lines updated).
+    """
+    planned = _plan_edits(vault_path, edits)
+    if not planned:
+        return None, 0
+
+    # The journal is written before any note, so a run interrupted part-way
+    # can still be undone
+    run_id = _write_journal(vault_path, planned) if journal else None
+    return run_id, _write_planned(vault_path, planned)
+
+def apply_renames(vault_path, renames, edits=(), journal=True):
+    """Rename files and apply line edits (e.g. retargeted links) as one run.
+
+    `renames` are (old, new) paths relative to the vault and `edits` refer to
+    notes by their path before the renames. Every edit is checked and the
+    journal written before anything changes; edited notes are written first
+    and renamed afterwards. Returns (run id or None, files renamed, lines
+    updated).
+    """
+    renames = [(Path(old).as_posix(), Path(new).as_posix()) for old, new in renames]
+    planned = _plan_edits(vault_path, edits)
+    if not planned and not renames:
+        return None, 0, 0
+
+    run_id = _write_journal(vault_path, planned, renames) if journal else None
+    updated_count = _write_planned(vault_path, planned)
+    renamed = _rename_all(vault_path, renames)
+    return run_id, len(renamed), updated_count
+
+def read_journal(vault_path, run_id):
+    """Load the undo journal of a run."""
+    with gzip.open(journal_path_for(vault_path, run_id), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+def list_runs(vault_path):
+    """Return the ids of runs that can still be undone, oldest first."""
+    journal_dir = JOURNAL_DIR / vault_key(vault_path)
+    if not journal_dir.exists():
+        return []
+    return sorted(
+        path.name[:-len('.json.gz')] for path in journal_dir.glob('*.json.gz')
+        if not path.name.endswith('.undone.json.gz')
+    )
+
+def undo_run(vault_path, run_id):
+    """Revert the renames and edits recorded for a run; returns the number of lines restored.
+
+    Notes edited again since the run are left alone, and so are renamed files
+    whose old name has been taken again. The journal is kept with
+    an '.undone' suffix afterwards so the run cannot be undone twice; if
+    anything was skipped, the journal keeps only the skipped notes and renames
+    instead, so the run can be undone again once they are fixed.
+    """
+    journal_path = journal_path_for(vault_path, run_id)
+    if not journal_path.exists():
+        raise FileNotFoundError(f"No undo journal for run {run_id!r}")
+    record = read_journal(vault_path, run_id)
+    # Renames are reverted first, so the edits find their notes at the old paths
+    renames = [(rename['new'], rename['old']) for rename in reversed(record.get('renames', []))]
+    renames = [(new, old) for new, old in renames if os.path.lexists(vault_path / new)]
+    reverted = set(_rename_all(vault_path, renames))
+    # Line numbers are those before the run; edits that added or removed
+    # lines moved the ones below them
+    reverse = []
+    shifts = {}
+    for edit in sorted(record['edits'], key=lambda edit: (edit['path'], edit['line_num'])):
+        shift = shifts.get(edit['path'], 0)
+        reverse.append({'path': edit['path'], 'line_num': edit['line_num'] + shift,
+                        'old': edit['new'], 'new': edit['old']})
+        shifts[edit['path']] = shift + edit['new'].count('\n') - edit['old'].count('\n')
+    planned = _plan_edits(vault_path, reverse)
+    restored = _write_planned(vault_path, planned)
+
+    restored_paths = {rel_path for rel_path, _file_edits, _data in planned}
+    skipped_edits = [edit for edit in record['edits'] if edit['path'] not in restored_paths]
+    skipped_renames = [{'old': old, 'new': new} for new, old in reversed(renames)
+                       if (new, old) not in reverted]
+    if not skipped_edits and not skipped_renames:
+        journal_path.rename(journal_path.with_name(f"{run_id}.undone.json.gz"))
+        return restored
+
+    record['edits'] = skipped_edits
+    if skipped_renames:
+        record['renames'] = skipped_renames
+    else:
+        record.pop('renames', None)
+    atomic_write(journal_path, gzip.compress(json.dumps(record, ensure_ascii=False).encode('utf-8')))
+    skipped = sorted({edit['path'] for edit in skipped_edits} | {rename['old'] for rename in skipped_renames})
+    print(f"Not undone: {', '.join(skipped)}")
+    print(f"Run {run_id} keeps these and can be undone again once they are fixed")
+    return restored